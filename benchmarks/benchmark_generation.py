@@ -0,0 +1,43 @@
+"""
+Measures how the runtime of generate_graph scales with the number of trees and comments.
+
+Usage: python -m benchmarks.benchmark_generation [max_num_trees] [nodes_per_tree]
+"""
+import sys
+import time
+
+import wknml
+from wknml.nml_generation import generate_graph
+from benchmarks.synthetic import generate_synthetic_nml
+
+
+def main(max_num_trees: int = 8000, nodes_per_tree: int = 10):
+    print(f"{'trees':>8} {'nodes':>10} {'comments':>10} {'time':>10}")
+    num_trees = max_num_trees // 8
+    while num_trees <= max_num_trees:
+        nml = generate_synthetic_nml(num_trees, nodes_per_tree)
+        # Two comments and one branchpoint per tree
+        nml = nml._replace(
+            comments=[
+                wknml.Comment(node=node.id, content=f"comment {node.id}")
+                for tree in nml.trees
+                for node in tree.nodes[:2]
+            ],
+            branchpoints=[
+                wknml.Branchpoint(id=tree.nodes[0].id, time=0) for tree in nml.trees
+            ],
+        )
+
+        start = time.perf_counter()
+        generate_graph(nml)
+        duration = time.perf_counter() - start
+
+        print(
+            f"{num_trees:>8} {num_trees * nodes_per_tree:>10} "
+            f"{len(nml.comments):>10} {duration:>8.2f} s"
+        )
+        num_trees *= 2
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
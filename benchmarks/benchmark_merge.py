@@ -0,0 +1,72 @@
+"""
+Compares merging many NML files with the NetworkX utilities and with `merge_nmls`.
+
+Usage: python -m benchmarks.benchmark_merge [num_files] [num_trees] [nodes_per_tree]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import wknml
+from wknml.nml_generation import generate_nml, nml_tree_to_graph
+from benchmarks.synthetic import generate_synthetic_nml
+
+
+def measure(name: str, function, *args):
+    start = time.perf_counter()
+    function(*args)
+    duration = time.perf_counter() - start
+    print(f"{name:<36} {duration:>8.2f} s")
+
+
+def merge_with_graphs(nmls):
+    # Every annotation becomes a group, generate_nml assigns new ids to all nodes
+    tree_dict = {
+        f"annotation {i}": [nml_tree_to_graph(tree) for tree in nml.trees]
+        for i, nml in enumerate(nmls)
+    }
+    return generate_nml(tree_dict, globalize_ids=True)
+
+
+def main(num_files: int = 200, num_trees: int = 10, nodes_per_tree: int = 200):
+    print(f"{num_files} files with {num_trees * nodes_per_tree} nodes each")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for i in range(num_files):
+            paths.append(Path(tmp_dir) / f"task_{i}.nml")
+            with open(paths[-1], "wb") as f:
+                wknml.write_nml(f, generate_synthetic_nml(num_trees, nodes_per_tree, i))
+
+        measure(
+            "generate_nml[networkx, files]",
+            lambda: merge_with_graphs(wknml.parse_nml(path) for path in paths),
+        )
+        measure("merge_nmls[files]", wknml.merge_nmls, paths)
+        measure(
+            "merge_nmls[output]",
+            lambda: wknml.merge_nmls(paths, output=Path(tmp_dir) / "merged.nml"),
+        )
+
+        # Without parsing, only the id remapping is compared
+        nmls = [wknml.parse_nml(path) for path in paths]
+        columnars = [wknml.nml_to_columnar(nml) for nml in nmls]
+        measure("generate_nml[networkx, NML]", merge_with_graphs, nmls)
+        measure("merge_nmls[NML]", wknml.merge_nmls, nmls)
+        measure(
+            "merge_nmls[ColumnarNML, compact]",
+            lambda: wknml.merge_nmls(columnars, compact=True),
+        )
+
+        workers = os.cpu_count() or 1
+        if workers > 1:
+            measure(
+                f"merge_nmls[{workers} workers]",
+                lambda: wknml.merge_nmls(paths, workers=workers),
+            )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,107 @@
+"""
+Compares the runtime and peak memory of the NML parsers on a synthetic annotation.
+
+Usage: python -m benchmarks.benchmark_parsing [num_trees] [nodes_per_tree]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import partial
+from importlib.util import find_spec
+from pathlib import Path
+
+import wknml
+from benchmarks.synthetic import write_synthetic_nml
+
+
+def measure(name: str, parse, path: str):
+    # Time and memory are measured in separate runs as tracing slows down allocations
+    start = time.perf_counter()
+    parse(path)
+    duration = time.perf_counter() - start
+
+    tracemalloc.start()
+    result = parse(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<32} {duration:8.2f} s {peak / 2 ** 20:10.1f} MiB peak")
+    return result
+
+
+def main(num_trees: int = 100, nodes_per_tree: int = 2000):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = write_synthetic_nml(
+            str(Path(tmp_dir) / "synthetic.nml"), num_trees, nodes_per_tree
+        )
+        print(f"{num_trees * nodes_per_tree} nodes in {num_trees} trees")
+        measure("read file", lambda path: Path(path).read_bytes(), path)
+        measure(
+            "parse_nml[metadata]",
+            partial(wknml.parse_nml, sections={"parameters", "comments"}),
+            path,
+        )
+        measure(
+            "parse_nml[skip attributes]",
+            partial(wknml.parse_nml, skip_node_attributes=True),
+            path,
+        )
+
+        index = measure("build_nml_index", wknml.build_nml_index, path)
+        measure(
+            "load_tree[index]",
+            lambda path: wknml.load_tree(path, index, num_trees // 2),
+            path,
+        )
+        measure(
+            "parse_nml[tree_ids]",
+            partial(wknml.parse_nml, tree_ids=[num_trees // 2]),
+            path,
+        )
+        cache_dir = Path(tmp_dir) / "cache"
+        wknml.parse_nml_cached(path, cache_dir=cache_dir)
+        measure(
+            "parse_nml_cached[warm]",
+            partial(wknml.parse_nml_cached, cache_dir=cache_dir),
+            path,
+        )
+        measure(
+            "parse_nml_cached[warm, compact]",
+            partial(wknml.parse_nml_cached, cache_dir=cache_dir, compact=True),
+            path,
+        )
+        binary_path = str(Path(tmp_dir) / "synthetic.wknmlbin")
+        wknml.write_binary(binary_path, wknml.parse_nml_columnar(path))
+        measure("load_binary[mmap]", wknml.load_binary, binary_path)
+        measure(
+            "load_binary[columnar_to_nml]",
+            lambda path: wknml.columnar_to_nml(wknml.load_binary(path)),
+            binary_path,
+        )
+        workers = os.cpu_count() or 1
+        measure(
+            f"parse_nml[workers={workers}]",
+            partial(wknml.parse_nml, workers=workers),
+            path,
+        )
+
+        engines = ["etree", "expat"]
+        if find_spec("lxml") is not None:
+            engines.append("lxml")
+        for engine in engines:
+            measure(
+                f"parse_nml[{engine}]",
+                partial(wknml.parse_nml, engine=engine),
+                path,
+            )
+            measure(
+                f"parse_nml_columnar[{engine}]",
+                partial(wknml.parse_nml_columnar, engine=engine),
+                path,
+            )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
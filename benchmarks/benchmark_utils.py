@@ -0,0 +1,63 @@
+"""
+Compares the runtime of the NetworkX and the vectorized versions of the edge length utilities.
+
+Usage: python -m benchmarks.benchmark_utils [num_trees] [nodes_per_tree] [max_length]
+"""
+import sys
+import time
+
+from wknml import nml_to_columnar
+from wknml.nml_generation import generate_graph
+from wknml.nml_utils import ensure_max_edge_length, approximate_minimal_edge_length
+from benchmarks.synthetic import generate_synthetic_nml
+
+
+def measure(name: str, function, *args):
+    start = time.perf_counter()
+    function(*args)
+    duration = time.perf_counter() - start
+    print(f"{name:<42} {duration:>8.2f} s")
+
+
+def main(num_trees: int = 1000, nodes_per_tree: int = 100, max_length: float = 50.0):
+    nml = generate_synthetic_nml(num_trees, nodes_per_tree)
+    print(f"{num_trees} trees, {num_trees * nodes_per_tree} nodes")
+
+    measure(
+        "ensure_max_edge_length[graph]",
+        lambda: ensure_max_edge_length(generate_graph(nml), max_length),
+    )
+    measure("ensure_max_edge_length[nml]", ensure_max_edge_length, nml, max_length)
+    measure(
+        "ensure_max_edge_length[columnar]",
+        ensure_max_edge_length,
+        nml_to_columnar(nml),
+        max_length,
+    )
+
+    # Inserts nodes first, so that there are nodes to remove
+    dense_nml = ensure_max_edge_length(nml, max_length / 4)
+    measure(
+        "approximate_minimal_edge_length[graph]",
+        lambda: approximate_minimal_edge_length(
+            generate_graph(dense_nml), max_length, 0.2
+        ),
+    )
+    measure(
+        "approximate_minimal_edge_length[nml]",
+        approximate_minimal_edge_length,
+        dense_nml,
+        max_length,
+        0.2,
+    )
+    measure(
+        "approximate_minimal_edge_length[columnar]",
+        approximate_minimal_edge_length,
+        nml_to_columnar(dense_nml),
+        max_length,
+        0.2,
+    )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]), *(float(arg) for arg in sys.argv[3:4]))
@@ -0,0 +1,78 @@
+"""
+Compares the runtime of the NML serializers on a synthetic annotation.
+
+Usage: python -m benchmarks.benchmark_writing [num_trees] [nodes_per_tree]
+"""
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import wknml
+from benchmarks.synthetic import generate_synthetic_nml
+
+
+def measure(name: str, write, path: Path):
+    start = time.perf_counter()
+    with open(path, "wb") as f:
+        write(f)
+    duration = time.perf_counter() - start
+    print(f"{name:<32} {duration:8.2f} s {path.stat().st_size / 2 ** 20:10.1f} MiB")
+
+
+def main(num_trees: int = 100, nodes_per_tree: int = 2000):
+    nml = generate_synthetic_nml(num_trees, nodes_per_tree)
+    print(f"{num_trees * nodes_per_tree} nodes in {num_trees} trees")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "synthetic.nml"
+        for engine in wknml.WRITER_ENGINES:
+            measure(
+                f"write_nml[{engine}]",
+                lambda f: wknml.write_nml(f, nml, engine=engine),
+                path,
+            )
+
+        num_threads = sorted({1, os.cpu_count() or 1})
+        columnar = wknml.nml_to_columnar(nml)
+        for decimals in [None, 3]:
+            for name, data in [("NML", nml), ("ColumnarNML", columnar)]:
+                measure(
+                    f"write_nml[{name}, decimals={decimals}]",
+                    lambda f: wknml.write_nml(f, data, decimals=decimals),
+                    path,
+                )
+
+        for workers in num_threads[1:]:
+            measure(
+                f"write_nml[{workers} workers]",
+                lambda f: wknml.write_nml(f, nml, workers=workers),
+                path,
+            )
+
+        # The former workflow: writing the NML, then gzipping it in a second step
+        def write_then_gzip(f):
+            wknml.write_nml(f, nml)
+            f.flush()
+            with open(path, "rb") as source:
+                with gzip.open(path.with_suffix(".nml.gz"), "wb", 6) as target:
+                    shutil.copyfileobj(source, target)
+
+        measure("write_nml + gzip", write_then_gzip, path)
+
+        for compression in wknml.COMPRESSIONS:
+            for threads in num_threads if compression != "zip" else [1]:
+                measure(
+                    f"write_nml[{compression}, {threads} threads]",
+                    lambda f: wknml.write_nml(
+                        f, nml, compression=compression, threads=threads
+                    ),
+                    path.with_suffix(f".{compression}"),
+                )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,65 @@
+import numpy as np
+
+import wknml
+
+
+def generate_synthetic_nml(
+    num_trees: int, nodes_per_tree: int, seed: int = 0
+) -> wknml.NML:
+    """
+    Generates an NML with `num_trees` linear skeletons of `nodes_per_tree` nodes each. All optional node attributes are set.
+    """
+
+    rng = np.random.default_rng(seed)
+    trees = []
+    node_id = 1
+    for tree_id in range(1, num_trees + 1):
+        positions = np.cumsum(rng.integers(-5, 6, size=(nodes_per_tree, 3)), axis=0)
+        positions += rng.integers(0, 10000, size=3)
+        nodes = [
+            wknml.Node(
+                id=node_id + i,
+                position=tuple(float(c) for c in position),
+                radius=1.0,
+                rotation=(0.0, 0.0, 0.0),
+                inVp=0,
+                inMag=0,
+                bitDepth=8,
+                interpolation=True,
+                time=1600000000000 + i,
+            )
+            for i, position in enumerate(positions.tolist())
+        ]
+        edges = [
+            wknml.Edge(node_id + i, node_id + i + 1) for i in range(nodes_per_tree - 1)
+        ]
+        trees.append(
+            wknml.Tree(
+                id=tree_id,
+                color=(1.0, 0.0, 0.0, 1.0),
+                name=f"tree{tree_id}",
+                nodes=nodes,
+                edges=edges,
+                groupId=tree_id % 10 + 1,
+            )
+        )
+        node_id += nodes_per_tree
+
+    return wknml.NML(
+        parameters=wknml.NMLParameters(name="synthetic", scale=(11.24, 11.24, 25.0)),
+        trees=trees,
+        branchpoints=[wknml.Branchpoint(id=1, time=0)],
+        comments=[wknml.Comment(node=1, content="first node")],
+        groups=[
+            wknml.Group(id=group_id, name=f"group{group_id}", children=[])
+            for group_id in range(1, 11)
+        ],
+    )
+
+
+def write_synthetic_nml(
+    path: str, num_trees: int, nodes_per_tree: int, seed: int = 0
+) -> str:
+    with open(path, "wb") as f:
+        wknml.write_nml(f, generate_synthetic_nml(num_trees, nodes_per_tree, seed))
+    return path
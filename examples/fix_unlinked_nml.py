@@ -23,6 +23,7 @@ args = parser.parse_args()
 
 with open(args.source, "rb") as f:
     nml = wknml.parse_nml(f)
+tree_index = wknml.NodeIndex(nml)
 
 all_nodes = flatten([t.nodes for t in nml.trees])
 all_edges = flatten([t.edges for t in nml.trees])
@@ -68,7 +69,7 @@ new_trees_with_groups = []
 new_groups = []
 for i, (old_id, new_ids) in enumerate(old_new_mapping.items()):
     group_id = i + 1
-    old_tree = find(lambda t: t.id == old_id, nml.trees)
+    old_tree = tree_index.get_tree(old_id)
     new_groups.append(wknml.Group(id=group_id, name=old_tree.name, children=[]))
     for new_id in new_ids:
         new_tree = find(lambda t: t.id == new_id, new_trees)
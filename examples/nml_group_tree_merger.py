@@ -1,10 +1,15 @@
+"""
+Merges the trees of each group into a single tree, connecting them at their closest nodes.
+
+The nearest neighbor queries use `SpatialIndex`, which requires the optional scipy package:
+pip install wknml[scipy]
+"""
 import argparse
 import logging
 import os
 import numpy as np
 import xml.etree.ElementTree as ET
-from math import inf
-from wknml import Edge, Tree, NML, parse_nml, write_nml
+from wknml import Edge, Tree, NML, NMLParameters, SpatialIndex, parse_nml, write_nml
 from typing import List, Tuple
 
 
@@ -25,10 +30,6 @@ def find_trees_by_id(trees: List[Tree], group_id: int):
     return trees_with_group_id
 
 
-def dist(a: np.ndarray, b: np.ndarray):
-    return np.sqrt(np.sum(((a - b)) ** 2, axis=1))
-
-
 def get_np_array_of_nodes_with_scale(tree: Tree, scale: Tuple[float]):
     nodes = list(
         map(
@@ -49,29 +50,26 @@ def merge_trees_to_one_tree(trees: List[Tree], scale):
         # sort the trees by the number of nodes
         trees = sorted(trees, key=lambda tree: len(tree.nodes))
         merging_tree = trees[0]
-        min_distance_tree = 0
-        min_merging_tree_node_index = 0
-        min_distance_tree_node_index = 0
-        min_dist = inf
-
-        # find the nearest neighbour nodes of one node of the smallest tree and the other trees
-        for current_tree in trees[1:]:
-            node_coordinates_from_current_tree = get_np_array_of_nodes_with_scale(
-                current_tree, scale
-            )
-            for current_node_index in np.arange(len(merging_tree.nodes)):
-                current_node_coordinates = (
-                    np.array(merging_tree.nodes[current_node_index].position) * scale
-                )
-                distances = dist(
-                    node_coordinates_from_current_tree, current_node_coordinates
-                )
-                min_dist_index = np.argmin(distances)
-                if distances[min_dist_index] < min_dist:
-                    min_distance_tree = current_tree
-                    min_merging_tree_node_index = current_node_index
-                    min_distance_tree_node_index = min_dist_index
-                    min_dist = distances[min_dist_index]
+
+        # find the nearest neighbour nodes of the smallest tree in the other trees
+        other_trees = NML(
+            parameters=NMLParameters(name="", scale=tuple(scale)),
+            trees=trees[1:],
+            branchpoints=[],
+            comments=[],
+            groups=[],
+        )
+        spatial_index = SpatialIndex(other_trees)
+        distances, node_ids, tree_ids = spatial_index.query(
+            get_np_array_of_nodes_with_scale(merging_tree, scale)
+        )
+        min_merging_tree_node_index = int(np.argmin(distances[:, 0]))
+        min_distance_tree = next(
+            tree
+            for tree in trees[1:]
+            if tree.id == tree_ids[min_merging_tree_node_index, 0]
+        )
+
         # append the nodes to the other tree
         min_distance_tree.nodes.extend(merging_tree.nodes)
         min_distance_tree.edges.extend(merging_tree.edges)
@@ -79,7 +77,7 @@ def merge_trees_to_one_tree(trees: List[Tree], scale):
         min_distance_tree.edges.append(
             Edge(
                 merging_tree.nodes[min_merging_tree_node_index].id,
-                min_distance_tree.nodes[min_distance_tree_node_index].id,
+                int(node_ids[min_merging_tree_node_index, 0]),
             )
         )
         # delete merged tree
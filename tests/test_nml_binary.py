@@ -0,0 +1,51 @@
+import io
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import wknml
+from tests.test_snapshot_readandwrite import INPUT_FILES
+
+
+@pytest.fixture(scope="session", autouse=True)
+def create_temp_output_directory():
+    output_directory = Path("testoutput")
+    output_directory.mkdir(exist_ok=True)
+
+
+def write_nml_to_bytes(nml: wknml.NML) -> bytes:
+    buffer = io.BytesIO()
+    wknml.write_nml(buffer, nml)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_binary_roundtrip(mmap):
+    for input_file in INPUT_FILES:
+        nml = wknml.parse_nml(input_file)
+        output_file = f"testoutput/{Path(input_file).stem}.wknmlbin"
+        wknml.write_binary(output_file, nml)
+
+        columnar = wknml.load_binary(output_file, mmap=mmap)
+        assert isinstance(columnar.nodes.position, np.memmap) == mmap
+        assert wknml.columnar_to_nml(columnar) == nml
+        assert write_nml_to_bytes(
+            wknml.columnar_to_nml(columnar)
+        ) == write_nml_to_bytes(nml)
+
+        wknml.write_binary(output_file, wknml.nml_to_columnar(nml))
+        assert wknml.columnar_to_nml(wknml.load_binary(output_file, mmap=mmap)) == nml
+
+
+def test_binary_roundtrip_without_trees():
+    nml = wknml.parse_nml_metadata(INPUT_FILES[1])
+    output_file = "testoutput/metadata.wknmlbin"
+    wknml.write_binary(output_file, nml)
+
+    assert wknml.columnar_to_nml(wknml.load_binary(output_file)) == nml
+
+
+def test_load_binary_rejects_other_files():
+    with pytest.raises(ValueError):
+        wknml.load_binary(INPUT_FILES[0])
@@ -0,0 +1,68 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+import wknml
+from tests.test_snapshot_readandwrite import INPUT_FILES
+
+
+@pytest.fixture(scope="session", autouse=True)
+def create_temp_output_directory():
+    output_directory = Path("testoutput")
+    output_directory.mkdir(exist_ok=True)
+
+
+@pytest.fixture
+def cache_dir():
+    cache_dir = Path("testoutput/cache")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    yield cache_dir
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def test_parse_nml_cached(cache_dir):
+    for input_file in INPUT_FILES:
+        nml = wknml.parse_nml(input_file)
+        assert wknml.parse_nml_cached(input_file, cache_dir=cache_dir) == nml
+        assert wknml.parse_nml_cached(input_file, cache_dir=cache_dir) == nml
+        compact_nml = wknml.parse_nml_cached(
+            input_file, cache_dir=cache_dir, compact=True
+        )
+        assert isinstance(compact_nml.trees[0].nodes, wknml.NodeSequence)
+        assert compact_nml == nml
+
+    assert len(list(cache_dir.glob("*.wknmlbin"))) == len(INPUT_FILES)
+
+
+def test_modified_file_is_parsed_again(cache_dir):
+    input_file = "testoutput/cached.nml"
+    shutil.copy(INPUT_FILES[0], input_file)
+    assert wknml.parse_nml_cached(input_file, cache_dir=cache_dir) == wknml.parse_nml(
+        input_file
+    )
+
+    shutil.copy(INPUT_FILES[1], input_file)
+    os.utime(input_file, ns=(0, 0))
+    assert wknml.parse_nml_cached(input_file, cache_dir=cache_dir) == wknml.parse_nml(
+        INPUT_FILES[1]
+    )
+
+
+def test_corrupt_cache_entry(cache_dir):
+    input_file = INPUT_FILES[0]
+    wknml.parse_nml_cached(input_file, cache_dir=cache_dir)
+    for entry in cache_dir.glob("*.wknmlbin"):
+        entry.write_bytes(b"corrupt")
+
+    assert wknml.parse_nml_cached(input_file, cache_dir=cache_dir) == wknml.parse_nml(
+        input_file
+    )
+
+
+def test_cache_eviction(cache_dir):
+    for input_file in INPUT_FILES:
+        wknml.parse_nml_cached(input_file, cache_dir=cache_dir, max_size=1)
+
+    assert list(cache_dir.glob("*.wknmlbin")) == []
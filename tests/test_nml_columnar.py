@@ -0,0 +1,107 @@
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import wknml
+from wknml import parse_nml, parse_nml_columnar, columnar_to_nml, nml_to_columnar
+from tests.test_nml_parsing import write_nml_with_many_trees
+from tests.test_snapshot_readandwrite import INPUT_FILES
+
+TEST_FILES = INPUT_FILES + [
+    "testdata/nml_without_default_values.nml",
+    "testdata/nml_with_multiple_user_bounding_boxes.nml",
+]
+
+
+@pytest.fixture(scope="session", autouse=True)
+def create_temp_output_directory():
+    output_directory = Path("testoutput")
+    output_directory.mkdir(exist_ok=True)
+
+
+def test_columnar_to_nml_equals_parse_nml():
+    for input_file in TEST_FILES:
+        expected_nml = parse_nml(input_file)
+        columnar = parse_nml_columnar(input_file)
+
+        assert columnar_to_nml(columnar) == expected_nml
+
+
+def test_columnar_layout():
+    nml = parse_nml("testdata/complex_dataset.fixture.nml")
+    columnar = parse_nml_columnar("testdata/complex_dataset.fixture.nml")
+
+    assert len(columnar.tree_ids) == len(nml.trees)
+    assert columnar.nodes.position.shape == (columnar.node_offsets[-1], 3)
+    assert columnar.edges.shape == (columnar.edge_offsets[-1], 2)
+    for i, tree in enumerate(nml.trees):
+        node_slice = slice(columnar.node_offsets[i], columnar.node_offsets[i + 1])
+        assert columnar.nodes.id[node_slice].tolist() == [n.id for n in tree.nodes]
+        assert np.array_equal(
+            columnar.nodes.position[node_slice], [n.position for n in tree.nodes]
+        )
+
+
+def test_nml_to_columnar_round_trip():
+    for input_file in TEST_FILES:
+        nml = parse_nml(input_file)
+
+        assert columnar_to_nml(nml_to_columnar(nml)) == nml
+
+
+def test_missing_node_attributes():
+    nml = wknml.NML(
+        parameters=wknml.NMLParameters(name="Test", scale=(1.0, 1.0, 1.0)),
+        trees=[
+            wknml.Tree(
+                id=1,
+                color=None,
+                name="Test",
+                nodes=[wknml.Node(id=1, position=(1.0, 2.0, 3.0))],
+                edges=[],
+            )
+        ],
+        branchpoints=[],
+        comments=[],
+        groups=[],
+    )
+    columnar = nml_to_columnar(nml)
+
+    assert np.isnan(columnar.nodes.radius[0])
+    assert columnar.nodes.time[0] == wknml.nml_columnar.MISSING
+    assert columnar_to_nml(columnar) == nml
+
+
+def test_compact_trees():
+    for input_file in TEST_FILES:
+        nml = parse_nml(input_file)
+        compact_nml = columnar_to_nml(parse_nml_columnar(input_file), compact=True)
+
+        assert compact_nml == nml
+        for tree, compact_tree in zip(nml.trees, compact_nml.trees):
+            assert isinstance(compact_tree.nodes, wknml.NodeSequence)
+            assert len(compact_tree.nodes) == len(tree.nodes)
+            if len(tree.nodes) > 0:
+                assert compact_tree.nodes[-1].position == tree.nodes[-1].position
+                assert compact_tree.nodes[1:] == tree.nodes[1:]
+            assert list(compact_tree.edges) == tree.edges
+
+
+def test_compact_trees_memory():
+    path = "testoutput/compact.nml"
+    write_nml_with_many_trees(path, num_trees=2, nodes_per_tree=20000)
+
+    tracemalloc.start()
+    nml = parse_nml(path)
+    regular_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    compact_nml = columnar_to_nml(parse_nml_columnar(path), compact=True)
+    compact_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert compact_nml.trees[1].nodes[5] == nml.trees[1].nodes[5]
+    assert compact_size * 4 < regular_size
@@ -0,0 +1,83 @@
+import bz2
+import gzip
+import io
+import lzma
+import zipfile
+from pathlib import Path
+
+import pytest
+
+import wknml
+from tests.test_snapshot_readandwrite import INPUT_FILES
+
+
+@pytest.fixture(scope="session", autouse=True)
+def create_temp_output_directory():
+    output_directory = Path("testoutput")
+    output_directory.mkdir(exist_ok=True)
+
+
+def compress_zstd(data: bytes) -> bytes:
+    zstandard = pytest.importorskip("zstandard")
+    return zstandard.ZstdCompressor().compress(data)
+
+
+def compress_zip(data: bytes) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("annotation.nml", data)
+        archive.writestr("data_Volume.zip", b"")
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize(
+    "suffix,compress",
+    [
+        (".gz", gzip.compress),
+        (".bz2", bz2.compress),
+        (".xz", lzma.compress),
+        (".zst", compress_zstd),
+        (".zip", compress_zip),
+    ],
+)
+def test_parse_compressed_nml(suffix, compress):
+    for input_file in INPUT_FILES:
+        data = Path(input_file).read_bytes()
+        nml = wknml.parse_nml(input_file)
+
+        output_file = f"testoutput/{Path(input_file).name}{suffix}"
+        Path(output_file).write_bytes(compress(data))
+
+        assert wknml.parse_nml(output_file) == nml
+        assert list(wknml.iter_trees(output_file)) == nml.trees
+        with open(output_file, "rb") as f:
+            assert wknml.parse_nml_columnar(f).tree_ids.tolist() == [
+                tree.id for tree in nml.trees
+            ]
+        with wknml.open_nml(output_file) as f:
+            assert f.read() == data
+
+
+def test_parse_concatenated_gzip_streams():
+    input_file = "testdata/complex_dataset.fixture.nml"
+    data = Path(input_file).read_bytes()
+    compressed = gzip.compress(data[:1000]) + gzip.compress(data[1000:])
+
+    assert wknml.parse_nml(io.BytesIO(compressed)) == wknml.parse_nml(input_file)
+
+
+def test_zip_without_single_nml():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("a.nml", b"<things></things>")
+        archive.writestr("b.nml", b"<things></things>")
+
+    with pytest.raises(ValueError):
+        wknml.parse_nml(io.BytesIO(buffer.getvalue()))
+
+
+def test_index_requires_uncompressed_nml():
+    data = Path("testdata/complex_dataset.fixture.nml").read_bytes()
+
+    with pytest.raises(ValueError):
+        wknml.build_nml_index(io.BytesIO(gzip.compress(data)))
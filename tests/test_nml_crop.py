@@ -0,0 +1,103 @@
+import numpy as np
+
+import wknml
+from tests.test_snapshot_readandwrite import INPUT_FILES
+
+
+def create_path_nml(y_of_middle_node: float = 5.0) -> wknml.NML:
+    # A path of five nodes at x = 10, 20, ..., 50 and a single node far away
+    nodes = [
+        wknml.Node(id=i, position=(i * 10.0, y_of_middle_node if i == 3 else 5.0, 5.0))
+        for i in range(1, 6)
+    ]
+    edges = [wknml.Edge(i, i + 1) for i in range(1, 5)]
+    return wknml.NML(
+        parameters=wknml.NMLParameters(name="path", scale=(1.0, 1.0, 1.0)),
+        trees=[
+            wknml.Tree(id=7, color=None, name="path", nodes=nodes, edges=edges),
+            wknml.Tree(
+                id=8,
+                color=None,
+                name="outside",
+                nodes=[wknml.Node(id=6, position=(100.0, 100.0, 100.0))],
+                edges=[],
+            ),
+        ],
+        branchpoints=[wknml.Branchpoint(id=3, time=0)],
+        comments=[wknml.Comment(node=1, content="a"), wknml.Comment(5, "b")],
+        groups=[],
+    )
+
+
+def test_crop_drop():
+    nml = create_path_nml()
+    cropped_nml = wknml.crop(nml, (0, 0, 0, 25, 10, 10))
+
+    assert [tree.id for tree in cropped_nml.trees] == [7]
+    assert [node.id for node in cropped_nml.trees[0].nodes] == [1, 2]
+    assert cropped_nml.trees[0].edges == [wknml.Edge(1, 2)]
+    assert cropped_nml.comments == [wknml.Comment(node=1, content="a")]
+    assert cropped_nml.branchpoints == []
+
+
+def test_crop_split():
+    nml = create_path_nml(y_of_middle_node=50.0)
+    cropped_nml = wknml.crop(nml, (0, 0, 0, 60, 10, 10))
+
+    # The second part gets the next free tree id
+    assert [tree.id for tree in cropped_nml.trees] == [7, 9]
+    assert [tree.name for tree in cropped_nml.trees] == ["path", "path"]
+    assert [[node.id for node in tree.nodes] for tree in cropped_nml.trees] == [
+        [1, 2],
+        [4, 5],
+    ]
+    assert [tree.edges for tree in cropped_nml.trees] == [
+        [wknml.Edge(1, 2)],
+        [wknml.Edge(4, 5)],
+    ]
+    assert cropped_nml.comments == nml.comments
+
+
+def test_crop_clip():
+    nml = create_path_nml(y_of_middle_node=50.0)
+    cropped_nml = wknml.crop(nml, (0, 0, 0, 60, 10, 10), mode="clip")
+
+    # Both edges of node 3 end at a new node on the boundary y = 10
+    assert [[node.id for node in tree.nodes] for tree in cropped_nml.trees] == [
+        [1, 2, 7],
+        [4, 5, 8],
+    ]
+    assert [tree.edges for tree in cropped_nml.trees] == [
+        [wknml.Edge(1, 2), wknml.Edge(2, 7)],
+        [wknml.Edge(8, 4), wknml.Edge(4, 5)],
+    ]
+    assert np.allclose(cropped_nml.trees[0].nodes[2].position, (20 + 10 / 9, 10, 5))
+    assert np.allclose(cropped_nml.trees[1].nodes[2].position, (40 - 10 / 9, 10, 5))
+
+    # The new nodes are inside the box, so cropping again changes nothing
+    assert all(
+        node.position[1] < 10 for tree in cropped_nml.trees for node in tree.nodes
+    )
+    assert wknml.crop(cropped_nml, (0, 0, 0, 60, 10, 10)) == cropped_nml
+
+
+def test_crop_input_files():
+    for input_file in INPUT_FILES:
+        nml = wknml.parse_nml(input_file)
+        positions = np.array(
+            [node.position for tree in nml.trees for node in tree.nodes]
+        )
+        bbox_min = positions.min(axis=0)
+        bbox_size = (positions.max(axis=0) - bbox_min) / 2
+        bbox = (*bbox_min, *bbox_size)
+
+        for mode in wknml.CROP_MODES:
+            cropped_nml = wknml.crop(nml, bbox, mode)
+            cropped_columnar = wknml.crop(wknml.nml_to_columnar(nml), bbox, mode)
+            assert wknml.columnar_to_nml(cropped_columnar) == cropped_nml
+            assert list(wknml.iter_crop(input_file, bbox, mode)) == cropped_nml.trees
+
+            for tree in cropped_nml.trees:
+                tree_positions = np.array([node.position for node in tree.nodes])
+                assert np.all(tree_positions >= bbox_min)
+                assert np.all(tree_positions < bbox_min + bbox_size)
@@ -89,3 +89,29 @@ def test_multiple_user_bounding_boxes():
         test_result_nml = parse_nml(file)
 
     assert len(test_nml.parameters.userBoundingBoxes) == 3
+
+
+def test_generate_graph_attaches_comments_and_branchpoints():
+    test_nml = parse_nml("testdata/nml_with_small_distance_nodes.nml")
+
+    (group_dict, _) = generate_graph(test_nml)
+
+    assert {
+        group_name: [graph.graph["id"] for graph in graphs]
+        for group_name, graphs in group_dict.items()
+    } == {"group1": [1], "group2": [2, 3]}
+
+    graphs = [graph for graphs in group_dict.values() for graph in graphs]
+    assert len(test_nml.comments) > 0 and len(test_nml.branchpoints) > 0
+    for comment in test_nml.comments:
+        assert any(
+            graph.nodes[comment.node]["comment"] == comment.content
+            for graph in graphs
+            if comment.node in graph.nodes
+        )
+    for branchpoint in test_nml.branchpoints:
+        assert any(
+            graph.nodes[branchpoint.id]["branchpoint"] == branchpoint.time
+            for graph in graphs
+            if branchpoint.id in graph.nodes
+        )
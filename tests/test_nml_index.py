@@ -0,0 +1,88 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+import wknml
+from tests.test_snapshot_readandwrite import INPUT_FILES
+
+
+@pytest.fixture(scope="session", autouse=True)
+def create_temp_output_directory():
+    output_directory = Path("testoutput")
+    output_directory.mkdir(exist_ok=True)
+
+
+def test_build_nml_index():
+    for input_file in INPUT_FILES:
+        nml = wknml.parse_nml(input_file)
+        index = wknml.build_nml_index(input_file)
+
+        assert index.file_size == os.path.getsize(input_file)
+        assert index.tree_ids.tolist() == [tree.id for tree in nml.trees]
+        assert index.node_counts.tolist() == [len(tree.nodes) for tree in nml.trees]
+        assert index.edge_counts.tolist() == [len(tree.edges) for tree in nml.trees]
+
+        data = Path(input_file).read_bytes()
+        for start, end in index.tree_ranges.tolist():
+            assert data[start:end].startswith(b"<thing ")
+            assert data[start:end].endswith(b"</thing>")
+        start, end = index.sections["comments"]
+        assert data[start:end].startswith(b"<comments")
+
+
+def test_load_tree():
+    for input_file in INPUT_FILES:
+        nml = wknml.parse_nml(input_file)
+        index = wknml.build_nml_index(input_file)
+
+        with open(input_file, "rb") as f:
+            for tree in reversed(nml.trees):
+                assert wknml.load_tree(f, index, tree.id) == tree
+
+        with pytest.raises(KeyError):
+            wknml.load_tree(input_file, index, -1)
+
+
+def test_parse_nml_with_index():
+    for input_file in INPUT_FILES:
+        index = wknml.build_nml_index(input_file)
+
+        assert wknml.parse_nml(input_file, index=index) == wknml.parse_nml(input_file)
+
+        nml = wknml.parse_nml(input_file)
+        tree = nml.trees[-1]
+        assert wknml.parse_nml(
+            input_file, index=index, tree_ids=[tree.id]
+        ) == nml._replace(trees=[tree])
+        assert wknml.parse_nml(
+            input_file, index=index, sections={"parameters"}
+        ) == wknml.parse_nml(input_file, sections={"parameters"})
+
+
+def test_open_nml_index():
+    path = "testoutput/indexed_dataset.nml"
+    shutil.copyfile(INPUT_FILES[1], path)
+    index_path = Path(path + wknml.nml_index.INDEX_SUFFIX)
+    if index_path.exists():
+        index_path.unlink()
+
+    index = wknml.open_nml_index(path)
+    assert index_path.exists()
+    reloaded = wknml.open_nml_index(path)
+    assert reloaded.sections == index.sections
+    assert reloaded.tree_ranges.tolist() == index.tree_ranges.tolist()
+
+    # A modified file invalidates the sidecar index
+    with open(path, "ab") as f:
+        f.write(b"\n")
+    assert wknml.open_nml_index(path).file_size == index.file_size + 1
+
+    with pytest.raises(ValueError):
+        wknml.parse_nml(path, index=index)
+    with pytest.raises(ValueError):
+        wknml.load_tree(path, index, index.tree_ids[0])
+
+    # The sidecar is replaced atomically without leaving temporary files
+    assert [entry.name for entry in index_path.parent.glob(".tmp-*")] == []
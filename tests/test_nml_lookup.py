@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+import wknml
+from tests.test_snapshot_readandwrite import INPUT_FILES
+
+
+def test_node_index():
+    for input_file in INPUT_FILES:
+        nml = wknml.parse_nml(input_file)
+        index = wknml.NodeIndex(nml)
+
+        assert len(index) == sum(len(tree.nodes) for tree in nml.trees)
+        for tree in nml.trees:
+            assert index.get_tree(tree.id) == tree
+            for node in tree.nodes:
+                assert node.id in index
+                assert index.node(node.id) == node
+                assert index.tree(node.id) == tree
+                assert index.tree_id(node.id) == tree.id
+                assert index.position(node.id) == node.position
+
+        node_ids = [node.id for tree in reversed(nml.trees) for node in tree.nodes]
+        assert index.tree_ids_of(node_ids).tolist() == [
+            tree.id for tree in reversed(nml.trees) for _ in tree.nodes
+        ]
+        assert np.array_equal(
+            index.positions_of(node_ids),
+            [node.position for tree in reversed(nml.trees) for node in tree.nodes],
+        )
+
+
+def test_node_index_comments_and_branchpoints():
+    nml = wknml.parse_nml("testdata/nml_with_small_distance_nodes.nml")
+    index = wknml.NodeIndex(nml)
+
+    for comment in nml.comments:
+        assert index.comment(comment.node) == comment.content
+    for branchpoint in nml.branchpoints:
+        assert index.branchpoint(branchpoint.id) == branchpoint
+    assert index.comment(-1) is None
+    assert index.branchpoint(-1) is None
+
+
+def test_node_index_groups():
+    nml = wknml.parse_nml("testdata/nml_with_small_distance_nodes.nml")
+    index = wknml.NodeIndex(nml)
+
+    assert [tree.id for tree in index.trees_in_group(1)] == [1]
+    assert [tree.id for tree in index.trees_in_group(2)] == [2, 3]
+    assert [tree.id for tree in index.trees_in_group(1, include_subgroups=True)] == [
+        1,
+        2,
+        3,
+    ]
+    assert index.get_group(2).name == "group2"
+
+
+def test_node_index_missing_ids():
+    index = wknml.NodeIndex(wknml.parse_nml(INPUT_FILES[0]))
+
+    assert -1 not in index
+    with pytest.raises(KeyError):
+        index.node(-1)
+    with pytest.raises(KeyError):
+        index.tree_ids_of([-1])
+    with pytest.raises(KeyError):
+        index.get_tree(-1)
+
+
+def test_node_index_empty_tree():
+    nml = wknml.parse_nml(INPUT_FILES[0])
+    empty_tree = wknml.Tree(id=1000, color=None, name="empty", nodes=[], edges=[])
+    nml = nml._replace(trees=[empty_tree, *nml.trees])
+    index = wknml.NodeIndex(nml)
+
+    assert len(index) == len({node.id for tree in nml.trees for node in tree.nodes})
+    assert index.get_tree(1000) == empty_tree
+    node = nml.trees[1].nodes[0]
+    assert index.node(node.id) == node
@@ -0,0 +1,83 @@
+import io
+from pathlib import Path
+
+import pytest
+
+import wknml
+from tests.test_snapshot_readandwrite import INPUT_FILES
+
+
+def get_group_ids(groups):
+    return [
+        group_id
+        for group in groups
+        for group_id in [group.id, *get_group_ids(group.children)]
+    ]
+
+
+def test_merge_nmls():
+    nmls = [wknml.parse_nml(input_file) for input_file in INPUT_FILES]
+    merged_nml = wknml.merge_nmls([*INPUT_FILES, nmls[0]])
+
+    node_ids = [node.id for tree in merged_nml.trees for node in tree.nodes]
+    assert len(set(node_ids)) == len(node_ids) == min(node_ids) + len(node_ids) - 1
+    assert len({tree.id for tree in merged_nml.trees}) == len(merged_nml.trees)
+    group_ids = get_group_ids(merged_nml.groups)
+    assert len(set(group_ids)) == len(group_ids)
+    assert {tree.groupId for tree in merged_nml.trees} <= set(group_ids)
+    assert {comment.node for comment in merged_nml.comments} <= set(node_ids)
+    assert {branchpoint.id for branchpoint in merged_nml.branchpoints} <= set(node_ids)
+
+    # One group per annotation, which contains its original groups
+    assert [group.name for group in merged_nml.groups] == [
+        *(Path(input_file).stem for input_file in INPUT_FILES),
+        "annotation 3",
+    ]
+    assert [len(group.children) for group in merged_nml.groups] == [
+        len(nml.groups) for nml in [*nmls, nmls[0]]
+    ]
+
+    # Apart from the ids, the trees are unchanged
+    assert [[node.position for node in tree.nodes] for tree in merged_nml.trees] == [
+        [node.position for node in tree.nodes]
+        for nml in [*nmls, nmls[0]]
+        for tree in nml.trees
+    ]
+    assert len(merged_nml.comments) == sum(
+        len(nml.comments) for nml in [*nmls, nmls[0]]
+    )
+
+
+def test_merge_nmls_group_by_none():
+    nmls = [wknml.parse_nml(input_file) for input_file in INPUT_FILES]
+    merged_nml = wknml.merge_nmls(nmls, group_by="none")
+
+    assert len(merged_nml.groups) == sum(len(nml.groups) for nml in nmls)
+    assert [tree.groupId is None for tree in merged_nml.trees] == [
+        tree.groupId is None for nml in nmls for tree in nml.trees
+    ]
+
+
+def test_merge_nmls_output():
+    merged_nml = wknml.merge_nmls(INPUT_FILES * 3)
+    assert wknml.merge_nmls(INPUT_FILES * 3, workers=2) == merged_nml
+
+    output = io.BytesIO()
+    assert wknml.merge_nmls(INPUT_FILES * 3, output=output) is None
+    expected_output = io.BytesIO()
+    wknml.write_nml(expected_output, merged_nml)
+    assert output.getvalue() == expected_output.getvalue()
+
+
+def test_merge_nmls_errors():
+    nml = wknml.parse_nml(INPUT_FILES[0])
+    other_scale_nml = nml._replace(
+        parameters=nml.parameters._replace(scale=(1.0, 2.0, 3.0))
+    )
+
+    with pytest.raises(ValueError):
+        wknml.merge_nmls([nml, other_scale_nml])
+    with pytest.raises(ValueError):
+        wknml.merge_nmls([])
+    with pytest.raises(ValueError):
+        wknml.merge_nmls([nml], group_by="tree")
@@ -0,0 +1,98 @@
+import io
+import os
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+import wknml
+from tests.test_nml_parsing import write_nml_with_many_trees
+from tests.test_snapshot_readandwrite import INPUT_FILES
+
+
+@pytest.fixture(scope="session", autouse=True)
+def create_temp_output_directory():
+    output_directory = Path("testoutput")
+    output_directory.mkdir(exist_ok=True)
+
+
+def test_parse_nml_parallel():
+    for input_file in INPUT_FILES:
+        assert wknml.parse_nml(input_file, workers=2) == wknml.parse_nml(input_file)
+
+    path = "testoutput/parallel.nml"
+    write_nml_with_many_trees(path, num_trees=50, nodes_per_tree=20)
+    nml = wknml.parse_nml(path)
+
+    with open(path, "rb") as f:
+        assert wknml.parse_nml(f, workers=3) == nml
+    assert wknml.parse_nml_parallel(path, workers=2, tree_ids=[7, 3]) == nml._replace(
+        trees=[tree for tree in nml.trees if tree.id in (3, 7)]
+    )
+    assert wknml.parse_nml_parallel(
+        path, workers=2, sections={"parameters"}
+    ) == wknml.parse_nml(path, sections={"parameters"})
+
+
+def test_write_nml_parallel():
+    path = "testoutput/parallel_write.nml"
+    write_nml_with_many_trees(path, num_trees=50, nodes_per_tree=20)
+    nmls = [wknml.parse_nml(input_file) for input_file in [*INPUT_FILES, path]]
+
+    for nml in nmls:
+        for options in [
+            {},
+            {"decimals": 1},
+            {"compression": "gzip"},
+            {"compression": "gzip", "threads": 2},
+        ]:
+            serial_output = io.BytesIO()
+            wknml.write_nml(serial_output, nml, **options)
+            for data in [nml, wknml.nml_to_columnar(nml)]:
+                parallel_output = io.BytesIO()
+                wknml.write_nml(parallel_output, data, workers=3, **options)
+                assert parallel_output.getvalue() == serial_output.getvalue()
+
+    wknml.write_nml_parallel("testoutput/parallel_written.nml", nmls[-1], workers=2)
+    assert wknml.parse_nml("testoutput/parallel_written.nml") == nmls[-1]
+
+
+@pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="workers are only forked on Linux"
+)
+def test_write_nml_parallel_forks_without_threads(monkeypatch):
+    nml = wknml.parse_nml(INPUT_FILES[1])
+    # Small blocks start the compression threads as early as possible
+    monkeypatch.setattr(wknml.NMLWriter, "_COMPRESSION_BLOCK_SIZE", 100)
+    thread_counts = []
+    os.register_at_fork(before=lambda: thread_counts.append(threading.active_count()))
+
+    output = io.BytesIO()
+    wknml.write_nml(output, nml, workers=2, compression="gzip", threads=2)
+
+    # No compression or pool management threads run when the workers are forked
+    assert len(thread_counts) == 2
+    assert all(count == 1 for count in thread_counts)
+
+
+def count_nodes(nml: wknml.NML) -> int:
+    return sum(len(tree.nodes) for tree in nml.trees)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parse_many(workers):
+    invalid_file = "testoutput/invalid.nml"
+    Path(invalid_file).write_text("<things><thing id=")
+    paths = INPUT_FILES + [invalid_file, "testoutput/missing.nml"] + INPUT_FILES
+
+    results = list(wknml.parse_many(paths, workers=workers, ordered=True, chunksize=2))
+    assert [path for path, _ in results] == paths
+    for path, result in results:
+        if path in INPUT_FILES:
+            assert result == wknml.parse_nml(path)
+        else:
+            assert isinstance(result, Exception)
+
+    results = dict(wknml.parse_many(INPUT_FILES, workers=workers, function=count_nodes))
+    assert results == {path: count_nodes(wknml.parse_nml(path)) for path in INPUT_FILES}
@@ -0,0 +1,207 @@
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+import wknml
+from tests.test_snapshot_readandwrite import INPUT_FILES
+
+
+@pytest.fixture(scope="session", autouse=True)
+def create_temp_output_directory():
+    output_directory = Path("testoutput")
+    output_directory.mkdir(exist_ok=True)
+
+
+def write_nml_with_many_trees(path: str, num_trees: int, nodes_per_tree: int):
+    trees = [
+        wknml.Tree(
+            id=tree_id,
+            color=(1.0, 0.0, 0.0, 1.0),
+            name=f"tree{tree_id}",
+            nodes=[
+                wknml.Node(
+                    id=tree_id * nodes_per_tree + i,
+                    position=(float(i), float(tree_id), 0.0),
+                    radius=1.0,
+                )
+                for i in range(nodes_per_tree)
+            ],
+            edges=[
+                wknml.Edge(
+                    tree_id * nodes_per_tree + i, tree_id * nodes_per_tree + i + 1
+                )
+                for i in range(nodes_per_tree - 1)
+            ],
+        )
+        for tree_id in range(num_trees)
+    ]
+    nml = wknml.NML(
+        parameters=wknml.NMLParameters(name="Test", scale=(1.0, 1.0, 1.0)),
+        trees=trees,
+        branchpoints=[],
+        comments=[wknml.Comment(node=0, content="first")],
+        groups=[],
+    )
+    with open(path, "wb") as f:
+        wknml.write_nml(f, nml)
+    return nml
+
+
+@pytest.mark.parametrize("engine", ["expat", "etree"])
+def test_iter_trees(engine):
+    for input_file in INPUT_FILES:
+        nml = wknml.parse_nml(input_file)
+
+        with open(input_file, "rb") as f:
+            assert list(wknml.iter_trees(f, engine=engine)) == nml.trees
+
+        metadata = wknml.parse_nml_metadata(input_file, engine=engine)
+        assert metadata == nml._replace(trees=[])
+
+
+def test_iter_trees_is_lazy():
+    path = "testoutput/many_trees.nml"
+    write_nml_with_many_trees(path, num_trees=400, nodes_per_tree=50)
+
+    tracemalloc.start()
+    nml = wknml.parse_nml(path)
+    _, parse_peak = tracemalloc.get_traced_memory()
+    del nml
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    num_nodes = sum(len(tree.nodes) for tree in wknml.iter_trees(path))
+    _, stream_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert num_nodes == 400 * 50
+    assert stream_peak < parse_peak / 4
+
+
+def test_parse_selected_trees():
+    input_file = "testdata/complex_dataset.fixture.nml"
+    nml = wknml.parse_nml(input_file)
+    first_tree, grouped_tree = nml.trees
+    assert first_tree.groupId is None and grouped_tree.groupId is not None
+
+    selected = wknml.parse_nml(input_file, tree_ids=[first_tree.id])
+    assert selected == nml._replace(trees=[first_tree])
+
+    selected = wknml.parse_nml(input_file, group_ids=[grouped_tree.groupId])
+    assert selected.trees == [grouped_tree]
+
+    selected = wknml.parse_nml(
+        input_file, tree_ids=[first_tree.id], group_ids=[grouped_tree.groupId]
+    )
+    assert selected.trees == []
+
+    trees = wknml.iter_trees(input_file, tree_ids=[grouped_tree.id])
+    assert list(trees) == [grouped_tree]
+
+    columnar = wknml.parse_nml_columnar(input_file, group_ids=[grouped_tree.groupId])
+    assert wknml.columnar_to_nml(columnar).trees == [grouped_tree]
+
+
+def test_parse_selected_sections():
+    for input_file in INPUT_FILES:
+        nml = wknml.parse_nml(input_file)
+
+        selected = wknml.parse_nml(input_file, sections={"parameters", "comments"})
+        assert selected == wknml.NML(
+            parameters=nml.parameters,
+            trees=[],
+            branchpoints=[],
+            comments=nml.comments,
+            groups=[],
+        )
+
+        selected = wknml.parse_nml(input_file, sections={"trees", "groups"})
+        assert selected.parameters is None
+        assert selected.trees == nml.trees
+        assert selected.groups == nml.groups
+
+    with pytest.raises(ValueError):
+        wknml.parse_nml(INPUT_FILES[0], sections={"nodes"})
+
+
+def test_parse_parameters_stops_early():
+    class CountingReader:
+        def __init__(self, f):
+            self.f = f
+            self.bytes_read = 0
+
+        def read(self, size=-1):
+            chunk = self.f.read(size)
+            self.bytes_read += len(chunk)
+            return chunk
+
+    path = "testoutput/many_trees.nml"
+    write_nml_with_many_trees(path, num_trees=400, nodes_per_tree=50)
+
+    with open(path, "rb") as f:
+        reader = CountingReader(f)
+        nml = wknml.parse_nml(reader, engine="expat", sections={"parameters"})
+
+    assert nml.parameters.name == "Test"
+    assert reader.bytes_read < Path(path).stat().st_size
+
+
+def test_skip_node_attributes():
+    nml = wknml.parse_nml(INPUT_FILES[0])
+    skipped = wknml.parse_nml(INPUT_FILES[0], skip_node_attributes=True)
+
+    for tree, skipped_tree in zip(nml.trees, skipped.trees):
+        assert skipped_tree.edges == tree.edges
+        assert skipped_tree.nodes == [
+            wknml.Node(id=node.id, position=node.position) for node in tree.nodes
+        ]
+
+
+class TinyChunkReader:
+    # Returns at most a few bytes per read() call to exercise chunk boundaries
+    def __init__(self, path: str, chunk_size: int):
+        self.data = Path(path).read_bytes()
+        self.position = 0
+        self.chunk_size = chunk_size
+
+    def read(self, size=-1):
+        chunk = self.data[self.position : self.position + self.chunk_size]
+        self.position += len(chunk)
+        return chunk
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 7, 8, 13, 1000])
+def test_skipped_trees_across_chunk_boundaries(chunk_size):
+    input_file = "testdata/complex_dataset.fixture.nml"
+    nml = wknml.parse_nml(input_file)
+
+    metadata = wknml.parse_nml_metadata(TinyChunkReader(input_file, chunk_size))
+    assert metadata == nml._replace(trees=[])
+
+    for tree in nml.trees:
+        selected = wknml.parse_nml(
+            TinyChunkReader(input_file, chunk_size), tree_ids=[tree.id]
+        )
+        assert selected == nml._replace(trees=[tree])
+
+
+def test_skip_trees_without_trees():
+    nml = wknml.parse_nml(INPUT_FILES[1])._replace(
+        trees=[], comments=[wknml.Comment(node=i, content="c") for i in range(2000)]
+    )
+    path = "testoutput/no_trees.nml"
+    with open(path, "wb") as f:
+        wknml.write_nml(f, nml)
+    data = Path(path).read_bytes()
+
+    # The <things> root tag is no truncated <thing> start tag, so everything but a few
+    # bytes is passed on right away instead of being kept in the buffer
+    skip_trees = vars(wknml)["__skip_trees"]
+    chunks = [data[i : i + 64] for i in range(0, len(data), 64)]
+    num_passed = 0
+    for num_read, output in enumerate(skip_trees(chunks, None), start=1):
+        num_passed += len(output)
+        assert num_passed >= min(num_read * 64, len(data)) - 6
+
+    assert wknml.parse_nml_metadata(TinyChunkReader(path, 64)) == nml
@@ -0,0 +1,83 @@
+import io
+
+import numpy as np
+import pytest
+
+import wknml
+from tests.test_snapshot_readandwrite import INPUT_FILES
+
+scipy_csgraph = pytest.importorskip("scipy.sparse.csgraph")
+
+
+def sort_edges(nml: wknml.NML) -> wknml.NML:
+    return nml._replace(
+        trees=[tree._replace(edges=sorted(tree.edges)) for tree in nml.trees]
+    )
+
+
+def test_csr_roundtrip():
+    for input_file in INPUT_FILES:
+        nml = wknml.parse_nml(input_file)
+        graph = wknml.to_csr(nml)
+
+        num_nodes = sum(len(tree.nodes) for tree in nml.trees)
+        assert graph.adjacency.shape == (num_nodes, num_nodes)
+        assert graph.adjacency.nnz == sum(len(tree.edges) for tree in nml.trees)
+        assert graph.node_ids.tolist() == [
+            node.id for tree in nml.trees for node in tree.nodes
+        ]
+        assert graph.tree_ids.tolist() == [
+            tree.id for tree in nml.trees for _ in tree.nodes
+        ]
+
+        assert sort_edges(wknml.from_csr(graph, nml)) == sort_edges(nml)
+
+
+def test_csr_of_single_tree():
+    nml = wknml.parse_nml(INPUT_FILES[1])
+    tree = nml.trees[1]
+    graph = wknml.to_csr(tree)
+
+    assert graph.node_ids.tolist() == [node.id for node in tree.nodes]
+    assert np.array_equal(graph.positions, [node.position for node in tree.nodes])
+    (result,) = wknml.from_csr(graph).trees
+    assert [node.id for node in result.nodes] == [node.id for node in tree.nodes]
+    assert sorted(result.edges) == sorted(tree.edges)
+
+
+def test_from_csr_splits_components():
+    nml = wknml.parse_nml(INPUT_FILES[1])
+    tree = nml.trees[1]
+    graph = wknml.to_csr(tree)
+    num_components, _ = scipy_csgraph.connected_components(
+        graph.adjacency, directed=False
+    )
+
+    # Remove the first edge and make the matrix symmetric
+    adjacency = graph.adjacency.tolil()
+    source, target = adjacency.nonzero()
+    adjacency[source[0], target[0]] = 0
+    adjacency = adjacency.tocsr()
+    split_nml = wknml.from_csr(
+        graph._replace(adjacency=adjacency + adjacency.T, tree_ids=None)
+    )
+
+    assert len(split_nml.trees) == num_components + 1
+    assert sum(len(tree.edges) for tree in split_nml.trees) == len(tree.edges) - 1
+    assert sorted(node.id for tree in split_nml.trees for node in tree.nodes) == sorted(
+        node.id for node in tree.nodes
+    )
+
+
+def test_from_csr_can_be_written():
+    nml = wknml.parse_nml(INPUT_FILES[1])
+    graph = wknml.to_csr(nml)
+
+    for split_nml in [
+        wknml.from_csr(graph),
+        wknml.from_csr(graph._replace(tree_ids=None), nml),
+    ]:
+        output = io.BytesIO()
+        wknml.write_nml(output, split_nml)
+        output.seek(0)
+        assert wknml.parse_nml(output).trees == split_nml.trees
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+import wknml
+from tests.test_snapshot_readandwrite import INPUT_FILES
+
+pytest.importorskip("scipy")
+
+
+def test_spatial_index():
+    for input_file in INPUT_FILES:
+        nml = wknml.parse_nml(input_file)
+        index = wknml.SpatialIndex(nml)
+        scale = np.array(nml.parameters.scale)
+
+        node_ids = np.array([node.id for tree in nml.trees for node in tree.nodes])
+        tree_ids = np.array([tree.id for tree in nml.trees for node in tree.nodes])
+        positions = (
+            np.array([node.position for tree in nml.trees for node in tree.nodes])
+            * scale
+        )
+        assert len(index) == len(node_ids)
+
+        rng = np.random.default_rng(0)
+        points = positions[rng.integers(0, len(positions), 10)] + rng.normal(
+            0, 100, (10, 3)
+        )
+        distances, found_node_ids, found_tree_ids = index.query(points, k=3)
+        assert distances.shape == (10, 3)
+        for point, point_distances, point_node_ids, point_tree_ids in zip(
+            points, distances, found_node_ids, found_tree_ids
+        ):
+            expected_distances = np.linalg.norm(positions - point, axis=1)
+            order = np.argsort(expected_distances, kind="stable")[:3]
+            assert np.allclose(point_distances, expected_distances[order])
+            assert np.allclose(
+                np.linalg.norm(
+                    index.positions[np.isin(index.node_ids, point_node_ids)] - point,
+                    axis=1,
+                ).max(),
+                point_distances.max(),
+            )
+            assert set(point_tree_ids) <= set(tree_ids)
+
+            radius = expected_distances[order[-1]] * 2
+            radius_node_ids, _ = index.query_radius(point, radius)
+            assert sorted(radius_node_ids) == sorted(
+                node_ids[expected_distances <= radius]
+            )
+
+        bbox_min = positions.min(axis=0)
+        bbox_max = (positions.min(axis=0) + positions.max(axis=0)) / 2
+        bbox_node_ids, bbox_tree_ids = index.query_bbox(bbox_min, bbox_max)
+        inside = np.all((positions >= bbox_min) & (positions <= bbox_max), axis=1)
+        assert bbox_node_ids.tolist() == node_ids[inside].tolist()
+        assert bbox_tree_ids.tolist() == tree_ids[inside].tolist()
+
+        columnar_index = wknml.SpatialIndex(wknml.nml_to_columnar(nml))
+        assert np.array_equal(columnar_index.positions, index.positions)
+        assert np.array_equal(columnar_index.tree_ids, index.tree_ids)
+
+
+def test_spatial_index_missing_neighbors():
+    nml = wknml.parse_nml(INPUT_FILES[0])
+    index = wknml.SpatialIndex(nml)
+
+    distances, node_ids, tree_ids = index.query(
+        index.positions[0], k=len(index) + 1, max_distance=1e-9
+    )
+    assert distances.shape == (len(index) + 1,)
+    num_found = np.count_nonzero(np.all(index.positions == index.positions[0], axis=1))
+    assert np.all(distances[:num_found] == 0)
+    assert np.all(np.isinf(distances[num_found:]))
+    assert np.all(node_ids[num_found:] == -1) and np.all(tree_ids[num_found:] == -1)
+
+
+def test_spatial_index_empty_tree():
+    nml = wknml.parse_nml(INPUT_FILES[0])
+    empty_tree = wknml.Tree(id=1000, color=None, name="empty", nodes=[], edges=[])
+    index = wknml.SpatialIndex(nml._replace(trees=[empty_tree, *nml.trees]))
+
+    assert np.array_equal(index.positions, wknml.SpatialIndex(nml).positions)
+    assert 1000 not in index.tree_ids
@@ -0,0 +1,86 @@
+import numpy as np
+
+import wknml
+from wknml.nml_utils import calculate_distance_between_nodes
+from tests.test_snapshot_readandwrite import INPUT_FILES
+
+
+def test_stats():
+    for input_file in INPUT_FILES:
+        nml = wknml.parse_nml(input_file)
+        scale = np.array(nml.parameters.scale)
+        nml_stats = wknml.stats(nml)
+        tree_stats = nml_stats.trees
+
+        assert tree_stats.tree_ids.tolist() == [tree.id for tree in nml.trees]
+        for i, tree in enumerate(nml.trees):
+            nodes = {node.id: node._asdict() for node in tree.nodes}
+            degrees = {node_id: 0 for node_id in nodes}
+            for edge in tree.edges:
+                degrees[edge.source] += 1
+                degrees[edge.target] += 1
+            cable_length = sum(
+                calculate_distance_between_nodes(
+                    nodes[edge.source], nodes[edge.target], scale
+                )
+                for edge in tree.edges
+            )
+
+            assert tree_stats.num_nodes[i] == len(tree.nodes)
+            assert tree_stats.num_edges[i] == len(tree.edges)
+            assert np.isclose(tree_stats.cable_length[i], cable_length)
+            assert tree_stats.num_branch_nodes[i] == sum(
+                degree > 2 for degree in degrees.values()
+            )
+            assert tree_stats.num_leaf_nodes[i] == sum(
+                degree <= 1 for degree in degrees.values()
+            )
+            positions = np.array([node.position for node in tree.nodes]) * scale
+            assert np.allclose(tree_stats.bbox_min[i], positions.min(axis=0))
+            assert np.allclose(tree_stats.bbox_max[i], positions.max(axis=0))
+
+        assert nml_stats.num_trees == len(nml.trees)
+        assert nml_stats.num_nodes == tree_stats.num_nodes.sum()
+        assert nml_stats.num_edges == tree_stats.num_edges.sum()
+        assert np.isclose(nml_stats.cable_length, tree_stats.cable_length.sum())
+        assert nml_stats.num_leaf_nodes == tree_stats.num_leaf_nodes.sum()
+        assert np.allclose(nml_stats.bbox_min, tree_stats.bbox_min.min(axis=0))
+        assert np.allclose(nml_stats.bbox_max, tree_stats.bbox_max.max(axis=0))
+
+        columnar_stats = wknml.stats(wknml.nml_to_columnar(nml))
+        assert np.array_equal(
+            columnar_stats.trees.cable_length, tree_stats.cable_length
+        )
+
+
+def test_stats_empty_tree():
+    nml = wknml.NML(
+        parameters=wknml.NMLParameters(name="test", scale=(2.0, 2.0, 4.0)),
+        trees=[
+            wknml.Tree(id=1, color=None, name="empty", nodes=[], edges=[]),
+            wknml.Tree(
+                id=2,
+                color=None,
+                name="star",
+                nodes=[
+                    wknml.Node(id=1, position=(0, 0, 0)),
+                    wknml.Node(id=2, position=(1, 0, 0)),
+                    wknml.Node(id=3, position=(0, 1, 0)),
+                    wknml.Node(id=4, position=(0, 0, 1)),
+                ],
+                edges=[wknml.Edge(1, 2), wknml.Edge(1, 3), wknml.Edge(1, 4)],
+            ),
+        ],
+        branchpoints=[],
+        comments=[],
+        groups=[],
+    )
+    nml_stats = wknml.stats(nml)
+
+    assert nml_stats.trees.num_nodes.tolist() == [0, 4]
+    assert nml_stats.trees.cable_length.tolist() == [0.0, 8.0]
+    assert nml_stats.trees.num_branch_nodes.tolist() == [0, 1]
+    assert nml_stats.trees.num_leaf_nodes.tolist() == [0, 3]
+    assert np.isnan(nml_stats.trees.bbox_min[0]).all()
+    assert nml_stats.trees.bbox_max[1].tolist() == [2.0, 2.0, 4.0]
+    assert nml_stats.bbox_min.tolist() == [0.0, 0.0, 0.0]
@@ -1,7 +1,16 @@
 from typing import Dict, List
 import networkx as nx
 import numpy as np
-from wknml import parse_nml
+from wknml import (
+    parse_nml,
+    nml_to_columnar,
+    columnar_to_nml,
+    NML,
+    NMLParameters,
+    Node,
+    Edge,
+    Tree,
+)
 from wknml.nml_generation import generate_graph
 from wknml.nml_utils import (
     ensure_max_edge_length,
@@ -33,6 +42,53 @@ def test_ensure_max_edge_length():
     assert is_max_length_violated(test_result_nml, max_length, scale)
 
 
+def test_ensure_max_edge_length_vectorized():
+    with open("testdata/nml_with_too_long_edges.nml", "r") as file:
+        test_nml = parse_nml(file)
+    max_length = 2.0
+    scale = np.array(test_nml.parameters.scale)
+    max_id = max(node.id for tree in test_nml.trees for node in tree.nodes)
+
+    test_result_nml = ensure_max_edge_length(test_nml, max_length)
+    for tree, result_tree in zip(test_nml.trees, test_result_nml.trees):
+        assert result_tree.id == tree.id
+        assert result_tree.nodes[: len(tree.nodes)] == tree.nodes
+        nodes_by_id = {node.id: node._asdict() for node in result_tree.nodes}
+        for edge in result_tree.edges:
+            assert (
+                calculate_distance_between_nodes(
+                    nodes_by_id[edge.source], nodes_by_id[edge.target], scale
+                )
+                <= max_length
+            )
+    assert test_result_nml.comments == test_nml.comments
+    assert test_result_nml.groups == test_nml.groups
+
+    # padding nodes get consecutive new ids
+    padding_ids = sorted(
+        node.id
+        for tree in test_result_nml.trees
+        for node in tree.nodes
+        if node.id > max_id
+    )
+    assert padding_ids == list(range(max_id + 1, max_id + 1 + len(padding_ids)))
+    assert len(padding_ids) > 0
+
+    # the graph version inserts the same number of nodes
+    test_result_nml_graph, _ = ensure_max_edge_length(
+        generate_graph(test_nml), max_length
+    )
+    assert len(padding_ids) == sum(
+        graph.number_of_nodes()
+        for group in test_result_nml_graph.values()
+        for graph in group
+    ) - sum(len(tree.nodes) for tree in test_nml.trees)
+
+    # columnar input returns columnar output
+    test_result_columnar = ensure_max_edge_length(nml_to_columnar(test_nml), max_length)
+    assert columnar_to_nml(test_result_columnar) == test_result_nml
+
+
 def is_max_length_violated(
     graph_dict: Dict[str, List[nx.Graph]], max_length: float, scale: np.ndarray
 ):
@@ -77,6 +133,69 @@ def test_approximate_minimal_edge_length():
     )
 
 
+def test_approximate_minimal_edge_length_vectorized():
+    with open("testdata/nml_with_small_distance_nodes.nml", "r") as file:
+        test_nml = parse_nml(file)
+    max_length = 2.0
+    max_angle = 0.2
+    scale = np.array(test_nml.parameters.scale)
+
+    test_result_nml = approximate_minimal_edge_length(test_nml, max_length, max_angle)
+    assert [tree.id for tree in test_result_nml.trees] == [
+        tree.id for tree in test_nml.trees
+    ]
+    test_result_nml_graph, _ = generate_graph(test_result_nml)
+    assert is_minimal_edge_length_violated(
+        test_result_nml_graph, max_length, max_angle, scale
+    )
+    remaining_ids = {node.id for tree in test_result_nml.trees for node in tree.nodes}
+    assert all(comment.node in remaining_ids for comment in test_result_nml.comments)
+
+    # the result does not depend on the order of nodes and edges
+    reversed_nml = test_nml._replace(
+        trees=[
+            tree._replace(nodes=tree.nodes[::-1], edges=tree.edges[::-1])
+            for tree in test_nml.trees
+        ]
+    )
+    reversed_result_nml = approximate_minimal_edge_length(
+        reversed_nml, max_length, max_angle
+    )
+    for tree, reversed_tree in zip(test_result_nml.trees, reversed_result_nml.trees):
+        assert set(tree.nodes) == set(reversed_tree.nodes)
+        assert set(tree.edges) == set(reversed_tree.edges)
+
+    # columnar input returns columnar output
+    test_result_columnar = approximate_minimal_edge_length(
+        nml_to_columnar(test_nml), max_length, max_angle
+    )
+    assert columnar_to_nml(test_result_columnar) == test_result_nml
+
+
+def test_approximate_minimal_edge_length_straight_path():
+    num_nodes = 10000
+    nodes = [Node(id=i, position=(float(i), 0.0, 0.0)) for i in range(1, num_nodes + 1)]
+    edges = [Edge(i, i + 1) for i in range(1, num_nodes)]
+    test_nml = NML(
+        parameters=NMLParameters(name="straight", scale=(1.0, 1.0, 1.0)),
+        trees=[Tree(id=1, color=None, name="line", nodes=nodes, edges=edges)],
+        branchpoints=[],
+        comments=[],
+        groups=[],
+    )
+
+    (tree,) = approximate_minimal_edge_length(test_nml, 10.0, 0.1).trees
+    # the end nodes are kept and the path stays connected in its direction
+    assert tree.nodes[0].id == 1 and tree.nodes[-1].id == num_nodes
+    assert len(tree.edges) == len(tree.nodes) - 1
+    positions = {node.id: node.position[0] for node in tree.nodes}
+    for edge in tree.edges:
+        assert 0 < positions[edge.target] - positions[edge.source] <= 10.0
+    # no further node can be removed without exceeding the maximum length
+    lengths = [positions[edge.target] - positions[edge.source] for edge in tree.edges]
+    assert all(a + b > 10.0 for a, b in zip(lengths, lengths[1:]))
+
+
 def is_minimal_edge_length_violated(
     graph_dict: Dict[str, List[nx.Graph]],
     max_length: float,
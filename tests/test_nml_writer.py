@@ -0,0 +1,217 @@
+import io
+import tracemalloc
+import zipfile
+from pathlib import Path
+
+import pytest
+
+import wknml
+from tests.test_snapshot_readandwrite import INPUT_FILES
+
+
+@pytest.fixture(scope="session", autouse=True)
+def create_temp_output_directory():
+    output_directory = Path("testoutput")
+    output_directory.mkdir(exist_ok=True)
+
+
+def write_nml_to_bytes(nml: wknml.NML) -> bytes:
+    output = io.BytesIO()
+    wknml.write_nml(output, nml)
+    return output.getvalue()
+
+
+def test_nml_writer():
+    for input_file in INPUT_FILES:
+        nml = wknml.parse_nml(input_file)
+        output_path = Path("testoutput") / ("writer_" + Path(input_file).name)
+
+        with wknml.NMLWriter(output_path, nml.parameters) as writer:
+            for tree in nml.trees:
+                writer.write_tree(tree)
+            # Each part can be written in several calls
+            writer.write_branchpoints(nml.branchpoints[:1])
+            writer.write_branchpoints(nml.branchpoints[1:])
+            writer.write_comments(nml.comments)
+            writer.write_groups(nml.groups)
+            if nml.volume is not None:
+                writer.write_volume(nml.volume)
+
+        assert output_path.read_bytes() == write_nml_to_bytes(nml)
+
+
+def test_nml_writer_empty_parts():
+    nml = wknml.parse_nml(INPUT_FILES[0])
+
+    output = io.BytesIO()
+    with wknml.NMLWriter(output, nml.parameters) as writer:
+        writer.write_comments([])
+    assert not output.closed
+
+    assert output.getvalue() == write_nml_to_bytes(
+        nml._replace(trees=[], branchpoints=[], comments=[], groups=[], volume=None)
+    )
+
+
+def test_nml_writer_order():
+    nml = wknml.parse_nml(INPUT_FILES[0])
+
+    with wknml.NMLWriter(io.BytesIO(), nml.parameters) as writer:
+        writer.write_comments(nml.comments)
+        with pytest.raises(ValueError):
+            writer.write_tree(nml.trees[0])
+        with pytest.raises(ValueError):
+            writer.write_branchpoints(nml.branchpoints)
+
+    with pytest.raises(ValueError):
+        writer.write_groups(nml.groups)
+
+
+@pytest.mark.parametrize("compression", wknml.COMPRESSIONS)
+def test_nml_writer_compression(compression, monkeypatch):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+
+    for input_file in INPUT_FILES:
+        nml = wknml.parse_nml(input_file)
+        output_path = Path("testoutput") / (Path(input_file).stem + "." + compression)
+
+        with open(output_path, "wb") as f:
+            wknml.write_nml(f, nml, compression=compression, threads=4)
+        assert wknml.parse_nml(output_path) == nml
+        with wknml.open_nml(output_path) as f:
+            assert f.read() == write_nml_to_bytes(nml)
+
+        if compression != "zip":
+            # Small blocks give several gzip members or zstd frames
+            monkeypatch.setattr(wknml.NMLWriter, "_COMPRESSION_BLOCK_SIZE", 1000)
+            output = io.BytesIO()
+            wknml.write_nml(output, nml, compression=compression)
+            monkeypatch.undo()
+            assert output.getvalue() != output_path.read_bytes()
+            output.seek(0)
+            assert wknml.parse_nml(output) == nml
+
+
+def test_nml_writer_compression_threads():
+    nml = wknml.parse_nml(INPUT_FILES[0])
+    outputs = []
+    for threads in [1, 3]:
+        output = io.BytesIO()
+        wknml.write_nml(output, nml, compression="gzip", threads=threads)
+        outputs.append(output.getvalue())
+    assert outputs[0] == outputs[1]
+
+
+def test_nml_writer_zip_member():
+    nml = wknml.parse_nml(INPUT_FILES[0])
+    output_path = Path("testoutput") / "annotation.zip"
+    with wknml.NMLWriter(output_path, nml.parameters, "zip") as writer:
+        writer.write_trees(nml.trees)
+
+    with zipfile.ZipFile(output_path) as archive:
+        assert archive.namelist() == ["annotation.nml"]
+
+
+def test_nml_writer_compression_errors():
+    nml = wknml.parse_nml(INPUT_FILES[0])
+    with pytest.raises(ValueError):
+        wknml.write_nml(io.BytesIO(), nml, compression="brotli")
+    with pytest.raises(ValueError):
+        wknml.write_nml(io.BytesIO(), nml, compression="gzip", threads=0)
+    with pytest.raises(ValueError):
+        wknml.write_nml(io.BytesIO(), nml, engine="loxun", compression="gzip")
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"decimals": 2},
+        {"decimals": 0, "node_defaults": {"rotation": (0, 0, 0), "inVp": 0}},
+        {"node_defaults": {"interpolation": True, "bitDepth": 8, "time": 0}},
+    ],
+)
+def test_nml_writer_columnar(options):
+    for input_file in INPUT_FILES:
+        nml = wknml.parse_nml(input_file)
+        columnar = wknml.nml_to_columnar(nml)
+
+        outputs = []
+        for write_trees in [
+            lambda writer: writer.write_trees(nml.trees),
+            lambda writer: writer.write_trees_columnar(columnar),
+        ]:
+            output = io.BytesIO()
+            with wknml.NMLWriter(output, nml.parameters, **options) as writer:
+                write_trees(writer)
+            outputs.append(output.getvalue())
+        assert outputs[0] == outputs[1]
+
+        if not options:
+            assert write_nml_to_bytes(columnar) == write_nml_to_bytes(nml)
+
+
+def test_nml_writer_number_formatting():
+    node = wknml.Node(
+        id=1,
+        position=(1234.0, 1.23456, -0.0004),
+        radius=1.5,
+        rotation=(0.0, 0.0, 0.0),
+        inVp=0,
+        time=5,
+    )
+    nml = wknml.NML(
+        parameters=wknml.NMLParameters(name="test", scale=(1.0, 1.0, 1.0)),
+        trees=[wknml.Tree(1, (1.0, 0.0, 0.0, 1.0), "", [node], [])],
+        branchpoints=[],
+        comments=[],
+        groups=[],
+    )
+
+    output = io.BytesIO()
+    wknml.write_nml(
+        output,
+        nml,
+        decimals=2,
+        node_defaults={"rotation": (0.0, 0.0, 0.0), "inVp": 0, "time": 0},
+    )
+    assert b'<node id="1" radius="1.5" time="5" x="1234" y="1.23" z="0" />' in (
+        output.getvalue()
+    )
+
+    output.seek(0)
+    assert wknml.parse_nml(output).trees[0].nodes == [
+        wknml.Node(id=1, position=(1234.0, 1.23, 0.0), radius=1.5, time=5)
+    ]
+
+    with pytest.raises(ValueError):
+        wknml.write_nml(io.BytesIO(), nml, node_defaults={"position": (0, 0, 0)})
+    with pytest.raises(ValueError):
+        wknml.write_nml(io.BytesIO(), nml, engine="loxun", decimals=2)
+
+
+def test_nml_writer_memory():
+    tree = wknml.parse_nml(INPUT_FILES[1]).trees[0]
+    parameters = wknml.NMLParameters(name="test", scale=(1.0, 1.0, 1.0))
+
+    class CountingFile:
+        def __init__(self):
+            self.num_bytes = 0
+
+        def write(self, data: bytes):
+            self.num_bytes += len(data)
+
+    def measure_peak(num_trees: int) -> int:
+        output = CountingFile()
+        tracemalloc.start()
+        with wknml.NMLWriter(output, parameters) as writer:
+            for tree_id in range(num_trees):
+                writer.write_tree(tree._replace(id=tree_id))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert output.num_bytes > 0
+        return peak
+
+    # Only the write buffer is held in memory, whatever the number of trees
+    assert measure_peak(2000) < 2 * measure_peak(200)
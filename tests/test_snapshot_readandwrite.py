@@ -1,3 +1,4 @@
+import io
 import pickle
 from pathlib import Path
 
@@ -42,3 +43,84 @@ def test_snapshot_read_and_compare_nml():
             wknml.write_nml(f, parsed)
 
         assert filecmp.cmp(snapshot_file + ".snapshot", output_file)
+
+
+@pytest.mark.parametrize("engine", ["expat", "lxml", "etree"])
+def test_parser_engines(engine):
+    if engine == "lxml":
+        pytest.importorskip("lxml")
+
+    for input_file in INPUT_FILES:
+        expected = wknml.parse_nml(input_file, engine="etree")
+
+        assert wknml.parse_nml(input_file, engine=engine) == expected
+        with open(input_file, "rb") as f:
+            assert wknml.parse_nml(f, engine=engine) == expected
+
+
+def test_unknown_parser_engine():
+    with pytest.raises(ValueError):
+        wknml.parse_nml(INPUT_FILES[0], engine="sax")
+
+
+@pytest.mark.parametrize("engine", wknml.WRITER_ENGINES)
+def test_writer_engines(engine):
+    for input_file, snapshot_file in zip(INPUT_FILES, SNAPSHOT_FILES):
+        output = io.BytesIO()
+        wknml.write_nml(output, wknml.parse_nml(input_file), engine=engine)
+        assert output.getvalue() == Path(snapshot_file + ".snapshot").read_bytes()
+
+
+def test_writer_engines_escaping():
+    nml = wknml.parse_nml("testdata/nml_without_default_values.nml")
+    nml = nml._replace(
+        trees=[
+            *nml.trees,
+            wknml.Tree(
+                id=99,
+                color=(1, 0, 0, 1),
+                name="quotes \"' <tags> & \n\t",
+                nodes=[wknml.Node(id=99, position=(1, 2, 3), radius=1.5)],
+                edges=[],
+            ),
+            wknml.Tree(
+                id=100,
+                color=(0, 1, 0, 1),
+                name=None,
+                nodes=[wknml.Node(id=100, position=(4, 5, 6))],
+                edges=[],
+                groupId=2,
+            ),
+        ],
+        groups=[*nml.groups, wknml.Group(id=2, name=None, children=[])],
+        comments=[
+            *nml.comments,
+            wknml.Comment(node=99, content='say "hi"'),
+            wknml.Comment(node=99, content=None),
+        ],
+        volume=wknml.Volume(id=1, location="data.zip", fallback_layer="segmentation"),
+    )
+
+    outputs = []
+    for engine in wknml.WRITER_ENGINES:
+        output = io.BytesIO()
+        wknml.write_nml(output, nml, engine=engine)
+        outputs.append(output.getvalue())
+    assert all(output == outputs[0] for output in outputs)
+
+    # Paths are opened and closed by write_nml
+    for engine in wknml.WRITER_ENGINES:
+        output_path = Path("testoutput") / f"escaping_{engine}.nml"
+        wknml.write_nml(output_path, nml, engine=engine)
+        assert output_path.read_bytes() == outputs[0]
+
+    # Missing names are not written, so that they are parsed as None again
+    output = io.BytesIO(outputs[0])
+    parsed_nml = wknml.parse_nml(output)
+    assert parsed_nml.trees[-1].name is None
+    assert parsed_nml.groups[-1].name is None
+
+
+def test_unknown_writer_engine():
+    with pytest.raises(ValueError):
+        wknml.write_nml(io.BytesIO(), wknml.parse_nml(INPUT_FILES[0]), engine="sax")
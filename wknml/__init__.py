@@ -1,7 +1,33 @@
+import bz2
+import io
+import itertools
+import lzma
+import re
 import xml.etree.ElementTree as ET
+import zipfile
+import zlib
+from importlib.util import find_spec
+from os import PathLike
+from types import SimpleNamespace
 from xml.etree.ElementTree import Element
+from xml.parsers import expat
 from loxun import XmlWriter
-from typing import BinaryIO, NamedTuple, List, Tuple, Optional, Text
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Collection,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    List,
+    Tuple,
+    Optional,
+    Text,
+    Union,
+)
 
 Vector3 = Tuple[float, float, float]
 Vector4 = Tuple[float, float, float, float]
@@ -256,58 +282,59 @@ def __parse_parameters(nml_parameters: Element):
     )
 
 
-def __parse_node(nml_node: Element):
+def __parse_node(nml_node: Dict[Text, Text]):
+    get = nml_node.get
+
     rotation = None
-    if nml_node.get("rotX") is not None:
-        rotation = (
-            float(nml_node.get("rotX")),
-            float(nml_node.get("rotY")),
-            float(nml_node.get("rotZ")),
-        )
+    rotX = get("rotX")
+    if rotX is not None:
+        rotation = (float(rotX), float(get("rotY")), float(get("rotZ")))
+
+    radius = get("radius")
+    inVp = get("inVp")
+    inMag = get("inMag")
+    bitDepth = get("bitDepth")
+    interpolation = get("interpolation")
+    time = get("time")
 
     return Node(
-        id=int(nml_node.get("id")),
-        radius=float(nml_node.get("radius"))
-        if nml_node.get("radius") is not None
-        else None,
-        position=(
-            float(nml_node.get("x")),
-            float(nml_node.get("y")),
-            float(nml_node.get("z")),
-        ),
-        rotation=rotation,
-        inVp=int(nml_node.get("inVp")) if nml_node.get("inVp") is not None else None,
-        inMag=int(nml_node.get("inMag")) if nml_node.get("inMag") is not None else None,
-        bitDepth=int(nml_node.get("bitDepth"))
-        if nml_node.get("bitDepth") is not None
-        else None,
-        interpolation=bool(nml_node.get("interpolation"))
-        if nml_node.get("interpolation") is not None
-        else None,
-        time=int(nml_node.get("time")) if nml_node.get("time") is not None else None,
+        int(get("id")),
+        (float(get("x")), float(get("y")), float(get("z"))),
+        float(radius) if radius is not None else None,
+        rotation,
+        int(inVp) if inVp is not None else None,
+        int(inMag) if inMag is not None else None,
+        int(bitDepth) if bitDepth is not None else None,
+        bool(interpolation) if interpolation is not None else None,
+        int(time) if time is not None else None,
     )
 
 
-def __parse_edge(nml_edge: Element):
+def __parse_node_position(nml_node: Dict[Text, Text]):
+    get = nml_node.get
+    return Node(int(get("id")), (float(get("x")), float(get("y")), float(get("z"))))
+
+
+def __parse_edge(nml_edge: Dict[Text, Text]):
     return Edge(source=int(nml_edge.get("source")), target=int(nml_edge.get("target")))
 
 
-def __parse_tree(nml_tree: Element):
+def __parse_tree(nml_tree: Dict[Text, Text]):
     name = None
-    if "comment" in nml_tree.attrib:
+    if "comment" in nml_tree:
         name = nml_tree.get("comment")
-    if "name" in nml_tree.attrib:
+    if "name" in nml_tree:
         name = nml_tree.get("name")
 
     color = None
-    if "color.r" in nml_tree.attrib:
+    if "color.r" in nml_tree:
         color = (
             float(nml_tree.get("color.r")),
             float(nml_tree.get("color.g")),
             float(nml_tree.get("color.b")),
             float(nml_tree.get("color.a")),
         )
-    if "colorr" in nml_tree.attrib:
+    if "colorr" in nml_tree:
         color = (
             float(nml_tree.get("colorr")),
             float(nml_tree.get("colorg")),
@@ -315,7 +342,7 @@ def __parse_tree(nml_tree: Element):
             float(nml_tree.get("colora")),
         )
     try:
-        groupId = int(nml_tree.get("groupId", default=-1))
+        groupId = int(nml_tree.get("groupId", -1))
     except ValueError:
         groupId = -1
 
@@ -329,7 +356,7 @@ def __parse_tree(nml_tree: Element):
     )
 
 
-def __parse_branchpoint(nml_branchpoint: Element):
+def __parse_branchpoint(nml_branchpoint: Dict[Text, Text]):
     return Branchpoint(
         int(nml_branchpoint.get("id")),
         int(nml_branchpoint.get("time"))
@@ -338,95 +365,491 @@ def __parse_branchpoint(nml_branchpoint: Element):
     )
 
 
-def __parse_comment(nml_comment: Element):
-    return Comment(
-        int(nml_comment.get("node")), nml_comment.get("content", default=None)
-    )
+def __parse_comment(nml_comment: Dict[Text, Text]):
+    return Comment(int(nml_comment.get("node")), nml_comment.get("content", None))
 
 
-def __parse_group(nml_group: Element):
-    return Group(int(nml_group.get("id")), nml_group.get("name", default=None), [])
+def __parse_group(nml_group: Dict[Text, Text]):
+    return Group(int(nml_group.get("id")), nml_group.get("name", None), [])
 
 
-def __parse_volume(nml_volume: Element):
+def __parse_volume(nml_volume: Dict[Text, Text]):
     return Volume(
         int(nml_volume.get("id")),
-        nml_volume.get("location", default=None),
-        nml_volume.get("fallback_layer", default=None),
+        nml_volume.get("location", None),
+        nml_volume.get("fallback_layer", None),
     )
 
 
-def parse_nml(file: BinaryIO) -> NML:
-    """
-    Reads a webKnossos NML skeleton file from disk, parses it and returns an NML Python object
+__CHUNK_SIZE = 1 << 16
 
-    Arguments:
-        file (BinaryIO): A Python file handle
 
-    Return:
-        NML: A webKnossos skeleton annotation as Python NML object
+def __read_raw_chunks(file: BinaryIO) -> Iterator[bytes]:
+    while True:
+        chunk = file.read(__CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
 
-    Example:
-        ```
-        with open("input.nml", "rb") as f:
-            nml = wknml.parse_nml(f, nml)
-        ```
-    """
+
+def __create_zstd_decompressor():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(
+            "Reading zstd-compressed NML files requires the optional zstandard package, install it with `pip install wknml[zstd]`."
+        ) from e
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+__COMPRESSION_MAGIC_BYTES = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bz2",
+    b"\xfd7zXZ\x00": "lzma",
+    b"\x28\xb5\x2f\xfd": "zstd",
+    b"PK\x03\x04": "zip",
+}
+__MAGIC_BYTES_LENGTH = max(len(magic) for magic in __COMPRESSION_MAGIC_BYTES)
+__DECOMPRESSORS = {
+    "gzip": lambda: zlib.decompressobj(16 + zlib.MAX_WBITS),
+    "bz2": bz2.BZ2Decompressor,
+    "lzma": lzma.LZMADecompressor,
+    "zstd": __create_zstd_decompressor,
+}
+
+
+def __detect_compression(head: bytes) -> Optional[Text]:
+    for magic, compression in __COMPRESSION_MAGIC_BYTES.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def __decompress_chunks(chunks: Iterable[bytes], compression: Text) -> Iterator[bytes]:
+    create_decompressor = __DECOMPRESSORS[compression]
+    decompressor = create_decompressor()
+    for chunk in chunks:
+        while chunk:
+            decompressed = decompressor.decompress(chunk)
+            if decompressed:
+                yield decompressed
+            chunk = b""
+            # Concatenated streams (e.g. from pigz or pbzip2) start a new decompressor
+            if getattr(decompressor, "eof", False):
+                chunk = decompressor.unused_data
+                decompressor = create_decompressor()
+
+
+def __find_nml_member(archive: zipfile.ZipFile) -> Text:
+    names = [name for name in archive.namelist() if name.lower().endswith(".nml")]
+    if len(names) != 1:
+        raise ValueError(
+            f"Expected exactly one NML file in the ZIP archive, found {len(names)}: {names}"
+        )
+    return names[0]
+
+
+def __read_chunks(file: Union[BinaryIO, Text, PathLike]) -> Iterator[bytes]:
+    if isinstance(file, (str, PathLike)):
+        with open(file, "rb") as f:
+            yield from __read_chunks(f)
+        return
+
+    try:
+        start = file.tell()
+    except (AttributeError, OSError):
+        start = None
+
+    raw_chunks = __read_raw_chunks(file)
+    # Files opened in text mode yield str chunks, which are never compressed
+    head = None
+    for chunk in raw_chunks:
+        head = chunk if head is None else head + chunk
+        if len(head) >= __MAGIC_BYTES_LENGTH:
+            break
+
+    compression = __detect_compression(head) if isinstance(head, bytes) else None
+    if compression is None:
+        if head:
+            yield head
+        yield from raw_chunks
+    elif compression == "zip":
+        if start is None:
+            raise ValueError("Reading a ZIP archive requires a seekable file.")
+        file.seek(start)
+        with zipfile.ZipFile(file) as archive:
+            with archive.open(__find_nml_member(archive)) as member:
+                yield from __read_raw_chunks(member)
+    else:
+        yield from __decompress_chunks(itertools.chain([head], raw_chunks), compression)
+
+
+class __ChunkReader(io.RawIOBase):
+    # Exposes an iterator of non-empty byte chunks as a readable file object
+    def __init__(self, chunks: Iterator[bytes]):
+        self.chunks = chunks
+        self.pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self.pending:
+            self.pending = memoryview(next(self.chunks, b""))
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+    def close(self):
+        self.chunks.close()
+        super().close()
+
+
+# A complete <thing ...> start tag. Attribute values may contain ">" so quotes are honored.
+__THING_START_TAG = re.compile(rb"""<thing(?=[\s/>])(?:[^>"']|"[^"]*"|'[^']*')*>""")
+__ATTRIBUTE = re.compile(rb"""([^\s=]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+
+
+def __parse_start_tag_attributes(start_tag: bytes) -> Dict[Text, Text]:
+    return {
+        name.decode(): (double_quoted or single_quoted).decode("utf-8", "replace")
+        for name, double_quoted, single_quoted in __ATTRIBUTE.findall(start_tag)
+    }
+
+
+def __find_incomplete_thing_start(buffer: bytes, position: int) -> int:
+    # The last "<thing" that may still become a start tag. The <things> root tag is not
+    # one, otherwise the rest of a file without trees would pile up in the buffer.
+    start = buffer.rfind(b"<thing", position)
+    while start >= 0 and buffer[start + 6 : start + 7] not in b" \t\r\n/":
+        start = buffer.rfind(b"<thing", position, start)
+    return start
+
+
+def __skip_trees(
+    chunks: Iterable[Union[bytes, Text]],
+    tree_filter: Optional[Callable[[Dict[Text, Text]], bool]],
+) -> Iterator[bytes]:
+    # Removes unwanted <thing> elements from the raw input before it reaches the XML parser,
+    # so that their nodes and edges do not need to be tokenized at all. Without a tree_filter
+    # all trees are removed.
+    buffer = b""
+    skipping = False
+    for chunk in chunks:
+        buffer += chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+        output = []
+        position = 0
+        while True:
+            if skipping:
+                end = buffer.find(b"</thing>", position)
+                if end < 0:
+                    # Keep a possibly truncated end tag for the next chunk
+                    position = max(position, len(buffer) - 7)
+                    break
+                position = end + 8
+                skipping = False
+
+            match = __THING_START_TAG.search(buffer, position)
+            if match is None:
+                # Keep a possibly truncated start tag for the next chunk
+                incomplete = __find_incomplete_thing_start(buffer, position)
+                keep = incomplete if incomplete >= 0 else max(position, len(buffer) - 6)
+                output.append(buffer[position:keep])
+                position = keep
+                break
+
+            output.append(buffer[position : match.start()])
+            position = match.end()
+            start_tag = match.group()
+            if tree_filter is not None and tree_filter(
+                __parse_start_tag_attributes(start_tag)
+            ):
+                output.append(start_tag)
+            else:
+                skipping = not start_tag.endswith(b"/>")
+
+        buffer = buffer[position:]
+        yield b"".join(output)
+
+    if not skipping:
+        yield buffer
+
+
+def __read_indexed_chunks(
+    file: Union[BinaryIO, Text, PathLike],
+    index,
+    tree_filter: Optional[Callable[[Dict[Text, Text]], bool]],
+    sections: Collection[Text],
+) -> Iterator[bytes]:
+    # Reads only the byte ranges of the requested trees and sections listed in an NMLIndex
+    if isinstance(file, (str, PathLike)):
+        with open(file, "rb") as f:
+            yield from __read_indexed_chunks(f, index, tree_filter, sections)
+        return
+
+    file.seek(0, 2)
+    if file.tell() != index.file_size:
+        raise ValueError("The NML index does not match the size of the file.")
+
+    ranges = []
+    if "parameters" in sections and "parameters" in index.sections:
+        ranges.append(index.sections["parameters"])
+    if "trees" in sections:
+        for tree_id, group_id, tree_range in zip(
+            index.tree_ids.tolist(),
+            index.tree_group_ids.tolist(),
+            index.tree_ranges.tolist(),
+        ):
+            attrib = {"id": str(tree_id), "groupId": str(group_id)}
+            if tree_filter is None or tree_filter(attrib):
+                ranges.append(tree_range)
+    for section in ("branchpoints", "comments", "groups", "volume"):
+        if section in sections and section in index.sections:
+            ranges.append(index.sections[section])
+
+    yield b"<things>"
+    for start, end in ranges:
+        file.seek(start)
+        while start < end:
+            chunk = file.read(min(__CHUNK_SIZE, end - start))
+            if not chunk:
+                raise ValueError("The NML index does not match the file.")
+            start += len(chunk)
+            yield chunk
+    yield b"</things>"
+
+
+def __parse_with_etree(
+    chunks: Iterable[Union[bytes, Text]],
+    start: Callable[[Text, Dict[Text, Text]], None],
+    end: Callable[[Text], None],
+) -> Iterator[None]:
+    # With a parser target, the tags and attributes are handed to the
+    # callbacks and no Element objects are built
+    parser = ET.XMLParser(
+        target=SimpleNamespace(start=start, end=end, close=lambda: None)
+    )
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield
+    parser.close()
+
+
+def __parse_with_expat(
+    chunks: Iterable[Union[bytes, Text]],
+    start: Callable[[Text, Dict[Text, Text]], None],
+    end: Callable[[Text], None],
+) -> Iterator[None]:
+    # expat invokes the callbacks directly with an attribute dictionary,
+    # no Element objects are created at all
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    for chunk in chunks:
+        parser.Parse(chunk, False)
+        yield
+    parser.Parse(b"", True)
+
+
+def __parse_with_lxml(
+    chunks: Iterable[Union[bytes, Text]],
+    start: Callable[[Text, Dict[Text, Text]], None],
+    end: Callable[[Text], None],
+) -> Iterator[None]:
+    try:
+        from lxml import etree
+    except ImportError as e:
+        raise ImportError(
+            "The lxml parser engine requires the optional lxml package, install it with `pip install wknml[lxml]`."
+        ) from e
+
+    parser = etree.XMLParser(
+        target=SimpleNamespace(start=start, end=end, close=lambda: None),
+        huge_tree=True,
+    )
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield
+    parser.close()
+
+
+__PARSER_ENGINES = {
+    "expat": __parse_with_expat,
+    "lxml": __parse_with_lxml,
+    "etree": __parse_with_etree,
+}
+
+
+__AUTO_PARSER_ENGINE = "lxml" if find_spec("lxml") is not None else "expat"
+
+
+def __get_parser_engine(engine: Text):
+    if engine == "auto":
+        engine = __AUTO_PARSER_ENGINE
+    if engine not in __PARSER_ENGINES:
+        raise ValueError(
+            f"Unknown parser engine '{engine}'. Choose one of 'auto', {', '.join(repr(e) for e in __PARSER_ENGINES)}."
+        )
+    return __PARSER_ENGINES[engine]
+
+
+def __consume(generator: Generator[None, None, NML]) -> NML:
+    while True:
+        try:
+            next(generator)
+        except StopIteration as stop:
+            return stop.value
+
+
+SECTIONS = ("parameters", "trees", "branchpoints", "comments", "groups", "volume")
+"""All parts of an NML file that can be selected with the `sections` argument of `parse_nml`."""
+
+
+def __skip(*args):
+    pass
+
+
+def __get_tree_filter(
+    tree_ids: Optional[Iterable[int]], group_ids: Optional[Iterable[int]]
+) -> Optional[Callable[[Dict[Text, Text]], bool]]:
+    if tree_ids is None and group_ids is None:
+        return None
+
+    tree_ids = set(tree_ids) if tree_ids is not None else None
+    group_ids = set(group_ids) if group_ids is not None else None
+
+    def tree_filter(nml_tree: Dict[Text, Text]) -> bool:
+        if tree_ids is not None and int(nml_tree.get("id")) not in tree_ids:
+            return False
+        if group_ids is not None:
+            try:
+                groupId = int(nml_tree.get("groupId", -1))
+            except ValueError:
+                groupId = -1
+            if groupId not in group_ids:
+                return False
+        return True
+
+    return tree_filter
+
+
+def __parse_nml(
+    file: BinaryIO,
+    start_tree: Callable[[Dict[Text, Text]], None],
+    add_node: Callable[[Dict[Text, Text]], None],
+    add_edge: Callable[[Dict[Text, Text]], None],
+    end_tree: Callable[[], None],
+    engine: Text = "auto",
+    tree_filter: Optional[Callable[[Dict[Text, Text]], bool]] = None,
+    sections: Optional[Collection[Text]] = None,
+    index=None,
+) -> Generator[None, None, NML]:
+    # Parses everything but the trees of an NML file. The attributes of every <thing>, <node>
+    # and <edge> tag are handed to the given callbacks instead, so that callers can decide
+    # how to store the skeletons. The `trees` of the returned NML are always empty.
+    # Trees rejected by the tree_filter and unselected sections are skipped without any
+    # attribute conversion. Yields after every chunk of input, which allows callers to hand
+    # out finished trees while the file is still being parsed.
+    if sections is None:
+        sections = SECTIONS
+    unknown_sections = set(sections) - set(SECTIONS)
+    if unknown_sections:
+        raise ValueError(
+            f"Unknown NML sections {sorted(unknown_sections)}. Choose from {list(SECTIONS)}."
+        )
+    parse_trees = "trees" in sections
+    parse_branchpoints = "branchpoints" in sections
+    parse_comments = "comments" in sections
+    parse_groups = "groups" in sections
+    parse_volume = "volume" in sections
+    # The parameters, branchpoints, comments and groups are closed by an end tag. Once all
+    # requested sections are closed, the rest of the file does not need to be read.
+    pending_sections = set(sections)
 
     parameters = None
-    trees = []
+    parameters_element = None
     branchpoints = []
     comments = []
-    current_tree = None
     root_group = Group(-1, "", [])
     group_stack = [root_group]
-    element_stack = []
     volume = None
-
-    for event, elem in ET.iterparse(file, events=("start", "end")):
-        if event == "start":
-            element_stack.append(elem)
-            if elem.tag == "thing":
-                current_tree = __parse_tree(elem)
-                trees.append(current_tree)
-            elif elem.tag == "node":
-                assert (
-                    current_tree is not None
-                ), "<node ...> tag needs to be child of a <thing ...> tag."
-                current_tree.nodes.append(__parse_node(elem))
-            elif elem.tag == "edge":
-                assert (
-                    current_tree is not None
-                ), "<edge ...> tag needs to be child of a <thing ...> tag."
-                current_tree.edges.append(__parse_edge(elem))
-            elif elem.tag == "branchpoint":
-                branchpoints.append(__parse_branchpoint(elem))
-            elif elem.tag == "comment":
-                comments.append(__parse_comment(elem))
-            elif elem.tag == "volume":
-                volume = __parse_volume(elem)
-            elif elem.tag == "group":
-                group = __parse_group(elem)
+    in_tree = False
+    keep_tree = False
+    on_node = __skip
+    on_edge = __skip
+
+    def start(tag: Text, attrib: Dict[Text, Text]):
+        nonlocal parameters_element, volume, in_tree, keep_tree, on_node, on_edge
+        if tag == "node":
+            assert in_tree, "<node ...> tag needs to be child of a <thing ...> tag."
+            on_node(attrib)
+        elif tag == "edge":
+            assert in_tree, "<edge ...> tag needs to be child of a <thing ...> tag."
+            on_edge(attrib)
+        elif tag == "thing":
+            in_tree = True
+            keep_tree = parse_trees and (tree_filter is None or tree_filter(attrib))
+            if keep_tree:
+                start_tree(attrib)
+                on_node, on_edge = add_node, add_edge
+            else:
+                on_node, on_edge = __skip, __skip
+        elif parameters_element is not None and parameters is None:
+            # Collect the children of the parameters tag as we want to parse those all at once
+            # when the closing parameters tag is parsed
+            ET.SubElement(parameters_element, tag, dict(attrib))
+        elif tag == "parameters":
+            if "parameters" in sections:
+                parameters_element = Element(tag, dict(attrib))
+        elif tag == "branchpoint":
+            if parse_branchpoints:
+                branchpoints.append(__parse_branchpoint(attrib))
+        elif tag == "comment":
+            if parse_comments:
+                comments.append(__parse_comment(attrib))
+        elif tag == "volume":
+            if parse_volume:
+                volume = __parse_volume(attrib)
+        elif tag == "group":
+            if parse_groups:
+                group = __parse_group(attrib)
                 group_stack[-1].children.append(group)
                 group_stack.append(group)
-        elif event == "end":
-            if elem.tag == "parameters":
-                parameters = __parse_parameters(elem)
-            elif elem.tag == "thing":
-                current_tree = None
-            elif elem.tag == "group":
+
+    def end(tag: Text):
+        nonlocal parameters, in_tree
+        if tag == "thing":
+            in_tree = False
+            if keep_tree:
+                end_tree()
+        elif tag == "group":
+            if parse_groups:
                 group_stack.pop()
+        elif tag == "parameters":
+            if parameters_element is not None:
+                parameters = __parse_parameters(parameters_element)
+            pending_sections.discard(tag)
+        elif tag in ("branchpoints", "comments", "groups"):
+            pending_sections.discard(tag)
+
+    if index is not None:
+        chunks = __read_indexed_chunks(file, index, tree_filter, sections)
+    elif not parse_trees:
+        chunks = __skip_trees(__read_chunks(file), None)
+    elif tree_filter is not None:
+        chunks = __skip_trees(__read_chunks(file), tree_filter)
+    else:
+        chunks = __read_chunks(file)
 
-            element_stack.pop()
-            # Do not clear the elements of the parameters tag as we want to parse those all at once
-            # when the closing parameters tag is parsed
-            if len(element_stack) and element_stack[-1].tag != "parameters":
-                # Discard the element to save memory
-                elem.clear()
+    for _ in __get_parser_engine(engine)(chunks, start, end):
+        if not pending_sections:
+            break
+        yield
 
     return NML(
         parameters=parameters,
-        trees=trees,
+        trees=[],
         branchpoints=branchpoints,
         comments=comments,
         groups=root_group.children,
@@ -434,6 +857,196 @@ def parse_nml(file: BinaryIO) -> NML:
     )
 
 
+def parse_nml(
+    file: BinaryIO,
+    engine: Text = "auto",
+    tree_ids: Optional[Iterable[int]] = None,
+    group_ids: Optional[Iterable[int]] = None,
+    sections: Optional[Collection[Text]] = None,
+    skip_node_attributes: bool = False,
+    index=None,
+    workers: int = 1,
+) -> NML:
+    """
+    Reads a webKnossos NML skeleton file from disk, parses it and returns an NML Python object
+
+    Note:
+        The selection arguments skip unwanted parts of the file without converting any of their attributes. If only sections preceding the trees are requested (e.g. `{"parameters"}`), the file is not read any further than necessary.
+
+    Arguments:
+        file (BinaryIO): A Python file handle or a path. Compressed files (gzip, bz2, xz, zstd) and webKnossos ZIP downloads are decompressed on the fly, see `open_nml`.
+        engine (Text = "auto"): The XML parser backend. `"expat"` uses a callback-based parser without building any XML elements, `"lxml"` requires the optional lxml package and `"etree"` feeds the tags to a parser target of `xml.etree.ElementTree.XMLParser`, which also builds no elements. `"auto"` picks lxml if it is installed and expat otherwise.
+        tree_ids (Optional[Iterable[int]] = None): Only parse the trees with these ids
+        group_ids (Optional[Iterable[int]] = None): Only parse the trees that directly belong to one of these groups. Sub-groups are not included.
+        sections (Optional[Collection[Text]] = None): Only parse these parts of the file. See `SECTIONS` for all options. Skipped parts are left empty in the returned NML. Default: all sections
+        skip_node_attributes (bool = False): Only parse the id and position of each node and leave all optional node attributes set to `None`
+        index (Optional[NMLIndex] = None): A byte-offset index of the file created with `build_nml_index` or `open_nml_index`. Only the byte ranges of the selected trees and sections are read. Requires a seekable, uncompressed file.
+        workers (int = 1): Number of processes that parse the trees in parallel. See `parse_nml_parallel`. Requires a seekable, uncompressed file.
+
+    Return:
+        NML: A webKnossos skeleton annotation as Python NML object
+
+    Example:
+        ```
+        with open("input.nml", "rb") as f:
+            nml = wknml.parse_nml(f, nml)
+
+        with open("input.nml", "rb") as f:
+            metadata = wknml.parse_nml(f, sections={"parameters", "comments"})
+        ```
+    """
+
+    if workers > 1:
+        return parse_nml_parallel(
+            file,
+            workers,
+            engine,
+            tree_ids,
+            group_ids,
+            sections,
+            skip_node_attributes,
+            index,
+        )
+
+    trees = []
+    current_tree = None
+    parse_node = __parse_node_position if skip_node_attributes else __parse_node
+
+    def start_tree(attrib: Dict[Text, Text]):
+        nonlocal current_tree
+        current_tree = __parse_tree(attrib)
+        trees.append(current_tree)
+
+    def add_node(attrib: Dict[Text, Text]):
+        current_tree.nodes.append(parse_node(attrib))
+
+    def add_edge(attrib: Dict[Text, Text]):
+        current_tree.edges.append(__parse_edge(attrib))
+
+    def end_tree():
+        nonlocal current_tree
+        current_tree = None
+
+    nml = __consume(
+        __parse_nml(
+            file,
+            start_tree,
+            add_node,
+            add_edge,
+            end_tree,
+            engine,
+            __get_tree_filter(tree_ids, group_ids),
+            sections,
+            index,
+        )
+    )
+    return nml._replace(trees=trees)
+
+
+def iter_trees(
+    file: BinaryIO,
+    engine: Text = "auto",
+    tree_ids: Optional[Iterable[int]] = None,
+    group_ids: Optional[Iterable[int]] = None,
+    skip_node_attributes: bool = False,
+) -> Iterator[Tree]:
+    """
+    Reads a webKnossos NML skeleton file tree by tree. Each tree is yielded as soon as its closing `</thing>` tag has been parsed and is not retained afterwards, so that the memory usage does not grow with the size of the file. Use `parse_nml_metadata` to read the remaining parts of the annotation.
+
+    Arguments:
+        file (BinaryIO): A Python file handle
+        engine (Text = "auto"): The XML parser backend. See `parse_nml`.
+        tree_ids (Optional[Iterable[int]] = None): Only yield the trees with these ids
+        group_ids (Optional[Iterable[int]] = None): Only yield the trees that directly belong to one of these groups
+        skip_node_attributes (bool = False): Only parse the id and position of each node
+
+    Return:
+        Iterator[Tree]: All trees in file order
+
+    Example:
+        ```
+        with open("input.nml", "rb") as f:
+            for tree in wknml.iter_trees(f):
+                print(tree.id, len(tree.nodes))
+        ```
+    """
+
+    finished_trees = []
+    current_tree = None
+    parse_node = __parse_node_position if skip_node_attributes else __parse_node
+
+    def start_tree(attrib: Dict[Text, Text]):
+        nonlocal current_tree
+        current_tree = __parse_tree(attrib)
+
+    def add_node(attrib: Dict[Text, Text]):
+        current_tree.nodes.append(parse_node(attrib))
+
+    def add_edge(attrib: Dict[Text, Text]):
+        current_tree.edges.append(__parse_edge(attrib))
+
+    def end_tree():
+        nonlocal current_tree
+        finished_trees.append(current_tree)
+        current_tree = None
+
+    for _ in __parse_nml(
+        file,
+        start_tree,
+        add_node,
+        add_edge,
+        end_tree,
+        engine,
+        __get_tree_filter(tree_ids, group_ids),
+        sections=("trees",),
+    ):
+        yield from finished_trees
+        finished_trees.clear()
+    yield from finished_trees
+
+
+def parse_nml_metadata(file: BinaryIO, engine: Text = "auto") -> NML:
+    """
+    Reads everything but the trees of a webKnossos NML skeleton file, i.e. the parameters, branchpoints, comments, groups and volume. Nodes and edges are skipped without being converted. Complements `iter_trees`.
+
+    Arguments:
+        file (BinaryIO): A Python file handle
+        engine (Text = "auto"): The XML parser backend. See `parse_nml`.
+
+    Return:
+        NML: A webKnossos skeleton annotation without any trees
+    """
+
+    return parse_nml(
+        file,
+        engine,
+        sections=[section for section in SECTIONS if section != "trees"],
+    )
+
+
+def open_nml(file: Union[BinaryIO, Text, PathLike]) -> BinaryIO:
+    """
+    Opens an NML file for reading and transparently decompresses it. The compression is detected from the magic bytes of the file, independent of its name. Supported are gzip (`.nml.gz`), bz2, xz, zstd (requires the optional zstandard package) and ZIP archives containing a single NML file, such as webKnossos annotation downloads. The data is decompressed while reading, no temporary files are written.
+
+    Note:
+        All parse functions decompress their input the same way, so it is not necessary to call `open_nml` before `parse_nml`. Functions based on byte offsets (`build_nml_index` and `workers` > 1) require uncompressed files.
+
+    Arguments:
+        file (Union[BinaryIO, Text, PathLike]): A path or a Python file handle opened in binary mode. Reading a ZIP archive requires a seekable file.
+
+    Return:
+        BinaryIO: A readable file object yielding the uncompressed NML
+
+    Example:
+        ```
+        with wknml.open_nml("annotation.zip") as f:
+            nml = wknml.parse_nml(f)
+        ```
+    """
+
+    return io.BufferedReader(__ChunkReader(__read_chunks(file)), __CHUNK_SIZE)
+
+
 def __dump_task_bounding_box(xf: XmlWriter, parameters: NMLParameters):
     task_bounding_box = getattr(parameters, "taskBoundingBox")
     if task_bounding_box is not None:
@@ -559,9 +1172,10 @@ def __dump_tree(xf: XmlWriter, tree: Tree):
         "color.g": str(tree.color[1]),
         "color.b": str(tree.color[2]),
         "color.a": str(tree.color[3]),
-        "name": tree.name,
     }
 
+    if tree.name is not None:
+        attributes["name"] = tree.name
     if tree.groupId is not None:
         attributes["groupId"] = str(tree.groupId)
 
@@ -609,7 +1223,10 @@ def __dump_volume(xf: XmlWriter, volume: Volume):
 
 
 def __dump_group(xf: XmlWriter, group: Group):
-    xf.startTag("group", {"id": str(group.id), "name": group.name})
+    attributes = {"id": str(group.id)}
+    if group.name is not None:
+        attributes["name"] = group.name
+    xf.startTag("group", attributes)
     for g in group.children:
         __dump_group(xf, g)
     xf.endTag()  # group
@@ -641,19 +1258,107 @@ def __dump_nml(xf: XmlWriter, nml: NML):
     xf.endTag()  # things
 
 
-def write_nml(file: BinaryIO, nml: NML):
+WRITER_ENGINES = ("fast", "loxun")
+"""The supported serializer backends of `write_nml`."""
+
+
+def write_nml(
+    file: Union[BinaryIO, Text, PathLike],
+    nml: Union[NML, "ColumnarNML"],
+    engine: Text = "fast",
+    compression: Optional[Text] = None,
+    threads: int = 1,
+    decimals: Optional[int] = None,
+    node_defaults: Optional[Dict[Text, Any]] = None,
+    workers: int = 1,
+):
     """
     Writes an NML object to a file on disk.
 
     Arguments:
-        file (BinaryIO): A Python file handle
-        nml (NML): A NML object that should be persisted to disk
+        file (Union[BinaryIO, Text, PathLike]): A Python file handle opened in binary mode or a path. A path is opened for writing and closed afterwards, a file handle is left open.
+        nml (Union[NML, ColumnarNML]): A NML object that should be persisted to disk. The nodes of a `ColumnarNML` object are formatted directly from its NumPy columns.
+        engine (Text = "fast"): The serializer backend. `"fast"` formats the nodes and edges with string templates and writes the file in large batches, see `NMLWriter`. `"loxun"` writes every element with the loxun XmlWriter, which is several times slower. Both write the same bytes.
+        compression (Optional[Text] = None): Compresses the output with `"gzip"`, `"zstd"` or into a `"zip"` archive like the webKnossos downloads. Only supported by the `"fast"` engine, see `NMLWriter`.
+        threads (int = 1): The number of threads compressing gzip or zstd output. The compressed bytes do not depend on it.
+        decimals (Optional[int] = None): Rounds positions, radii and rotations to at most this many decimal places and writes integers without a fraction. Only supported by the `"fast"` engine.
+        node_defaults (Optional[Dict[Text, Any]] = None): Node attributes that are omitted if they have the given value. Only supported by the `"fast"` engine, see `NMLWriter`.
+        workers (int = 1): Number of processes that format the trees in parallel. See `write_nml_parallel`. Only supported by the `"fast"` engine.
 
     Example:
         ```
         with open("out.nml", "wb") as f:
             wknml.write_nml(f, nml)
+        wknml.write_nml("out.nml.gz", nml, compression="gzip", threads=8)
         ```
     """
-    with XmlWriter(file) as xf:
-        __dump_nml(xf, nml)
+
+    if engine == "fast":
+        if workers > 1:
+            return write_nml_parallel(
+                file, nml, workers, compression, threads, decimals, node_defaults
+            )
+        if decimals is not None and not isinstance(nml, ColumnarNML):
+            # Rounding is much faster on the NumPy columns than per node
+            nml = nml_to_columnar(nml)
+        with NMLWriter(
+            file, nml.parameters, compression, threads, decimals, node_defaults
+        ) as writer:
+            if isinstance(nml, ColumnarNML):
+                writer.write_trees_columnar(nml)
+            else:
+                writer.write_trees(nml.trees)
+            writer.write_branchpoints(nml.branchpoints)
+            writer.write_comments(nml.comments)
+            writer.write_groups(nml.groups)
+            if nml.volume is not None:
+                writer.write_volume(nml.volume)
+    elif engine == "loxun":
+        if compression is not None or decimals is not None or node_defaults:
+            raise ValueError(
+                "Compression and number formatting are only supported by the 'fast' engine."
+            )
+        if workers > 1:
+            raise ValueError("Parallel writing is only supported by the 'fast' engine.")
+        if isinstance(nml, ColumnarNML):
+            nml = columnar_to_nml(nml, compact=True)
+        if isinstance(file, (str, PathLike)):
+            with open(file, "wb") as f:
+                write_nml(f, nml, engine="loxun")
+            return
+        with XmlWriter(file) as xf:
+            __dump_nml(xf, nml)
+    else:
+        raise ValueError(
+            f"Unknown writer engine '{engine}'. Choose one of {', '.join(repr(e) for e in WRITER_ENGINES)}."
+        )
+
+
+from .nml_columnar import (
+    ColumnarNML,
+    NodeColumns,
+    parse_nml_columnar,
+    columnar_to_nml,
+    columnar_to_tree,
+    NodeSequence,
+    EdgeSequence,
+    nml_to_columnar,
+)
+from .nml_index import (
+    NMLIndex,
+    build_nml_index,
+    save_nml_index,
+    load_nml_index,
+    open_nml_index,
+    load_tree,
+)
+from .nml_parallel import parse_nml_parallel, parse_many, write_nml_parallel
+from .nml_cache import DEFAULT_CACHE_SIZE, parse_nml_cached
+from .nml_binary import BINARY_MAGIC, write_binary, load_binary
+from .nml_lookup import NodeIndex
+from .nml_sparse import CSRGraph, to_csr, from_csr
+from .nml_stats import TreeStats, NMLStats, stats
+from .nml_spatial import SpatialIndex
+from .nml_crop import CROP_MODES, crop, iter_crop
+from .nml_writer import COMPRESSIONS, NODE_DEFAULT_ATTRIBUTES, NMLWriter
+from .nml_merge import MERGE_GROUP_BY, merge_nmls
@@ -0,0 +1,181 @@
+import json
+import struct
+from os import PathLike
+from typing import Any, Dict, Text, Union
+
+import numpy as np
+
+from . import NML, NMLParameters, Branchpoint, Comment, Group, Volume
+from .nml_columnar import ColumnarNML, NodeColumns, nml_to_columnar
+
+BINARY_MAGIC = b"WKNMLBIN"
+"""The first bytes of every file written by `write_binary`."""
+
+__BINARY_VERSION = 1
+__HEADER_LENGTH = struct.Struct("<Q")
+__ALIGNMENT = 64
+
+
+def __align(position: int) -> int:
+    return -(-position // __ALIGNMENT) * __ALIGNMENT
+
+
+def __encode_group(group: Group) -> list:
+    return [group.id, group.name, [__encode_group(child) for child in group.children]]
+
+
+def __decode_group(data: list) -> Group:
+    group_id, name, children = data
+    return Group(group_id, name, [__decode_group(child) for child in children])
+
+
+def __decode_parameters(data: Dict[Text, Any]) -> NMLParameters:
+    # JSON turns all tuples into lists
+    parameters = {
+        name: tuple(value) if isinstance(value, list) else value
+        for name, value in data.items()
+    }
+    if parameters.get("userBoundingBoxes") is not None:
+        parameters["userBoundingBoxes"] = [
+            tuple(bounding_box) for bounding_box in parameters["userBoundingBoxes"]
+        ]
+    return NMLParameters(**parameters)
+
+
+def __columnar_arrays(columnar: ColumnarNML) -> Dict[Text, np.ndarray]:
+    arrays = {
+        "tree_ids": columnar.tree_ids,
+        "tree_colors": columnar.tree_colors,
+        "tree_group_ids": columnar.tree_group_ids,
+        "node_offsets": columnar.node_offsets,
+        "edge_offsets": columnar.edge_offsets,
+        "edges": columnar.edges,
+    }
+    for name, values in columnar.nodes._asdict().items():
+        arrays["nodes." + name] = values
+    return arrays
+
+
+def write_binary(path: Union[Text, PathLike], nml: Union[NML, ColumnarNML]):
+    """
+    Writes an annotation to a binary file that can be loaded much faster than an NML file. The file is a self-describing container: a JSON header holds the parameters, tree names, branchpoints, comments, groups and volume as well as the data type, shape and position of all node, edge and tree arrays, which follow as raw little-endian data.
+
+    Note:
+        The binary format complements the XML format for internal use. Use `write_nml` to exchange annotations with webKnossos.
+
+    Arguments:
+        path (Union[Text, PathLike]): Path of the output file
+        nml (Union[NML, ColumnarNML]): A wK skeleton annotation, either as regular or as columnar object
+
+    Example:
+        ```
+        wknml.write_binary("annotation.wknmlbin", nml)
+        columnar = wknml.load_binary("annotation.wknmlbin")
+        ```
+    """
+
+    columnar = nml if isinstance(nml, ColumnarNML) else nml_to_columnar(nml)
+
+    arrays = {}
+    array_descriptions = {}
+    offset = 0
+    for name, values in __columnar_arrays(columnar).items():
+        values = np.ascontiguousarray(values)
+        values = values.astype(values.dtype.newbyteorder("<"), copy=False)
+        arrays[name] = (offset, values)
+        array_descriptions[name] = {
+            "dtype": values.dtype.str,
+            "shape": list(values.shape),
+            "offset": offset,
+        }
+        offset = __align(offset + values.nbytes)
+
+    header = json.dumps(
+        {
+            "version": __BINARY_VERSION,
+            "parameters": columnar.parameters._asdict(),
+            "tree_names": columnar.tree_names,
+            "branchpoints": [
+                list(branchpoint) for branchpoint in columnar.branchpoints
+            ],
+            "comments": [list(comment) for comment in columnar.comments],
+            "groups": [__encode_group(group) for group in columnar.groups],
+            "volume": list(columnar.volume) if columnar.volume is not None else None,
+            "arrays": array_descriptions,
+        },
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+    with open(path, "wb") as f:
+        f.write(BINARY_MAGIC)
+        f.write(__HEADER_LENGTH.pack(len(header)))
+        f.write(header)
+        data_start = __align(f.tell())
+        for offset, values in arrays.values():
+            f.write(b"\0" * (data_start + offset - f.tell()))
+            values.tofile(f)
+
+
+def __read_header(f) -> Dict[Text, Any]:
+    if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+        raise ValueError(f"{f.name} is not a binary NML file.")
+    (header_length,) = __HEADER_LENGTH.unpack(f.read(__HEADER_LENGTH.size))
+    header = json.loads(f.read(header_length).decode("utf-8"))
+    if header.get("version") != __BINARY_VERSION:
+        raise ValueError(f"Unsupported binary NML version {header.get('version')}.")
+    header["data_start"] = __align(f.tell())
+    return header
+
+
+def __load_array(
+    f, description: Dict[Text, Any], data_start: int, mmap: bool
+) -> np.ndarray:
+    dtype = np.dtype(description["dtype"])
+    shape = tuple(description["shape"])
+    offset = data_start + description["offset"]
+    count = int(np.prod(shape))
+
+    if count == 0:
+        return np.empty(shape, dtype=dtype)
+    if mmap:
+        return np.memmap(f, dtype=dtype, mode="r", offset=offset, shape=shape)
+    f.seek(offset)
+    return np.fromfile(f, dtype=dtype, count=count).reshape(shape)
+
+
+def load_binary(path: Union[Text, PathLike], mmap: bool = True) -> ColumnarNML:
+    """
+    Loads an annotation written by `write_binary`.
+
+    Arguments:
+        path (Union[Text, PathLike]): Path of a binary NML file
+        mmap (bool = True): Memory-map the node, edge and tree arrays instead of reading them. Opening a file is then nearly instant, independent of its size, and only the parts of the arrays that are accessed are read from disk. The arrays are read-only.
+
+    Return:
+        ColumnarNML: The annotation with NumPy-backed nodes and edges. Use `columnar_to_nml` to convert it to a regular `NML` object.
+    """
+
+    with open(path, "rb") as f:
+        header = __read_header(f)
+        arrays = {
+            name: __load_array(f, description, header["data_start"], mmap)
+            for name, description in header["arrays"].items()
+        }
+
+    return ColumnarNML(
+        parameters=__decode_parameters(header["parameters"]),
+        tree_ids=arrays["tree_ids"],
+        tree_names=header["tree_names"],
+        tree_colors=arrays["tree_colors"],
+        tree_group_ids=arrays["tree_group_ids"],
+        node_offsets=arrays["node_offsets"],
+        edge_offsets=arrays["edge_offsets"],
+        nodes=NodeColumns(
+            **{name: arrays["nodes." + name] for name in NodeColumns._fields}
+        ),
+        edges=arrays["edges"],
+        branchpoints=[Branchpoint(*values) for values in header["branchpoints"]],
+        comments=[Comment(*values) for values in header["comments"]],
+        groups=[__decode_group(group) for group in header["groups"]],
+        volume=Volume(*header["volume"]) if header["volume"] is not None else None,
+    )
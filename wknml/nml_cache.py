@@ -0,0 +1,162 @@
+import gc
+import hashlib
+import os
+import tempfile
+from os import PathLike
+from pathlib import Path
+from typing import Callable, Optional, Text, Union
+
+from . import NML
+from .nml_binary import load_binary, write_binary
+from .nml_columnar import columnar_to_nml, parse_nml_columnar
+
+DEFAULT_CACHE_SIZE = 1 << 30
+"""Default maximum size of a parse cache directory in bytes (1 GiB)."""
+
+# Bump when the format of the entries changes to invalidate existing cache entries
+__CACHE_VERSION = 2
+__DATA_SUFFIX = ".wknmlbin"
+__STAT_SUFFIX = ".stat"
+
+
+def __default_cache_dir() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "wknml"
+
+
+def __hash_file(path: Union[Text, PathLike]) -> Text:
+    digest = hashlib.blake2b(str(__CACHE_VERSION).encode(), digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def __hash_stat(path: Union[Text, PathLike]) -> Text:
+    stat = os.stat(path)
+    key = (
+        f"{__CACHE_VERSION}:{os.path.realpath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    )
+    return hashlib.blake2b(key.encode(), digest_size=20).hexdigest()
+
+
+def __write_atomically(path: Path, write: Callable[[Text], None]):
+    # Concurrent readers either see the old file, no file or the complete new file
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def __load_entry(path: Path, compact: bool) -> Optional[NML]:
+    try:
+        # The arrays are read instead of memory-mapped, so that the entry can
+        # be evicted while the annotation is still in use
+        columnar = load_binary(path, mmap=False)
+    except Exception:
+        # Evicted by another process in the meantime or corrupt
+        return None
+
+    # Creating the many small node objects would trigger the cyclic garbage
+    # collector over and over again
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        nml = columnar_to_nml(columnar, compact)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    try:
+        # Marks the entry as recently used
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+    return nml
+
+
+def __evict(cache_dir: Path, max_size: int):
+    entries = []
+    for path in [
+        *cache_dir.glob("*" + __DATA_SUFFIX),
+        *cache_dir.glob("*" + __STAT_SUFFIX),
+    ]:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= max_size:
+            break
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        total_size -= size
+
+
+def parse_nml_cached(
+    path: Union[Text, PathLike],
+    cache_dir: Optional[Union[Text, PathLike]] = None,
+    max_size: int = DEFAULT_CACHE_SIZE,
+    engine: Text = "auto",
+    compact: bool = False,
+) -> NML:
+    """
+    Parses an NML file like `parse_nml` and keeps the result in an on-disk cache. Unchanged files are loaded from the cache, which is much faster than parsing the XML again.
+
+    Cache entries are stored in the binary format of `write_binary` and keyed by the content hash of the file. The hash is remembered per path, size and modification time, so that unchanged files are not read at all. The least recently used entries are removed once the cache grows beyond `max_size`. Multiple processes can share a cache directory, as all files are replaced atomically.
+
+    Note:
+        Most of the loading time is spent on creating the `Node` and `Edge` objects. With `compact=True`, the trees are views of the cached arrays instead, which loads large annotations orders of magnitude faster than parsing them.
+
+    Arguments:
+        path (Union[Text, PathLike]): Path of an NML file. Compressed files are supported, see `open_nml`.
+        cache_dir (Optional[Union[Text, PathLike]] = None): Directory of the cache. Default: `$XDG_CACHE_HOME/wknml` or `~/.cache/wknml`
+        max_size (int = DEFAULT_CACHE_SIZE): Maximum total size of the cache entries in bytes
+        engine (Text = "auto"): The XML parser backend used on cache misses. See `parse_nml`.
+        compact (bool = False): Return the nodes and edges as read-only views of the cached arrays, see `columnar_to_nml`
+
+    Return:
+        NML: A webKnossos skeleton annotation as Python NML object
+
+    Example:
+        ```
+        nml = wknml.parse_nml_cached("input.nml", cache_dir="/tmp/nml-cache")
+        ```
+    """
+
+    cache_dir = Path(cache_dir) if cache_dir is not None else __default_cache_dir()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    stat_path = cache_dir / (__hash_stat(path) + __STAT_SUFFIX)
+    try:
+        content_hash = stat_path.read_text()
+    except (FileNotFoundError, UnicodeDecodeError):
+        content_hash = None
+
+    if content_hash:
+        nml = __load_entry(cache_dir / (content_hash + __DATA_SUFFIX), compact)
+        if nml is not None:
+            return nml
+
+    content_hash = __hash_file(path)
+    data_path = cache_dir / (content_hash + __DATA_SUFFIX)
+    nml = __load_entry(data_path, compact)
+    if nml is None:
+        columnar = parse_nml_columnar(path, engine)
+        __write_atomically(data_path, lambda tmp_path: write_binary(tmp_path, columnar))
+        __evict(cache_dir, max_size)
+        nml = columnar_to_nml(columnar, compact)
+    __write_atomically(
+        stat_path, lambda tmp_path: Path(tmp_path).write_text(content_hash)
+    )
+
+    return nml
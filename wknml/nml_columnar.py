@@ -0,0 +1,528 @@
+from abc import abstractmethod
+from array import array
+from collections.abc import Sequence
+from typing import BinaryIO, Dict, Iterable, List, NamedTuple, Optional, Text, Tuple
+
+import numpy as np
+
+from . import (
+    NML,
+    NMLParameters,
+    Node,
+    Edge,
+    Tree,
+    Branchpoint,
+    Comment,
+    Group,
+    Volume,
+    __consume,
+    __get_tree_filter,
+    __parse_nml,
+    __parse_tree,
+)
+
+MISSING = -1
+"""Placeholder for missing optional integer node attributes in `NodeColumns`."""
+
+
+class NodeColumns(NamedTuple):
+    """
+    The nodes of a skeleton annotation stored as one NumPy array per attribute. Row `i` of each array belongs to the same node.
+
+    Note:
+        Missing optional float attributes are stored as `NaN`, missing optional integer attributes as `MISSING` (-1).
+
+    Attributes:
+        id (np.ndarray): Node ids. Shape: (n,), dtype: int64
+        position (np.ndarray): Node positions. Shape: (n, 3), dtype: float64
+        radius (np.ndarray): Node radii. Shape: (n,), dtype: float64
+        rotation (np.ndarray): Camera rotations. Shape: (n, 3), dtype: float64
+        inVp (np.ndarray): Viewports. Shape: (n,), dtype: int32
+        inMag (np.ndarray): Magnification levels. Shape: (n,), dtype: int32
+        bitDepth (np.ndarray): Rendering bit-depths. Shape: (n,), dtype: int32
+        interpolation (np.ndarray): Interpolation flags (0 or 1). Shape: (n,), dtype: int8
+        time (np.ndarray): Unix timestamps. Shape: (n,), dtype: int64
+    """
+
+    id: np.ndarray
+    position: np.ndarray
+    radius: np.ndarray
+    rotation: np.ndarray
+    inVp: np.ndarray
+    inMag: np.ndarray
+    bitDepth: np.ndarray
+    interpolation: np.ndarray
+    time: np.ndarray
+
+
+class ColumnarNML(NamedTuple):
+    """
+    A memory-efficient variant of the `NML` object. Instead of one `Node` and `Edge` object per node and edge, the nodes and edges of all trees are stored in shared NumPy arrays. Tree `i` owns the nodes `node_offsets[i]:node_offsets[i + 1]` and the edges `edge_offsets[i]:edge_offsets[i + 1]`.
+
+    Attributes:
+        parameters (NMLParameters): All the metadata attributes associated with a wK annotation.
+        tree_ids (np.ndarray): Tree ids. Shape: (t,), dtype: int64
+        tree_names (List[Optional[str]]): Tree names
+        tree_colors (np.ndarray): RGBA tree colors, `NaN` if a tree has no color. Shape: (t, 4), dtype: float64
+        tree_group_ids (np.ndarray): Group id references, -1 if a tree belongs to no group. Shape: (t,), dtype: int64
+        node_offsets (np.ndarray): Start of the node range of each tree. Shape: (t + 1,), dtype: int64
+        edge_offsets (np.ndarray): Start of the edge range of each tree. Shape: (t + 1,), dtype: int64
+        nodes (NodeColumns): The nodes of all trees
+        edges (np.ndarray): Source and target node ids of all edges. Shape: (m, 2), dtype: int64
+        branchpoints (List[Branchpoint]): A list of all branchpoint objects.
+        comments (List[Comment]): A list of all comment objects.
+        groups (List[Group]): A list of all group objects.
+        volume (Optional[Volume]): A reference to any volume data that is part of this annotation.
+    """
+
+    parameters: NMLParameters
+    tree_ids: np.ndarray
+    tree_names: List[Optional[str]]
+    tree_colors: np.ndarray
+    tree_group_ids: np.ndarray
+    node_offsets: np.ndarray
+    edge_offsets: np.ndarray
+    nodes: NodeColumns
+    edges: np.ndarray
+    branchpoints: List[Branchpoint]
+    comments: List[Comment]
+    groups: List[Group]
+    volume: Optional[Volume] = None
+
+
+def __to_numpy(buffer: array, dtype, columns: int = 1) -> np.ndarray:
+    # np.frombuffer shares the memory of the array instead of copying it
+    if len(buffer) == 0:
+        result = np.empty(0, dtype=dtype)
+    else:
+        result = np.frombuffer(buffer, dtype=dtype)
+    if columns > 1:
+        result = result.reshape(-1, columns)
+    return result
+
+
+def parse_nml_columnar(
+    file: BinaryIO,
+    engine: Text = "auto",
+    tree_ids: Optional[Iterable[int]] = None,
+    group_ids: Optional[Iterable[int]] = None,
+) -> ColumnarNML:
+    """
+    Reads a webKnossos NML skeleton file from disk and parses it into a `ColumnarNML` object. Node and edge attributes are written straight into growable typed buffers, so that no Python object is created per node or edge.
+
+    Arguments:
+        file (BinaryIO): A Python file handle
+        engine (Text = "auto"): The XML parser backend. See `parse_nml`.
+        tree_ids (Optional[Iterable[int]] = None): Only parse the trees with these ids
+        group_ids (Optional[Iterable[int]] = None): Only parse the trees that directly belong to one of these groups
+
+    Return:
+        ColumnarNML: A webKnossos skeleton annotation with NumPy-backed nodes and edges
+
+    Example:
+        ```
+        with open("input.nml", "rb") as f:
+            columnar = wknml.parse_nml_columnar(f)
+        nml = wknml.columnar_to_nml(columnar)
+        ```
+    """
+
+    tree_filter = __get_tree_filter(tree_ids, group_ids)
+    nan = float("nan")
+    no_rotation = (nan, nan, nan)
+
+    parsed_tree_ids = array("q")
+    tree_names = []
+    tree_colors = array("d")
+    tree_group_ids = array("q")
+    node_offsets = array("q")
+    edge_offsets = array("q")
+
+    node_ids = array("q")
+    positions = array("d")
+    radii = array("d")
+    rotations = array("d")
+    viewports = array("i")
+    mags = array("i")
+    bit_depths = array("i")
+    interpolations = array("b")
+    times = array("q")
+    edges = array("q")
+
+    def start_tree(attrib: Dict[Text, Text]):
+        tree = __parse_tree(attrib)
+        parsed_tree_ids.append(tree.id)
+        tree_names.append(tree.name)
+        tree_colors.extend(tree.color if tree.color is not None else (nan,) * 4)
+        tree_group_ids.append(tree.groupId if tree.groupId is not None else -1)
+        node_offsets.append(len(node_ids))
+        edge_offsets.append(len(edges) // 2)
+
+    def add_node(attrib: Dict[Text, Text]):
+        get = attrib.get
+        node_ids.append(int(get("id")))
+        positions.extend((float(get("x")), float(get("y")), float(get("z"))))
+        value = get("radius")
+        radii.append(float(value) if value is not None else nan)
+        value = get("rotX")
+        rotations.extend(
+            (float(value), float(get("rotY")), float(get("rotZ")))
+            if value is not None
+            else no_rotation
+        )
+        value = get("inVp")
+        viewports.append(int(value) if value is not None else MISSING)
+        value = get("inMag")
+        mags.append(int(value) if value is not None else MISSING)
+        value = get("bitDepth")
+        bit_depths.append(int(value) if value is not None else MISSING)
+        value = get("interpolation")
+        interpolations.append(int(bool(value)) if value is not None else MISSING)
+        value = get("time")
+        times.append(int(value) if value is not None else MISSING)
+
+    def add_edge(attrib: Dict[Text, Text]):
+        edges.extend((int(attrib.get("source")), int(attrib.get("target"))))
+
+    def end_tree():
+        pass
+
+    nml = __consume(
+        __parse_nml(file, start_tree, add_node, add_edge, end_tree, engine, tree_filter)
+    )
+
+    node_offsets.append(len(node_ids))
+    edge_offsets.append(len(edges) // 2)
+
+    return ColumnarNML(
+        parameters=nml.parameters,
+        tree_ids=__to_numpy(parsed_tree_ids, np.int64),
+        tree_names=tree_names,
+        tree_colors=__to_numpy(tree_colors, np.float64, 4),
+        tree_group_ids=__to_numpy(tree_group_ids, np.int64),
+        node_offsets=__to_numpy(node_offsets, np.int64),
+        edge_offsets=__to_numpy(edge_offsets, np.int64),
+        nodes=NodeColumns(
+            id=__to_numpy(node_ids, np.int64),
+            position=__to_numpy(positions, np.float64, 3),
+            radius=__to_numpy(radii, np.float64),
+            rotation=__to_numpy(rotations, np.float64, 3),
+            inVp=__to_numpy(viewports, np.int32),
+            inMag=__to_numpy(mags, np.int32),
+            bitDepth=__to_numpy(bit_depths, np.int32),
+            interpolation=__to_numpy(interpolations, np.int8),
+            time=__to_numpy(times, np.int64),
+        ),
+        edges=__to_numpy(edges, np.int64, 2),
+        branchpoints=nml.branchpoints,
+        comments=nml.comments,
+        groups=nml.groups,
+        volume=nml.volume,
+    )
+
+
+class __ColumnarSequence(Sequence):
+    # Base class of read-only sequences over the rows start:stop of shared arrays.
+    # Objects are only created on access and iteration proceeds in blocks.
+
+    __BLOCK_SIZE = 4096
+
+    def __init__(self, start: int, stop: int):
+        self.start = start
+        self.stop = stop
+
+    @abstractmethod
+    def _materialize(self, start: int, stop: int) -> list:
+        # Creates the objects of the rows start:stop
+        ...
+
+    @abstractmethod
+    def _slice(self, start: int, stop: int) -> "__ColumnarSequence":
+        # A sequence of the same type over the rows start:stop
+        ...
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return self._slice(self.start + start, self.start + max(start, stop))
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"{type(self).__name__} index out of range")
+        return self._materialize(self.start + index, self.start + index + 1)[0]
+
+    def __iter__(self):
+        for start in range(self.start, self.stop, self.__BLOCK_SIZE):
+            yield from self._materialize(
+                start, min(start + self.__BLOCK_SIZE, self.stop)
+            )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, (str, tuple)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({len(self)} items)"
+
+
+class NodeSequence(__ColumnarSequence):
+    """
+    A read-only sequence of `Node` objects backed by the arrays of a `NodeColumns` object. A `Node` object is only created when it is accessed, so that a tree takes up no more memory than its columnar storage. Supports `len`, indexing, slicing, iteration and comparison with lists of nodes.
+    """
+
+    def __init__(
+        self, columns: NodeColumns, start: int = 0, stop: Optional[int] = None
+    ):
+        super().__init__(start, len(columns.id) if stop is None else stop)
+        self.columns = columns
+
+    def _slice(self, start: int, stop: int) -> "NodeSequence":
+        return NodeSequence(self.columns, start, stop)
+
+    def _materialize(self, start: int, stop: int) -> List[Node]:
+        columns = self.columns
+
+        def optional_values(values: list, missing: np.ndarray) -> list:
+            # Columns without any or with only missing values are common and
+            # are converted without a Python-level check per value
+            if not missing.any():
+                return values
+            if missing.all():
+                return [None] * len(values)
+            return [
+                None if is_missing else value
+                for value, is_missing in zip(values, missing.tolist())
+            ]
+
+        def optional_floats(values: np.ndarray) -> list:
+            return optional_values(values.tolist(), np.isnan(values))
+
+        def optional_ints(values: np.ndarray) -> list:
+            return optional_values(values.tolist(), values == MISSING)
+
+        rotation_values = columns.rotation[start:stop]
+        rotations = optional_values(
+            list(map(tuple, rotation_values.tolist())),
+            np.isnan(rotation_values[:, 0]),
+        )
+        interpolation_values = columns.interpolation[start:stop]
+        interpolations = optional_values(
+            interpolation_values.astype(bool).tolist(),
+            interpolation_values == MISSING,
+        )
+
+        # _make takes the attribute tuples from zip directly, which is
+        # considerably faster than calling Node with keyword arguments
+        return list(
+            map(
+                Node._make,
+                zip(
+                    columns.id[start:stop].tolist(),
+                    map(tuple, columns.position[start:stop].tolist()),
+                    optional_floats(columns.radius[start:stop]),
+                    rotations,
+                    optional_ints(columns.inVp[start:stop]),
+                    optional_ints(columns.inMag[start:stop]),
+                    optional_ints(columns.bitDepth[start:stop]),
+                    interpolations,
+                    optional_ints(columns.time[start:stop]),
+                ),
+            )
+        )
+
+
+class EdgeSequence(__ColumnarSequence):
+    """
+    A read-only sequence of `Edge` objects backed by an array of source and target node ids with shape (m, 2). An `Edge` object is only created when it is accessed.
+    """
+
+    def __init__(self, edges: np.ndarray, start: int = 0, stop: Optional[int] = None):
+        super().__init__(start, len(edges) if stop is None else stop)
+        self.edges = edges
+
+    def _slice(self, start: int, stop: int) -> "EdgeSequence":
+        return EdgeSequence(self.edges, start, stop)
+
+    def _materialize(self, start: int, stop: int) -> List[Edge]:
+        return list(map(Edge._make, self.edges[start:stop].tolist()))
+
+
+def columnar_to_tree(columnar: ColumnarNML, index: int, compact: bool = False) -> Tree:
+    """
+    A utility to materialize a single tree of a `ColumnarNML` as a regular `Tree` object.
+
+    Arguments:
+        columnar (ColumnarNML): A columnar wK skeleton annotation
+        index (int): The position of the tree in `columnar.tree_ids` (not the tree id)
+        compact (bool = False): Return the nodes and edges as read-only `NodeSequence` and `EdgeSequence` views of the columnar storage instead of lists
+
+    Return:
+        Tree: The tree with `Node` and `Edge` objects
+    """
+
+    node_start, node_stop = columnar.node_offsets[index : index + 2].tolist()
+    edge_start, edge_stop = columnar.edge_offsets[index : index + 2].tolist()
+    tree_nodes = NodeSequence(columnar.nodes, node_start, node_stop)
+    tree_edges = EdgeSequence(columnar.edges, edge_start, edge_stop)
+    if not compact:
+        # All objects at once, without iterating block by block
+        tree_nodes = tree_nodes._materialize(node_start, node_stop)
+        tree_edges = tree_edges._materialize(edge_start, edge_stop)
+
+    color = columnar.tree_colors[index]
+    group_id = int(columnar.tree_group_ids[index])
+
+    return Tree(
+        id=int(columnar.tree_ids[index]),
+        color=None if np.isnan(color).any() else tuple(color.tolist()),
+        name=columnar.tree_names[index],
+        nodes=tree_nodes,
+        edges=tree_edges,
+        groupId=group_id if group_id >= 0 else None,
+    )
+
+
+def columnar_to_nml(columnar: ColumnarNML, compact: bool = False) -> NML:
+    """
+    A utility to convert a `ColumnarNML` object into a regular `NML` object.
+
+    Note:
+        With `compact=True`, each node takes up less than a fifth of the memory of a `Node` object. All code that only reads the nodes and edges, e.g. `write_nml`, works with compact trees. To modify a compact tree, convert its nodes and edges to lists first: `tree._replace(nodes=list(tree.nodes), edges=list(tree.edges))`.
+
+    Arguments:
+        columnar (ColumnarNML): A columnar wK skeleton annotation
+        compact (bool = False): Return the nodes and edges of each tree as read-only `NodeSequence` and `EdgeSequence` views of the columnar storage instead of lists
+
+    Return:
+        NML: A wK NML skeleton annotation object
+
+    Example:
+        ```
+        nml = wknml.columnar_to_nml(wknml.parse_nml_columnar(f), compact=True)
+        print(nml.trees[0].nodes[0].position)
+        ```
+    """
+
+    return NML(
+        parameters=columnar.parameters,
+        trees=[
+            columnar_to_tree(columnar, i, compact)
+            for i in range(len(columnar.tree_ids))
+        ],
+        branchpoints=columnar.branchpoints,
+        comments=columnar.comments,
+        groups=columnar.groups,
+        volume=columnar.volume,
+    )
+
+
+def nml_to_columnar(nml: NML) -> ColumnarNML:
+    """
+    A utility to convert a regular `NML` object into a `ColumnarNML` object.
+
+    Arguments:
+        nml (NML): A wK NML skeleton annotation object
+
+    Return:
+        ColumnarNML: The same annotation with NumPy-backed nodes and edges
+    """
+
+    nan = float("nan")
+    nodes = [node for tree in nml.trees for node in tree.nodes]
+    edges = [edge for tree in nml.trees for edge in tree.edges]
+
+    def optional(values, missing):
+        return [missing if value is None else value for value in values]
+
+    return ColumnarNML(
+        parameters=nml.parameters,
+        tree_ids=np.array([tree.id for tree in nml.trees], dtype=np.int64),
+        tree_names=[tree.name for tree in nml.trees],
+        tree_colors=np.array(
+            [
+                tree.color if tree.color is not None else (nan,) * 4
+                for tree in nml.trees
+            ],
+            dtype=np.float64,
+        ).reshape(-1, 4),
+        tree_group_ids=np.array(
+            optional((tree.groupId for tree in nml.trees), -1), dtype=np.int64
+        ),
+        node_offsets=np.cumsum(
+            [0] + [len(tree.nodes) for tree in nml.trees], dtype=np.int64
+        ),
+        edge_offsets=np.cumsum(
+            [0] + [len(tree.edges) for tree in nml.trees], dtype=np.int64
+        ),
+        nodes=NodeColumns(
+            id=np.array([node.id for node in nodes], dtype=np.int64),
+            position=np.array(
+                [node.position for node in nodes], dtype=np.float64
+            ).reshape(-1, 3),
+            radius=np.array(
+                optional((node.radius for node in nodes), nan), dtype=np.float64
+            ),
+            rotation=np.array(
+                optional((node.rotation for node in nodes), (nan,) * 3),
+                dtype=np.float64,
+            ).reshape(-1, 3),
+            inVp=np.array(optional((n.inVp for n in nodes), MISSING), dtype=np.int32),
+            inMag=np.array(optional((n.inMag for n in nodes), MISSING), dtype=np.int32),
+            bitDepth=np.array(
+                optional((n.bitDepth for n in nodes), MISSING), dtype=np.int32
+            ),
+            interpolation=np.array(
+                optional((n.interpolation for n in nodes), MISSING), dtype=np.int8
+            ),
+            time=np.array(optional((n.time for n in nodes), MISSING), dtype=np.int64),
+        ),
+        edges=np.array(
+            [(edge.source, edge.target) for edge in edges], dtype=np.int64
+        ).reshape(-1, 2),
+        branchpoints=nml.branchpoints,
+        comments=nml.comments,
+        groups=nml.groups,
+        volume=nml.volume,
+    )
+
+
+def __get_edge_rows(columnar: ColumnarNML) -> Tuple[np.ndarray, np.ndarray]:
+    # Returns the node rows of the sources and targets of all edges. Edges are
+    # resolved within their tree, as node ids might repeat across trees.
+    node_ids = columnar.nodes.id
+    num_nodes = len(node_ids)
+    num_trees = len(columnar.tree_ids)
+    node_tree_indices = np.repeat(np.arange(num_trees), np.diff(columnar.node_offsets))
+    edge_tree_indices = np.repeat(np.arange(num_trees), np.diff(columnar.edge_offsets))
+    if len(columnar.edges) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    min_id = int(node_ids.min()) if num_nodes > 0 else 0
+    span = int(node_ids.max()) - min_id + 1 if num_nodes > 0 else 1
+    if num_trees * span >= 2 ** 62:
+        raise ValueError("The range of node ids is too large.")
+
+    node_keys = node_tree_indices * span + (node_ids - min_id)
+    order = np.argsort(node_keys, kind="stable")
+    sorted_keys = node_keys[order]
+
+    def rows_of(edge_node_ids: np.ndarray) -> np.ndarray:
+        keys = edge_tree_indices * span + (edge_node_ids - min_id)
+        positions = np.minimum(np.searchsorted(sorted_keys, keys), num_nodes - 1)
+        valid = (edge_node_ids >= min_id) & (edge_node_ids < min_id + span)
+        if num_nodes == 0 or not np.all(valid & (sorted_keys[positions] == keys)):
+            raise ValueError(
+                "Some edges reference nodes that are not part of their tree."
+            )
+        return order[positions]
+
+    return rows_of(columnar.edges[:, 0]), rows_of(columnar.edges[:, 1])
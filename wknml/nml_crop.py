@@ -0,0 +1,276 @@
+import os
+from os import PathLike
+from typing import BinaryIO, Iterator, Optional, Sequence, Text, Tuple, Union
+
+import numpy as np
+
+from . import NML, NMLParameters, Tree, iter_trees
+from .nml_columnar import (
+    ColumnarNML,
+    NodeColumns,
+    columnar_to_nml,
+    nml_to_columnar,
+    __get_edge_rows,
+)
+
+CROP_MODES = ("drop", "clip")
+"""The supported modes of `crop`."""
+
+
+def __bbox_corners(bbox: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+    if len(bbox) != 6:
+        raise ValueError(
+            "A bounding box needs to be given as (x, y, z, width, height, depth)."
+        )
+    bbox_min = np.array(bbox[:3], dtype=np.float64)
+    return bbox_min, bbox_min + np.array(bbox[3:], dtype=np.float64)
+
+
+def __connected_components(
+    num_nodes: int, sources: np.ndarray, targets: np.ndarray
+) -> np.ndarray:
+    # Hooking and pointer jumping: returns the smallest row of the component
+    # of each row in a logarithmic number of rounds, even for long paths
+    parents = np.arange(num_nodes)
+    while True:
+        source_roots, target_roots = parents[sources], parents[targets]
+        if np.array_equal(source_roots, target_roots):
+            return parents
+        np.minimum.at(
+            parents,
+            np.maximum(source_roots, target_roots),
+            np.minimum(source_roots, target_roots),
+        )
+        while True:
+            grandparents = parents[parents]
+            if np.array_equal(grandparents, parents):
+                break
+            parents = grandparents
+
+
+def __crop_columnar(
+    columnar: ColumnarNML,
+    bbox: Sequence[float],
+    mode: Text,
+    next_tree_id: int,
+    next_node_id: int,
+) -> ColumnarNML:
+    if mode not in CROP_MODES:
+        raise ValueError(f"Unknown crop mode {mode}. Supported are {CROP_MODES}.")
+    bbox_min, bbox_max = __bbox_corners(bbox)
+
+    nodes = columnar.nodes
+    num_trees = len(columnar.tree_ids)
+    node_tree_indices = np.repeat(np.arange(num_trees), np.diff(columnar.node_offsets))
+    sources, targets = __get_edge_rows(columnar)
+    edge_keys = np.arange(len(sources))
+    inside = np.all((nodes.position >= bbox_min) & (nodes.position < bbox_max), axis=1)
+
+    kept_rows = np.flatnonzero(inside)
+    kept_edges = inside[sources] & inside[targets]
+    # Rows of the new node table: kept nodes first, then the nodes on the boundary
+    new_rows = np.full(len(inside), -1)
+    new_rows[kept_rows] = np.arange(len(kept_rows))
+    edge_sources, edge_targets = (
+        new_rows[sources[kept_edges]],
+        new_rows[targets[kept_edges]],
+    )
+    edge_keys = edge_keys[kept_edges]
+    node_columns = {name: values[kept_rows] for name, values in nodes._asdict().items()}
+    new_node_tree_indices = node_tree_indices[kept_rows]
+
+    if mode == "clip":
+        # Crossing edges end at a new node where they leave the box
+        crossing = np.flatnonzero(inside[sources] != inside[targets])
+        source_inside = inside[sources[crossing]]
+        inner_rows = np.where(source_inside, sources[crossing], targets[crossing])
+        outer_rows = np.where(source_inside, targets[crossing], sources[crossing])
+        inner_positions = nodes.position[inner_rows]
+        directions = nodes.position[outer_rows] - inner_positions
+        with np.errstate(divide="ignore", invalid="ignore"):
+            exits = np.where(
+                directions > 0,
+                (bbox_max - inner_positions) / directions,
+                (bbox_min - inner_positions) / directions,
+            )
+        exits[directions == 0] = np.inf
+        fractions = np.clip(exits.min(axis=1), 0, 1)[:, np.newaxis]
+
+        num_boundary_nodes = len(crossing)
+        boundary_ids = np.arange(next_node_id, next_node_id + num_boundary_nodes)
+        boundary_rows = len(kept_rows) + np.arange(num_boundary_nodes)
+        for name, values in nodes._asdict().items():
+            node_columns[name] = np.concatenate(
+                [node_columns[name], values[inner_rows]]
+            )
+        node_columns["id"][boundary_rows] = boundary_ids
+        # The box is half-open, nodes on its upper bound are moved to the
+        # largest position below it, so that they are still inside
+        node_columns["position"][boundary_rows] = np.clip(
+            inner_positions + directions * fractions,
+            bbox_min,
+            np.nextafter(bbox_max, -np.inf),
+        )
+        new_node_tree_indices = np.concatenate(
+            [new_node_tree_indices, node_tree_indices[inner_rows]]
+        )
+        edge_sources = np.concatenate(
+            [edge_sources, np.where(source_inside, new_rows[inner_rows], boundary_rows)]
+        )
+        edge_targets = np.concatenate(
+            [edge_targets, np.where(source_inside, boundary_rows, new_rows[inner_rows])]
+        )
+        edge_keys = np.concatenate([edge_keys, crossing])
+
+        # Keeps the nodes grouped by tree
+        node_order = np.argsort(new_node_tree_indices, kind="stable")
+        new_node_tree_indices = new_node_tree_indices[node_order]
+        node_columns = {
+            name: values[node_order] for name, values in node_columns.items()
+        }
+        reordered_rows = np.empty_like(node_order)
+        reordered_rows[node_order] = np.arange(len(node_order))
+        edge_sources = reordered_rows[edge_sources]
+        edge_targets = reordered_rows[edge_targets]
+
+    # Every connected component becomes a tree, identified by its first node
+    num_nodes = len(new_node_tree_indices)
+    roots = __connected_components(num_nodes, edge_sources, edge_targets)
+    node_order = np.argsort(roots, kind="stable")
+    edge_order = np.lexsort((edge_keys, roots[edge_sources]))
+    component_roots, node_counts = np.unique(roots, return_counts=True)
+    edge_counts = np.bincount(
+        np.searchsorted(component_roots, roots[edge_sources]),
+        minlength=len(component_roots),
+    )
+
+    # The first component of a tree keeps its id, the others get new ids
+    component_tree_indices = new_node_tree_indices[component_roots]
+    is_split = np.zeros(len(component_roots), dtype=bool)
+    is_split[1:] = component_tree_indices[1:] == component_tree_indices[:-1]
+    tree_ids = np.array(columnar.tree_ids, dtype=np.int64)[component_tree_indices]
+    tree_ids[is_split] = next_tree_id + np.arange(np.count_nonzero(is_split))
+
+    node_ids = node_columns["id"]
+    kept_node_ids = set(nodes.id[kept_rows].tolist())
+    return columnar._replace(
+        tree_ids=tree_ids,
+        tree_names=[columnar.tree_names[i] for i in component_tree_indices.tolist()],
+        tree_colors=columnar.tree_colors[component_tree_indices],
+        tree_group_ids=columnar.tree_group_ids[component_tree_indices],
+        node_offsets=np.concatenate([[0], np.cumsum(node_counts)]),
+        edge_offsets=np.concatenate([[0], np.cumsum(edge_counts)]),
+        nodes=NodeColumns(
+            **{name: values[node_order] for name, values in node_columns.items()}
+        ),
+        edges=np.stack(
+            [node_ids[edge_sources[edge_order]], node_ids[edge_targets[edge_order]]],
+            axis=1,
+        ).reshape(-1, 2),
+        branchpoints=[
+            branchpoint
+            for branchpoint in columnar.branchpoints
+            if branchpoint.id in kept_node_ids
+        ],
+        comments=[
+            comment for comment in columnar.comments if comment.node in kept_node_ids
+        ],
+    )
+
+
+def crop(
+    nml: Union[NML, ColumnarNML], bbox: Sequence[float], mode: Text = "drop"
+) -> Union[NML, ColumnarNML]:
+    """
+    Crops a skeleton annotation to a bounding box. Nodes outside of the box are removed and trees that fall apart are split into one tree per connected part. All computations are vectorized over the node and edge arrays.
+
+    A node is inside the box if `x <= position < x + width` holds for all three dimensions, like for the voxels of a webKnossos bounding box.
+
+    Note:
+        The first part of a split tree keeps its id, the other parts follow it with new ids counting up from the largest tree id. All parts keep the name, color and group of the original tree. Trees without nodes inside the box are removed, as are the comments and branchpoints of removed nodes.
+
+    Arguments:
+        nml (Union[NML, ColumnarNML]): A wK skeleton annotation
+        bbox (Sequence[float]): The bounding box as `(x, y, z, width, height, depth)` in voxels, e.g. `nml.parameters.taskBoundingBox`
+        mode (Text = "drop"): How to treat edges between a node inside and a node outside of the box. `"drop"` removes them. `"clip"` shortens them with a new node on the boundary of the box (on the upper bounds, at the largest float inside the box), which copies the attributes of the node inside and gets a new id counting up from the largest node id. Edges with both nodes outside are always removed.
+
+    Return:
+        Union[NML, ColumnarNML]: The cropped annotation of the same type as `nml`
+
+    Example:
+        ```
+        cropped_nml = wknml.crop(nml, nml.parameters.taskBoundingBox, mode="clip")
+        ```
+    """
+
+    columnar = nml if isinstance(nml, ColumnarNML) else nml_to_columnar(nml)
+    next_tree_id = int(columnar.tree_ids.max()) + 1 if len(columnar.tree_ids) else 1
+    next_node_id = int(columnar.nodes.id.max()) + 1 if len(columnar.nodes.id) else 1
+
+    cropped = __crop_columnar(columnar, bbox, mode, next_tree_id, next_node_id)
+    return cropped if isinstance(nml, ColumnarNML) else columnar_to_nml(cropped)
+
+
+def iter_crop(
+    file: Union[BinaryIO, Text, PathLike],
+    bbox: Sequence[float],
+    mode: Text = "drop",
+    engine: Text = "auto",
+    next_tree_id: Optional[int] = None,
+    next_node_id: Optional[int] = None,
+) -> Iterator[Tree]:
+    """
+    Streaming variant of `crop`, which crops the trees of an NML file while parsing it. Only one tree is held in memory at a time, so that files larger than the main memory can be cropped. Use `parse_nml_metadata` to read the remaining parts of the annotation.
+
+    Note:
+        New trees and nodes get ids starting at `next_tree_id` and `next_node_id`. If they are not given, the file is read twice: once to find the largest ids and once to crop it. Then `file` needs to be a path or a seekable file handle.
+
+    Arguments:
+        file (Union[BinaryIO, Text, PathLike]): A Python file handle or a path
+        bbox (Sequence[float]): The bounding box as `(x, y, z, width, height, depth)` in voxels
+        mode (Text = "drop"): `"drop"` or `"clip"`, see `crop`
+        engine (Text = "auto"): The XML parser backend. See `parse_nml`.
+        next_tree_id (Optional[int] = None): The first id of split trees
+        next_node_id (Optional[int] = None): The first id of nodes on the boundary of the box
+
+    Return:
+        Iterator[Tree]: The cropped trees in file order
+
+    Example:
+        ```
+        trees = list(wknml.iter_crop("input.nml", bbox))
+        metadata = wknml.parse_nml_metadata("input.nml")
+        node_ids = {node.id for tree in trees for node in tree.nodes}
+        nml = metadata._replace(
+            trees=trees,
+            comments=[c for c in metadata.comments if c.node in node_ids],
+            branchpoints=[bp for bp in metadata.branchpoints if bp.id in node_ids],
+        )
+        ```
+    """
+
+    if mode not in CROP_MODES:
+        raise ValueError(f"Unknown crop mode {mode}. Supported are {CROP_MODES}.")
+    __bbox_corners(bbox)
+
+    if next_tree_id is None or next_node_id is None:
+        is_path = isinstance(file, (str, os.PathLike))
+        start = None if is_path else file.tell()
+        max_tree_id, max_node_id = 0, 0
+        for tree in iter_trees(file, engine, skip_node_attributes=True):
+            max_tree_id = max(max_tree_id, tree.id)
+            max_node_id = max([max_node_id, *(node.id for node in tree.nodes)])
+        if not is_path:
+            file.seek(start)
+        next_tree_id = max_tree_id + 1 if next_tree_id is None else next_tree_id
+        next_node_id = max_node_id + 1 if next_node_id is None else next_node_id
+
+    parameters = NMLParameters(name="", scale=(1.0, 1.0, 1.0))
+    for tree in iter_trees(file, engine):
+        columnar = nml_to_columnar(NML(parameters, [tree], [], [], []))
+        cropped = __crop_columnar(columnar, bbox, mode, next_tree_id, next_node_id)
+        next_tree_id += max(len(cropped.tree_ids) - 1, 0)
+        next_node_id += len(cropped.nodes.id) - np.count_nonzero(
+            np.isin(cropped.nodes.id, columnar.nodes.id)
+        )
+        yield from columnar_to_nml(cropped).trees
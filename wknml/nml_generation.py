@@ -15,7 +15,6 @@ import numpy as np
 import logging
 import colorsys
 from typing import Optional, Text, Tuple, List, Dict, Union, Any
-from copy import deepcopy
 
 
 logger = logging.getLogger(__name__)
@@ -210,14 +209,15 @@ def generate_graph(nml: NML) -> Tuple[Dict[str, List[nx.Graph]], Dict[Text, any]
             2. A dictionary representation of the NML metadata parameters. See `NMLParameters` for attributes.
     """
 
-    nml = deepcopy(nml)._replace(groups=discard_children_hierarchy(nml.groups))
+    trees_by_group_id = {}
+    for tree in nml.trees:
+        trees_by_group_id.setdefault(tree.groupId, []).append(tree)
+
     group_dict = {}
-    for group in nml.groups:
-        graphs_in_current_group = []
-        for tree in nml.trees:
-            if tree.groupId == group.id:
-                graphs_in_current_group.append(nml_tree_to_graph(tree))
-        group_dict[group.name] = graphs_in_current_group
+    for group in discard_children_hierarchy(nml.groups):
+        group_dict[group.name] = [
+            nml_tree_to_graph(tree) for tree in trees_by_group_id.get(group.id, [])
+        ]
 
     nml_parameters = nml.parameters
     parameter_dict = {}
@@ -238,17 +238,20 @@ def generate_graph(nml: NML) -> Tuple[Dict[str, List[nx.Graph]], Dict[Text, any]
         if getattr(nml_parameters, parameter) is not None:
             parameter_dict[parameter] = getattr(nml_parameters, parameter)
 
+    # A node id may occur in several trees, all of which receive its comment and branchpoint
+    graphs_by_node_id = {}
+    for group in group_dict.values():
+        for tree in group:
+            for node_id in tree.nodes:
+                graphs_by_node_id.setdefault(node_id, []).append(tree)
+
     for comment in nml.comments:
-        for group in group_dict.values():
-            for tree in group:
-                if comment.node in tree.nodes:
-                    tree.nodes[comment.node]["comment"] = comment.content
+        for tree in graphs_by_node_id.get(comment.node, []):
+            tree.nodes[comment.node]["comment"] = comment.content
 
     for branchpoint in nml.branchpoints:
-        for group in group_dict.values():
-            for tree in group:
-                if branchpoint.id in tree.nodes:
-                    tree.nodes[branchpoint.id]["branchpoint"] = branchpoint.time
+        for tree in graphs_by_node_id.get(branchpoint.id, []):
+            tree.nodes[branchpoint.id]["branchpoint"] = branchpoint.time
 
     return group_dict, parameter_dict
 
@@ -0,0 +1,283 @@
+import io
+import json
+import mmap
+import os
+import re
+import tempfile
+from os import PathLike
+from typing import BinaryIO, Dict, NamedTuple, Optional, Text, Tuple, Union
+
+import numpy as np
+
+from . import (
+    Tree,
+    iter_trees,
+    __THING_START_TAG,
+    __detect_compression,
+    __parse_start_tag_attributes,
+)
+
+INDEX_SUFFIX = ".index.json"
+"""File name suffix of index sidecar files created by `open_nml_index`."""
+
+__INDEX_VERSION = 1
+__INDEXED_SECTIONS = ("parameters", "branchpoints", "comments", "groups", "volume")
+
+
+class NMLIndex(NamedTuple):
+    """
+    Byte offsets of all parts of an NML file. Allows to read single trees or sections without parsing the whole file.
+
+    Attributes:
+        file_size (int): Size of the indexed file in bytes. Used to detect stale indices.
+        file_mtime_ns (Optional[int]): Modification time of the indexed file, if it was indexed by path.
+        sections (Dict[str, Tuple[int, int]]): Byte ranges `[start, end)` of the "parameters", "branchpoints", "comments", "groups" and "volume" elements that exist in the file
+        tree_ids (np.ndarray): Tree ids in file order. Shape: (t,), dtype: int64
+        tree_group_ids (np.ndarray): Group id references, -1 if a tree belongs to no group. Shape: (t,), dtype: int64
+        tree_ranges (np.ndarray): Byte ranges `[start, end)` of all `<thing>` elements. Shape: (t, 2), dtype: int64
+        node_counts (np.ndarray): Number of nodes per tree. Shape: (t,), dtype: int64
+        edge_counts (np.ndarray): Number of edges per tree. Shape: (t,), dtype: int64
+    """
+
+    file_size: int
+    file_mtime_ns: Optional[int]
+    sections: Dict[str, Tuple[int, int]]
+    tree_ids: np.ndarray
+    tree_group_ids: np.ndarray
+    tree_ranges: np.ndarray
+    node_counts: np.ndarray
+    edge_counts: np.ndarray
+
+
+def __find_element(buffer, tag: bytes, position: int) -> Optional[Tuple[int, int]]:
+    match = re.compile(b"<" + tag + rb"(?=[\s/>])").search(buffer, position)
+    if match is None:
+        return None
+
+    start_tag_end = buffer.find(b">", match.end())
+    if buffer[start_tag_end - 1 : start_tag_end] == b"/":
+        return match.start(), start_tag_end + 1
+
+    end_tag = b"</" + tag + b">"
+    end = buffer.find(end_tag, start_tag_end)
+    if end < 0:
+        raise ValueError(f"Could not find the closing {end_tag.decode()} tag.")
+    return match.start(), end + len(end_tag)
+
+
+def __build_index(buffer, file_size: int, file_mtime_ns: Optional[int]) -> NMLIndex:
+    if __detect_compression(bytes(buffer[:8])) is not None:
+        raise ValueError("Indexing requires an uncompressed NML file.")
+
+    sections = {}
+    parameters = __find_element(buffer, b"parameters", 0)
+    if parameters is not None:
+        sections["parameters"] = parameters
+
+    tree_ids = []
+    tree_group_ids = []
+    tree_ranges = []
+    node_counts = []
+    edge_counts = []
+
+    position = 0
+    while True:
+        match = __THING_START_TAG.search(buffer, position)
+        if match is None:
+            break
+
+        attributes = __parse_start_tag_attributes(match.group())
+        try:
+            group_id = int(attributes.get("groupId", -1))
+        except ValueError:
+            group_id = -1
+
+        if match.group().endswith(b"/>"):
+            end = match.end()
+            content = b""
+        else:
+            end = buffer.find(b"</thing>", match.end())
+            if end < 0:
+                raise ValueError("Could not find the closing </thing> tag.")
+            content = buffer[match.end() : end]
+            end += len(b"</thing>")
+
+        tree_ids.append(int(attributes["id"]))
+        tree_group_ids.append(group_id)
+        tree_ranges.append((match.start(), end))
+        # "<node" also matches the "<nodes" container tag
+        node_counts.append(content.count(b"<node") - content.count(b"<nodes"))
+        edge_counts.append(content.count(b"<edge") - content.count(b"<edges"))
+        position = end
+
+    for section in __INDEXED_SECTIONS[1:]:
+        element = __find_element(buffer, section.encode(), position)
+        if element is not None:
+            sections[section] = element
+
+    return NMLIndex(
+        file_size=file_size,
+        file_mtime_ns=file_mtime_ns,
+        sections=sections,
+        tree_ids=np.array(tree_ids, dtype=np.int64),
+        tree_group_ids=np.array(tree_group_ids, dtype=np.int64),
+        tree_ranges=np.array(tree_ranges, dtype=np.int64).reshape(-1, 2),
+        node_counts=np.array(node_counts, dtype=np.int64),
+        edge_counts=np.array(edge_counts, dtype=np.int64),
+    )
+
+
+def build_nml_index(file: Union[BinaryIO, Text, PathLike]) -> NMLIndex:
+    """
+    Scans an NML file once and records the byte ranges of all trees and sections. The file is memory-mapped and only searched for tag boundaries, no XML parsing takes place. Compressed files are not supported.
+
+    Arguments:
+        file (Union[BinaryIO, Text, PathLike]): A path or a Python file handle of an uncompressed NML file opened in binary mode
+
+    Return:
+        NMLIndex: The index of the file
+
+    Example:
+        ```
+        index = wknml.build_nml_index("input.nml")
+        nml = wknml.parse_nml("input.nml", index=index, tree_ids=[42])
+        ```
+    """
+
+    if isinstance(file, (str, PathLike)):
+        with open(file, "rb") as f:
+            index = build_nml_index(f)
+        return index._replace(file_mtime_ns=os.stat(file).st_mtime_ns)
+
+    try:
+        fileno = file.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        fileno = None
+
+    if fileno is None:
+        buffer = file.read()
+        return __build_index(buffer, len(buffer), None)
+
+    file_size = os.fstat(fileno).st_size
+    if file_size == 0:
+        return __build_index(b"", 0, None)
+    with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as buffer:
+        return __build_index(buffer, file_size, None)
+
+
+def save_nml_index(index: NMLIndex, path: Union[Text, PathLike]):
+    """
+    Writes an `NMLIndex` to a JSON sidecar file.
+    """
+
+    data = {
+        "version": __INDEX_VERSION,
+        "file_size": index.file_size,
+        "file_mtime_ns": index.file_mtime_ns,
+        "sections": index.sections,
+        "tree_ids": index.tree_ids.tolist(),
+        "tree_group_ids": index.tree_group_ids.tolist(),
+        "tree_ranges": index.tree_ranges.tolist(),
+        "node_counts": index.node_counts.tolist(),
+        "edge_counts": index.edge_counts.tolist(),
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+
+
+def load_nml_index(path: Union[Text, PathLike]) -> NMLIndex:
+    """
+    Reads an `NMLIndex` from a JSON sidecar file written by `save_nml_index`.
+    """
+
+    with open(path, "r") as f:
+        data = json.load(f)
+
+    if data.get("version") != __INDEX_VERSION:
+        raise ValueError(f"Unsupported NML index version {data.get('version')}.")
+
+    return NMLIndex(
+        file_size=data["file_size"],
+        file_mtime_ns=data["file_mtime_ns"],
+        sections={name: tuple(value) for name, value in data["sections"].items()},
+        tree_ids=np.array(data["tree_ids"], dtype=np.int64),
+        tree_group_ids=np.array(data["tree_group_ids"], dtype=np.int64),
+        tree_ranges=np.array(data["tree_ranges"], dtype=np.int64).reshape(-1, 2),
+        node_counts=np.array(data["node_counts"], dtype=np.int64),
+        edge_counts=np.array(data["edge_counts"], dtype=np.int64),
+    )
+
+
+def open_nml_index(path: Union[Text, PathLike]) -> NMLIndex:
+    """
+    Returns the index of an NML file. The index is read from the sidecar file `<path>.index.json` if it matches the size and modification time of the NML file. Otherwise it is rebuilt and the sidecar file is (re-)written.
+
+    Arguments:
+        path (Union[Text, PathLike]): Path of an uncompressed NML file
+
+    Return:
+        NMLIndex: The index of the file
+    """
+
+    index_path = os.fspath(path) + INDEX_SUFFIX
+    stat = os.stat(path)
+
+    if os.path.exists(index_path):
+        try:
+            index = load_nml_index(index_path)
+        except (ValueError, KeyError):
+            index = None
+        if (
+            index is not None
+            and index.file_size == stat.st_size
+            and index.file_mtime_ns == stat.st_mtime_ns
+        ):
+            return index
+
+    index = build_nml_index(path)
+    # Concurrent readers either see the old sidecar, no sidecar or the
+    # complete new one
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(index_path)), prefix=".tmp-"
+    )
+    os.close(fd)
+    try:
+        save_nml_index(index, tmp_path)
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return index
+
+
+def load_tree(
+    file: Union[BinaryIO, Text, PathLike], index: NMLIndex, tree_id: int
+) -> Tree:
+    """
+    Reads a single tree by seeking directly to its byte range. Raises a `ValueError` if the size of the file differs from the indexed size, i.e. the index is stale.
+
+    Arguments:
+        file (Union[BinaryIO, Text, PathLike]): A path or a seekable Python file handle opened in binary mode
+        index (NMLIndex): The index of the file
+        tree_id (int): Id of the tree
+
+    Return:
+        Tree: The requested tree
+    """
+
+    if isinstance(file, (str, PathLike)):
+        with open(file, "rb") as f:
+            return load_tree(f, index, tree_id)
+
+    file.seek(0, 2)
+    if file.tell() != index.file_size:
+        raise ValueError("The NML index does not match the size of the file.")
+
+    (positions,) = np.nonzero(index.tree_ids == tree_id)
+    if len(positions) == 0:
+        raise KeyError(f"The NML index does not contain a tree with id {tree_id}.")
+    start, end = index.tree_ranges[positions[0]].tolist()
+
+    file.seek(start)
+    content = file.read(end - start)
+    return next(iter_trees(io.BytesIO(b"<things>" + content + b"</things>")))
@@ -0,0 +1,197 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from . import NML, Branchpoint, Group, Node, Tree, Vector3
+
+
+class NodeIndex:
+    """
+    Lookup tables for an `NML` object, built in a single pass over all nodes. Answers questions like "which tree contains node 12345 and what is its comment" without scanning all trees.
+
+    Node ids are kept in a sorted NumPy array, so that node lookups take logarithmic time and can be vectorized with `tree_ids_of` and `positions_of`. Trees, groups, comments and branchpoints are stored in dictionaries.
+
+    Note:
+        If a node id occurs in several trees, the first occurrence is used. The index does not follow later modifications of the NML object.
+
+    Attributes:
+        nml (NML): The indexed annotation
+        node_ids (np.ndarray): All distinct node ids in ascending order. Shape: (n,), dtype: int64
+        node_tree_ids (np.ndarray): The id of the tree containing each node of `node_ids`. Shape: (n,), dtype: int64
+        node_positions (np.ndarray): The position of each node of `node_ids`. Shape: (n, 3), dtype: float64
+
+    Example:
+        ```
+        index = wknml.NodeIndex(nml)
+        tree = index.tree(12345)
+        print(tree.name, index.position(12345), index.comment(12345))
+        ```
+    """
+
+    def __init__(self, nml: NML):
+        self.nml = nml
+
+        self.__trees_by_id: Dict[int, Tree] = {}
+        self.__trees_by_group_id: Dict[Optional[int], List[Tree]] = {}
+        for tree in nml.trees:
+            self.__trees_by_id.setdefault(tree.id, tree)
+            self.__trees_by_group_id.setdefault(tree.groupId, []).append(tree)
+
+        self.__groups_by_id: Dict[int, Group] = {}
+        pending_groups = list(nml.groups)
+        while pending_groups:
+            group = pending_groups.pop()
+            self.__groups_by_id[group.id] = group
+            pending_groups.extend(group.children)
+
+        self.__comments = {comment.node: comment.content for comment in nml.comments}
+        self.__branchpoints = {
+            branchpoint.id: branchpoint for branchpoint in nml.branchpoints
+        }
+
+        num_nodes = sum(len(tree.nodes) for tree in nml.trees)
+        node_ids = np.empty(num_nodes, dtype=np.int64)
+        node_positions = np.empty((num_nodes, 3), dtype=np.float64)
+        tree_indices = np.empty(num_nodes, dtype=np.int64)
+        node_indices = np.empty(num_nodes, dtype=np.int64)
+        offset = 0
+        for tree_index, tree in enumerate(nml.trees):
+            end = offset + len(tree.nodes)
+            node_ids[offset:end] = [node.id for node in tree.nodes]
+            # The reshape keeps the shape (0, 3) for trees without nodes
+            node_positions[offset:end] = np.asarray(
+                [node.position for node in tree.nodes], dtype=np.float64
+            ).reshape(-1, 3)
+            tree_indices[offset:end] = tree_index
+            node_indices[offset:end] = np.arange(len(tree.nodes))
+            offset = end
+
+        # np.unique returns the index of the first occurrence of each id
+        self.node_ids, first_indices = np.unique(node_ids, return_index=True)
+        self.node_positions = node_positions[first_indices]
+        self.__tree_indices = tree_indices[first_indices]
+        self.__node_indices = node_indices[first_indices]
+        tree_ids = np.array([tree.id for tree in nml.trees], dtype=np.int64)
+        self.node_tree_ids = tree_ids[self.__tree_indices]
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def __contains__(self, node_id: int) -> bool:
+        position = np.searchsorted(self.node_ids, node_id)
+        return position < len(self.node_ids) and self.node_ids[position] == node_id
+
+    def __locate(self, node_id: int) -> int:
+        position = np.searchsorted(self.node_ids, node_id)
+        if position == len(self.node_ids) or self.node_ids[position] != node_id:
+            raise KeyError(f"There is no node with id {node_id}.")
+        return int(position)
+
+    def __locate_all(self, node_ids: Iterable[int]) -> np.ndarray:
+        node_ids = np.asarray(node_ids, dtype=np.int64)
+        positions = np.searchsorted(self.node_ids, node_ids)
+        found = positions < len(self.node_ids)
+        found[found] = self.node_ids[positions[found]] == node_ids[found]
+        if not found.all():
+            raise KeyError(f"There are no nodes with ids {node_ids[~found].tolist()}.")
+        return positions
+
+    def node(self, node_id: int) -> Node:
+        """
+        Returns the `Node` object with the given id. Raises a `KeyError` if the node does not exist.
+        """
+
+        position = self.__locate(node_id)
+        tree = self.nml.trees[self.__tree_indices[position]]
+        return tree.nodes[self.__node_indices[position]]
+
+    def tree(self, node_id: int) -> Tree:
+        """
+        Returns the tree containing the node with the given id. Raises a `KeyError` if the node does not exist.
+        """
+
+        return self.nml.trees[self.__tree_indices[self.__locate(node_id)]]
+
+    def tree_id(self, node_id: int) -> int:
+        """
+        Returns the id of the tree containing the node with the given id. Raises a `KeyError` if the node does not exist.
+        """
+
+        return int(self.node_tree_ids[self.__locate(node_id)])
+
+    def position(self, node_id: int) -> Vector3:
+        """
+        Returns the position of the node with the given id. Raises a `KeyError` if the node does not exist.
+        """
+
+        return tuple(self.node_positions[self.__locate(node_id)].tolist())
+
+    def comment(self, node_id: int) -> Optional[str]:
+        """
+        Returns the comment of the node with the given id or `None` if the node has no comment.
+        """
+
+        return self.__comments.get(node_id)
+
+    def branchpoint(self, node_id: int) -> Optional[Branchpoint]:
+        """
+        Returns the branchpoint of the node with the given id or `None` if the node is no branchpoint.
+        """
+
+        return self.__branchpoints.get(node_id)
+
+    def tree_ids_of(self, node_ids: Iterable[int]) -> np.ndarray:
+        """
+        Vectorized variant of `tree_id`. Raises a `KeyError` if any of the nodes does not exist.
+        """
+
+        return self.node_tree_ids[self.__locate_all(node_ids)]
+
+    def positions_of(self, node_ids: Iterable[int]) -> np.ndarray:
+        """
+        Vectorized variant of `position`. Returns an array of shape (k, 3). Raises a `KeyError` if any of the nodes does not exist.
+        """
+
+        return self.node_positions[self.__locate_all(node_ids)]
+
+    def get_tree(self, tree_id: int) -> Tree:
+        """
+        Returns the tree with the given id. Raises a `KeyError` if the tree does not exist.
+        """
+
+        try:
+            return self.__trees_by_id[tree_id]
+        except KeyError:
+            raise KeyError(f"There is no tree with id {tree_id}.") from None
+
+    def get_group(self, group_id: int) -> Group:
+        """
+        Returns the group with the given id, which may be nested within other groups. Raises a `KeyError` if the group does not exist.
+        """
+
+        try:
+            return self.__groups_by_id[group_id]
+        except KeyError:
+            raise KeyError(f"There is no group with id {group_id}.") from None
+
+    def trees_in_group(
+        self, group_id: Optional[int], include_subgroups: bool = False
+    ) -> List[Tree]:
+        """
+        Returns the trees that belong to the group with the given id in file order. Use `None` to get all trees without a group.
+
+        Arguments:
+            group_id (Optional[int]): A group id or `None`
+            include_subgroups (bool = False): Also return the trees of all nested sub-groups
+        """
+
+        if not include_subgroups or group_id is None:
+            return list(self.__trees_by_group_id.get(group_id, []))
+
+        group_ids = set()
+        pending_groups = [self.get_group(group_id)]
+        while pending_groups:
+            group = pending_groups.pop()
+            group_ids.add(group.id)
+            pending_groups.extend(group.children)
+        return [tree for tree in self.nml.trees if tree.groupId in group_ids]
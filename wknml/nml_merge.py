@@ -0,0 +1,260 @@
+import itertools
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from os import PathLike
+from typing import (
+    BinaryIO,
+    Deque,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Text,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+
+from . import NML, Group
+from .nml_columnar import (
+    MISSING,
+    ColumnarNML,
+    NodeColumns,
+    columnar_to_nml,
+    nml_to_columnar,
+    parse_nml_columnar,
+)
+from .nml_writer import NMLWriter
+
+MERGE_GROUP_BY = ("file", "none")
+"""The supported values of the `group_by` option of `merge_nmls`."""
+
+
+def __load_columnar(
+    source: Union[NML, ColumnarNML, Text, PathLike], engine: Text
+) -> ColumnarNML:
+    if isinstance(source, ColumnarNML):
+        return source
+    if isinstance(source, NML):
+        return nml_to_columnar(source)
+    return parse_nml_columnar(source, engine)
+
+
+def __load_sources(
+    sources: Iterable[Union[NML, ColumnarNML, Text, PathLike]],
+    engine: Text,
+    workers: int,
+) -> Iterator[Tuple[Union[NML, ColumnarNML, Text, PathLike], ColumnarNML]]:
+    if workers <= 1:
+        for source in sources:
+            yield source, __load_columnar(source, engine)
+        return
+
+    # Files are parsed by the workers, NML objects are converted in the
+    # calling process, as pickling their nodes is slower than converting them
+    def result(
+        source: Union[NML, ColumnarNML, Text, PathLike], future: Optional[Future]
+    ) -> Tuple[Union[NML, ColumnarNML, Text, PathLike], ColumnarNML]:
+        if future is None:
+            return source, __load_columnar(source, engine)
+        return source, future.result()
+
+    with ProcessPoolExecutor(workers) as executor:
+        pending: Deque[tuple] = deque()
+        for source in sources:
+            if isinstance(source, (str, PathLike)):
+                future = executor.submit(__load_columnar, source, engine)
+                pending.append((source, future))
+            else:
+                pending.append((source, None))
+            while len(pending) > 2 * workers:
+                yield result(*pending.popleft())
+        for source, future in pending:
+            yield result(source, future)
+
+
+def __get_group_name(
+    source: Union[NML, ColumnarNML, Text, PathLike], index: int
+) -> Text:
+    if not isinstance(source, (str, PathLike)):
+        return f"annotation {index + 1}"
+    # "task_1.nml.gz" becomes "task_1"
+    name = os.path.basename(source)
+    extension_start = name.lower().rfind(".nml")
+    return name[:extension_start] if extension_start > 0 else name
+
+
+def __get_group_ids(groups: List[Group]) -> List[int]:
+    return [
+        group_id
+        for group in groups
+        for group_id in [group.id, *__get_group_ids(group.children)]
+    ]
+
+
+def __shift_group(group: Group, offset: int) -> Group:
+    return Group(
+        id=group.id + offset,
+        name=group.name,
+        children=[__shift_group(child, offset) for child in group.children],
+    )
+
+
+def __remap_ids(
+    columnar: ColumnarNML,
+    next_tree_id: int,
+    next_node_id: int,
+    next_group_id: int,
+    group_name: Optional[Text],
+) -> Tuple[ColumnarNML, int, int, int]:
+    # Shifts all ids of the annotation by a constant, so that they start at the
+    # next free id. Ids stay unique and keep their order.
+    nodes = columnar.nodes
+    node_offset = next_node_id - int(nodes.id.min()) if len(nodes.id) else 0
+    tree_ids = columnar.tree_ids
+    tree_offset = next_tree_id - int(tree_ids.min()) if len(tree_ids) else 0
+
+    first_group_id = next_group_id + (0 if group_name is None else 1)
+    group_ids = __get_group_ids(columnar.groups)
+    group_offset = first_group_id - min(group_ids) if group_ids else 0
+    groups = [__shift_group(group, group_offset) for group in columnar.groups]
+    tree_group_ids = np.where(
+        columnar.tree_group_ids == MISSING,
+        MISSING,
+        columnar.tree_group_ids + group_offset,
+    )
+    if group_name is not None:
+        tree_group_ids[tree_group_ids == MISSING] = next_group_id
+        groups = [Group(id=next_group_id, name=group_name, children=groups)]
+
+    remapped = columnar._replace(
+        tree_ids=tree_ids + tree_offset,
+        tree_group_ids=tree_group_ids,
+        nodes=nodes._replace(id=nodes.id + node_offset),
+        edges=columnar.edges + node_offset,
+        branchpoints=[
+            branchpoint._replace(id=branchpoint.id + node_offset)
+            for branchpoint in columnar.branchpoints
+        ],
+        comments=[
+            comment._replace(node=comment.node + node_offset)
+            for comment in columnar.comments
+        ],
+        groups=groups,
+    )
+
+    all_group_ids = __get_group_ids(groups)
+    return (
+        remapped,
+        int(remapped.tree_ids.max()) + 1 if len(tree_ids) else next_tree_id,
+        int(remapped.nodes.id.max()) + 1 if len(nodes.id) else next_node_id,
+        max(all_group_ids) + 1 if all_group_ids else next_group_id,
+    )
+
+
+def __concatenate(parts: List[ColumnarNML]) -> ColumnarNML:
+    def offsets(name: Text) -> np.ndarray:
+        counts = [np.diff(getattr(part, name)) for part in parts]
+        return np.concatenate([[0], np.cumsum(np.concatenate(counts))]).astype(np.int64)
+
+    return parts[0]._replace(
+        tree_ids=np.concatenate([part.tree_ids for part in parts]),
+        tree_names=[name for part in parts for name in part.tree_names],
+        tree_colors=np.concatenate([part.tree_colors for part in parts]),
+        tree_group_ids=np.concatenate([part.tree_group_ids for part in parts]),
+        node_offsets=offsets("node_offsets"),
+        edge_offsets=offsets("edge_offsets"),
+        nodes=NodeColumns(
+            *(np.concatenate(columns) for columns in zip(*(p.nodes for p in parts)))
+        ),
+        edges=np.concatenate([part.edges for part in parts]).reshape(-1, 2),
+        branchpoints=[bp for part in parts for bp in part.branchpoints],
+        comments=[comment for part in parts for comment in part.comments],
+        groups=[group for part in parts for group in part.groups],
+        volume=None,
+    )
+
+
+def __remap_sources(
+    loaded: Iterable[Tuple[Union[NML, ColumnarNML, Text, PathLike], ColumnarNML]],
+    group_by: Text,
+) -> Iterator[ColumnarNML]:
+    scale = None
+    next_tree_id, next_node_id, next_group_id = 1, 1, 1
+    for index, (source, columnar) in enumerate(loaded):
+        if scale is None:
+            scale = tuple(columnar.parameters.scale)
+        elif tuple(columnar.parameters.scale) != scale:
+            raise ValueError(
+                f"Cannot merge annotations with different scales: {scale} and {tuple(columnar.parameters.scale)}."
+            )
+
+        group_name = __get_group_name(source, index) if group_by == "file" else None
+        columnar, next_tree_id, next_node_id, next_group_id = __remap_ids(
+            columnar, next_tree_id, next_node_id, next_group_id, group_name
+        )
+        yield columnar
+
+
+def merge_nmls(
+    nmls: Iterable[Union[NML, ColumnarNML, Text, PathLike]],
+    group_by: Text = "file",
+    workers: int = 1,
+    output: Optional[Union[BinaryIO, Text, PathLike]] = None,
+    engine: Text = "auto",
+    compact: bool = False,
+) -> Optional[NML]:
+    """
+    Merges many skeleton annotations into one. The node, tree and group ids of each annotation are shifted by a constant offset on the NumPy columns, so that they do not collide with the ids of the previous annotations. Edges, comments and branchpoints are updated accordingly. The ids of the first annotation start at 1.
+
+    Note:
+        The merged annotation gets the metadata of the first annotation. All annotations need to have the same scale. Volume annotations are not merged.
+
+    Arguments:
+        nmls (Iterable[Union[NML, ColumnarNML, Text, PathLike]]): `NML` or `ColumnarNML` objects or paths of NML files. Files are parsed with `parse_nml_columnar`, compressed files are supported.
+        group_by (Text = "file"): With `"file"`, the trees and groups of each annotation are put into a new top-level group, which is named after the file (or `annotation <i>` for objects). With `"none"`, the groups are merged as they are and trees without a group stay without one.
+        workers (int = 1): Number of processes that parse the files in parallel
+        output (Optional[Union[BinaryIO, Text, PathLike]] = None): If given, the merged annotation is written to this file or path with an `NMLWriter` instead of being returned. The trees of each annotation are written as soon as it is parsed, so that the merged annotation never needs to fit into memory.
+        engine (Text = "auto"): The XML parser backend. See `parse_nml`.
+        compact (bool = False): Return the nodes and edges as read-only views of the columnar storage, see `columnar_to_nml`
+
+    Return:
+        Optional[NML]: The merged annotation, or `None` if it was written to `output`
+
+    Example:
+        ```
+        nml = wknml.merge_nmls(glob("tasks/*.nml"), workers=8)
+        # or straight into a file
+        wknml.merge_nmls(glob("tasks/*.nml"), workers=8, output="merged.nml")
+        ```
+    """
+
+    if group_by not in MERGE_GROUP_BY:
+        raise ValueError(
+            f"Unknown group_by option '{group_by}'. Choose one of {', '.join(repr(g) for g in MERGE_GROUP_BY)}."
+        )
+
+    loaded = __load_sources(nmls, engine, workers)
+    first = next(loaded, None)
+    if first is None:
+        raise ValueError("There are no annotations to merge.")
+    remapped = __remap_sources(itertools.chain([first], loaded), group_by)
+
+    if output is None:
+        return columnar_to_nml(__concatenate(list(remapped)), compact)
+
+    # Only the trees are written right away, the other parts follow them in
+    # the file and are kept until the end
+    branchpoints, comments, groups = [], [], []
+    with NMLWriter(output, first[1].parameters) as writer:
+        for columnar in remapped:
+            writer.write_trees_columnar(columnar)
+            branchpoints.extend(columnar.branchpoints)
+            comments.extend(columnar.comments)
+            groups.extend(columnar.groups)
+        writer.write_branchpoints(branchpoints)
+        writer.write_comments(comments)
+        writer.write_groups(groups)
+    return None
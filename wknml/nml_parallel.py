@@ -0,0 +1,379 @@
+import io
+import multiprocessing
+import os
+import sys
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, as_completed
+from os import PathLike
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Text,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+import numpy as np
+
+from . import NML, SECTIONS, Tree, iter_trees, parse_nml
+from .nml_columnar import ColumnarNML, nml_to_columnar
+from .nml_index import NMLIndex, build_nml_index
+from .nml_writer import NMLWriter
+
+T = TypeVar("T")
+
+__BATCHES_PER_WORKER = 4
+# Bounds the size of the formatted batches that are held in memory
+__MAX_BATCH_NODES = 1 << 16
+
+
+def __parse_tree_batch(
+    content: bytes, engine: Text, skip_node_attributes: bool
+) -> List[Tree]:
+    return list(
+        iter_trees(
+            io.BytesIO(b"<things>" + content + b"</things>"),
+            engine=engine,
+            skip_node_attributes=skip_node_attributes,
+        )
+    )
+
+
+def __map_ordered(
+    executor: Executor,
+    function: Callable[..., T],
+    arguments: Iterable[tuple],
+    limit: int,
+) -> Iterator[T]:
+    # Like Executor.map, but only keeps `limit` tasks in flight, so that the
+    # arguments are not all materialized at once.
+    pending = []
+    for argument in arguments:
+        pending.append(executor.submit(function, *argument))
+        if len(pending) >= limit:
+            yield pending.pop(0).result()
+    for future in pending:
+        yield future.result()
+
+
+def __select_trees(
+    index: NMLIndex,
+    tree_ids: Optional[Iterable[int]],
+    group_ids: Optional[Iterable[int]],
+) -> np.ndarray:
+    selected = np.ones(len(index.tree_ids), dtype=bool)
+    if tree_ids is not None:
+        selected &= np.isin(index.tree_ids, list(tree_ids))
+    if group_ids is not None:
+        selected &= np.isin(index.tree_group_ids, list(group_ids))
+    return np.nonzero(selected)[0]
+
+
+def __split_into_batches(
+    index: NMLIndex, positions: np.ndarray, num_batches: int
+) -> List[np.ndarray]:
+    # Splits the selected trees into consecutive batches of roughly equal byte size
+    sizes = index.tree_ranges[positions, 1] - index.tree_ranges[positions, 0]
+    cumulative_sizes = np.cumsum(sizes)
+    if len(cumulative_sizes) == 0:
+        return []
+    boundaries = np.linspace(0, cumulative_sizes[-1], num_batches + 1)[1:-1]
+    splits = np.unique(np.searchsorted(cumulative_sizes, boundaries, side="right"))
+    return [batch for batch in np.split(positions, splits) if len(batch) > 0]
+
+
+def __read_batches(
+    file: BinaryIO, index: NMLIndex, batches: List[np.ndarray]
+) -> Iterator[bytes]:
+    for batch in batches:
+        content = []
+        for start, end in index.tree_ranges[batch].tolist():
+            file.seek(start)
+            content.append(file.read(end - start))
+        yield b"".join(content)
+
+
+def parse_nml_parallel(
+    file: Union[BinaryIO, Text, PathLike],
+    workers: Optional[int] = None,
+    engine: Text = "auto",
+    tree_ids: Optional[Iterable[int]] = None,
+    group_ids: Optional[Iterable[int]] = None,
+    sections: Optional[Collection[Text]] = None,
+    skip_node_attributes: bool = False,
+    index: Optional[NMLIndex] = None,
+) -> NML:
+    """
+    Parses a single NML file with a pool of processes. The file is split at `<thing>` boundaries using an `NMLIndex`, the trees are parsed in batches by the workers and stitched back together in file order. The result is identical to `parse_nml`. This is also available as `parse_nml(file, workers=N)`.
+
+    Note:
+        Parsing in parallel pays off for large files with many trees. The trees are transferred back to the main process via pickle.
+
+    Arguments:
+        file (Union[BinaryIO, Text, PathLike]): A path or a seekable Python file handle of an uncompressed NML file opened in binary mode
+        workers (Optional[int] = None): Number of worker processes. Default: number of CPUs
+        engine (Text = "auto"): The XML parser backend. See `parse_nml`.
+        tree_ids (Optional[Iterable[int]] = None): Only parse the trees with these ids
+        group_ids (Optional[Iterable[int]] = None): Only parse the trees that directly belong to one of these groups
+        sections (Optional[Collection[Text]] = None): Only parse these parts of the file. See `parse_nml`.
+        skip_node_attributes (bool = False): Only parse the id and position of each node
+        index (Optional[NMLIndex] = None): A byte-offset index of the file. Built on the fly if not given.
+
+    Return:
+        NML: A webKnossos skeleton annotation as Python NML object
+    """
+
+    if isinstance(file, (str, PathLike)):
+        with open(file, "rb") as f:
+            return parse_nml_parallel(
+                f,
+                workers,
+                engine,
+                tree_ids,
+                group_ids,
+                sections,
+                skip_node_attributes,
+                index,
+            )
+
+    if index is None:
+        index = build_nml_index(file)
+    if sections is None:
+        sections = SECTIONS
+
+    nml = parse_nml(
+        file,
+        engine,
+        sections=[section for section in sections if section != "trees"],
+        index=index,
+    )
+    if "trees" not in sections:
+        return nml
+
+    num_workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(num_workers) as executor:
+        batches = __split_into_batches(
+            index,
+            __select_trees(index, tree_ids, group_ids),
+            num_workers * __BATCHES_PER_WORKER,
+        )
+        trees = [
+            tree
+            for batch_trees in __map_ordered(
+                executor,
+                __parse_tree_batch,
+                (
+                    (content, engine, skip_node_attributes)
+                    for content in __read_batches(file, index, batches)
+                ),
+                limit=2 * num_workers,
+            )
+            for tree in batch_trees
+        ]
+
+    return nml._replace(trees=trees)
+
+
+def __parse_file_batch(
+    paths: List[Union[Text, PathLike]],
+    function: Optional[Callable[[NML], Any]],
+    engine: Text,
+) -> List[Tuple[Union[Text, PathLike], Any]]:
+    results = []
+    for path in paths:
+        try:
+            nml = parse_nml(path, engine)
+            results.append((path, nml if function is None else function(nml)))
+        except Exception as e:
+            results.append((path, e))
+    return results
+
+
+def parse_many(
+    paths: Iterable[Union[Text, PathLike]],
+    workers: Optional[int] = None,
+    ordered: bool = False,
+    function: Optional[Callable[[NML], Any]] = None,
+    engine: Text = "auto",
+    chunksize: Optional[int] = None,
+) -> Iterator[Tuple[Union[Text, PathLike], Any]]:
+    """
+    Parses many NML files with a pool of processes. The paths are dispatched to the workers in chunks. Errors are isolated per file: if a file cannot be parsed, the exception is returned as its result instead of being raised.
+
+    Arguments:
+        paths (Iterable[Union[Text, PathLike]]): Paths of the NML files. Compressed files are supported, see `open_nml`.
+        workers (Optional[int] = None): Number of worker processes. With a single worker, the files are parsed in the calling process. Default: number of CPUs
+        ordered (bool = False): Yield the results in the order of `paths` instead of as soon as they are ready
+        function (Optional[Callable[[NML], Any]] = None): Applied to each parsed NML within the worker. Only its result is sent back, which avoids transferring whole NML objects. Must be picklable, i.e. defined at the top level of a module.
+        engine (Text = "auto"): The XML parser backend. See `parse_nml`.
+        chunksize (Optional[int] = None): Number of files per task. Default: chosen to give each worker several tasks
+
+    Return:
+        Iterator[Tuple[Union[Text, PathLike], Any]]: Pairs of path and either the parsed NML (or the result of `function`) or the raised exception
+
+    Example:
+        ```
+        def count_nodes(nml):
+            return sum(len(tree.nodes) for tree in nml.trees)
+
+        for path, result in wknml.parse_many(glob("tasks/*.nml"), function=count_nodes):
+            if isinstance(result, Exception):
+                print(f"Could not parse {path}: {result}")
+        ```
+    """
+
+    paths = list(paths)
+    num_workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, min(64, len(paths) // (num_workers * __BATCHES_PER_WORKER)))
+    batches = [paths[i : i + chunksize] for i in range(0, len(paths), chunksize)]
+
+    if num_workers == 1:
+        for batch in batches:
+            yield from __parse_file_batch(batch, function, engine)
+        return
+
+    with ProcessPoolExecutor(num_workers) as executor:
+        futures: Dict[Future, List[Union[Text, PathLike]]] = {
+            executor.submit(__parse_file_batch, batch, function, engine): batch
+            for batch in batches
+        }
+        try:
+            for future in futures if ordered else as_completed(futures):
+                try:
+                    yield from future.result()
+                except Exception as e:
+                    # E.g. a crashed worker or a result that cannot be pickled
+                    yield from ((path, e) for path in futures[future])
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+# The annotation that is written by write_nml_parallel, set in each worker
+__shared_nml: Optional[Union[NML, ColumnarNML]] = None
+
+
+def __share_nml(nml: Union[NML, ColumnarNML]):
+    global __shared_nml
+    __shared_nml = nml
+
+
+def __get_writer_context() -> Optional[multiprocessing.context.BaseContext]:
+    # Forked workers inherit the annotation without pickling it. Elsewhere,
+    # fork is not safe and the annotation is pickled once for each worker.
+    # write_nml_parallel starts the workers before any threads of its own.
+    if sys.platform.startswith("linux"):
+        return multiprocessing.get_context("fork")
+    return None
+
+
+def __format_tree_batch(
+    start: int,
+    stop: int,
+    decimals: Optional[int],
+    node_defaults: Optional[Dict[Text, Any]],
+) -> bytes:
+    nml = __shared_nml
+    if isinstance(nml, ColumnarNML):
+        tree_lines = NMLWriter._format_trees_columnar(
+            nml, start, stop, decimals, node_defaults
+        )
+    else:
+        tree_lines = (
+            NMLWriter._format_tree(tree, decimals, node_defaults)
+            for tree in nml.trees[start:stop]
+        )
+    lines = [line for lines in tree_lines for line in lines]
+    lines.append("")
+    return os.linesep.join(lines).encode("utf-8")
+
+
+def __split_trees_into_batches(
+    node_counts: np.ndarray, num_batches: int
+) -> List[Tuple[int, int]]:
+    # Splits the trees into consecutive ranges of roughly equal node count
+    if len(node_counts) == 0:
+        return []
+    cumulative_counts = np.cumsum(node_counts)
+    num_batches = max(num_batches, int(cumulative_counts[-1]) // __MAX_BATCH_NODES)
+    boundaries = np.linspace(0, cumulative_counts[-1], num_batches + 1)[1:-1]
+    splits = np.unique(np.searchsorted(cumulative_counts, boundaries, side="right"))
+    splits = [0, *splits[(splits > 0) & (splits < len(node_counts))].tolist()]
+    return list(zip(splits, [*splits[1:], len(node_counts)]))
+
+
+def write_nml_parallel(
+    file: Union[BinaryIO, Text, PathLike],
+    nml: Union[NML, ColumnarNML],
+    workers: Optional[int] = None,
+    compression: Optional[Text] = None,
+    threads: int = 1,
+    decimals: Optional[int] = None,
+    node_defaults: Optional[Dict[Text, Any]] = None,
+):
+    """
+    Writes an NML file with a pool of processes. The trees are formatted in batches by the workers and written in order by the calling process. The output is identical to `write_nml`. This is also available as `write_nml(file, nml, workers=N)`.
+
+    Note:
+        Writing in parallel pays off for large annotations. On Linux, the workers are forked and share the annotation with the calling process. They are started before the compression threads, but forking a process that runs other threads can deadlock, so do not call this while threads of your own hold locks. On other platforms, the annotation is pickled once for each worker, which is only fast for `ColumnarNML` objects.
+
+    Arguments:
+        file (Union[BinaryIO, Text, PathLike]): A Python file handle or a path
+        nml (Union[NML, ColumnarNML]): A wK skeleton annotation
+        workers (Optional[int] = None): Number of worker processes. Default: number of CPUs
+        compression (Optional[Text] = None): See `NMLWriter`
+        threads (int = 1): See `NMLWriter`
+        decimals (Optional[int] = None): See `NMLWriter`
+        node_defaults (Optional[Dict[Text, Any]] = None): See `NMLWriter`
+    """
+
+    if decimals is not None and not isinstance(nml, ColumnarNML):
+        # Rounding is much faster on the NumPy columns than per node
+        nml = nml_to_columnar(nml)
+    if isinstance(nml, ColumnarNML):
+        node_counts = np.diff(nml.node_offsets)
+    else:
+        node_counts = np.array([len(tree.nodes) for tree in nml.trees], dtype=np.int64)
+
+    num_workers = workers or os.cpu_count() or 1
+    batches = __split_trees_into_batches(
+        node_counts, num_workers * __BATCHES_PER_WORKER
+    )
+    with ProcessPoolExecutor(
+        num_workers,
+        mp_context=__get_writer_context(),
+        initializer=__share_nml,
+        initargs=(nml,),
+    ) as executor:
+        formatted_batches = __map_ordered(
+            executor,
+            __format_tree_batch,
+            ((start, stop, decimals, node_defaults) for start, stop in batches),
+            limit=2 * num_workers,
+        )
+        # Forked workers are all started with the first task. This has to
+        # happen before the writer starts its compression threads, as forking
+        # a process with running threads can deadlock.
+        first_batch = next(formatted_batches, None)
+
+        with NMLWriter(
+            file, nml.parameters, compression, threads, decimals, node_defaults
+        ) as writer:
+            if first_batch is not None:
+                writer._write_formatted_trees(first_batch)
+            for data in formatted_batches:
+                writer._write_formatted_trees(data)
+
+            writer.write_branchpoints(nml.branchpoints)
+            writer.write_comments(nml.comments)
+            writer.write_groups(nml.groups)
+            if nml.volume is not None:
+                writer.write_volume(nml.volume)
@@ -0,0 +1,199 @@
+from typing import Any, List, NamedTuple, Optional, Union
+
+import numpy as np
+
+from . import NML, NMLParameters, Node, Edge, Tree
+from .nml_columnar import ColumnarNML, nml_to_columnar, __get_edge_rows
+from .nml_lookup import NodeIndex
+from .nml_generation import random_color_rgba
+
+
+class CSRGraph(NamedTuple):
+    """
+    The nodes and edges of a skeleton annotation as sparse adjacency matrix. Row and column `i` of the matrix belong to node `node_ids[i]`. Can be used directly with the algorithms of `scipy.sparse.csgraph`, e.g. `connected_components(graph.adjacency, directed=False)`.
+
+    Attributes:
+        adjacency (scipy.sparse.csr_matrix): Adjacency matrix of shape (n, n). Each edge is stored once as entry `[source, target]` with value 1.
+        node_ids (np.ndarray): Node id of each row. Shape: (n,), dtype: int64
+        positions (np.ndarray): Node positions. Shape: (n, 3), dtype: float64
+        tree_ids (Optional[np.ndarray]): Id of the tree of each node. Shape: (n,), dtype: int64. If `None`, `from_csr` creates one tree per connected component.
+    """
+
+    adjacency: Any
+    node_ids: np.ndarray
+    positions: np.ndarray
+    tree_ids: Optional[np.ndarray] = None
+
+
+def __import_scipy_sparse():
+    try:
+        import scipy.sparse
+        import scipy.sparse.csgraph
+    except ImportError as e:
+        raise ImportError(
+            "The conversion to sparse matrices requires the optional scipy package, install it with `pip install wknml[scipy]`."
+        ) from e
+    return scipy.sparse
+
+
+def to_csr(nml: Union[NML, ColumnarNML, Tree]) -> CSRGraph:
+    """
+    Converts a skeleton annotation or a single tree into a sparse adjacency matrix. This is much more compact than a NetworkX graph and allows to use the graph algorithms of `scipy.sparse.csgraph` (connected components, shortest paths, minimum spanning trees, ...) at native speed. Requires the optional scipy package.
+
+    Note:
+        Edges are resolved within their tree, so node ids only need to be unique per tree. Only the node ids, positions and tree ids are part of the graph. Pass the original annotation to `from_csr` to restore the other attributes.
+
+    Arguments:
+        nml (Union[NML, ColumnarNML, Tree]): A wK skeleton annotation or a single tree
+
+    Return:
+        CSRGraph: The adjacency matrix with the node ids, positions and tree ids of its rows
+
+    Example:
+        ```
+        from scipy.sparse.csgraph import connected_components
+
+        graph = wknml.to_csr(nml)
+        num_components, labels = connected_components(graph.adjacency, directed=False)
+        ```
+    """
+
+    sparse = __import_scipy_sparse()
+
+    if isinstance(nml, Tree):
+        nml = NML(NMLParameters(name="", scale=(1.0, 1.0, 1.0)), [nml], [], [], [])
+    columnar = nml if isinstance(nml, ColumnarNML) else nml_to_columnar(nml)
+
+    num_nodes = len(columnar.nodes.id)
+    node_tree_indices = np.repeat(
+        np.arange(len(columnar.tree_ids)), np.diff(columnar.node_offsets)
+    )
+    sources, targets = __get_edge_rows(columnar)
+
+    adjacency = sparse.csr_matrix(
+        (np.ones(len(sources), dtype=np.float64), (sources, targets)),
+        shape=(num_nodes, num_nodes),
+    )
+    adjacency.sum_duplicates()
+
+    return CSRGraph(
+        adjacency=adjacency,
+        node_ids=np.array(columnar.nodes.id, dtype=np.int64),
+        positions=np.array(columnar.nodes.position, dtype=np.float64),
+        tree_ids=columnar.tree_ids[node_tree_indices],
+    )
+
+
+def from_csr(graph: CSRGraph, nml: Optional[NML] = None) -> NML:
+    """
+    Converts a sparse adjacency matrix back into a skeleton annotation. Each non-zero entry `[i, j]` becomes an edge from node `node_ids[i]` to node `node_ids[j]`. If the matrix is symmetric, only one direction of each edge is kept.
+
+    Arguments:
+        graph (CSRGraph): The graph, e.g. as returned by `to_csr` and modified with `scipy.sparse.csgraph`
+        nml (Optional[NML] = None): The original annotation. If given, its parameters, comments, branchpoints and groups, the name, color and group of trees with the same id (unless `graph.tree_ids` is `None`) and the attributes of nodes with the same id are kept. Comments and branchpoints of removed nodes are dropped. All other trees get a random color.
+
+    Return:
+        NML: A wK NML skeleton annotation object. Trees and their nodes are ordered by the rows of the matrix, edges by source and target row.
+
+    Example:
+        ```
+        graph = wknml.to_csr(nml)
+        # One tree per connected component
+        split_nml = wknml.from_csr(graph._replace(tree_ids=None), nml)
+        ```
+    """
+
+    sparse = __import_scipy_sparse()
+
+    adjacency = sparse.csr_matrix(graph.adjacency)
+    adjacency.sum_duplicates()
+    adjacency.eliminate_zeros()
+    adjacency = adjacency.tocoo()
+    rows, columns = adjacency.row.astype(np.int64), adjacency.col.astype(np.int64)
+    num_nodes = len(graph.node_ids)
+
+    # Drops the reversed copies of edges of symmetric matrices
+    keys = rows * num_nodes + columns
+    reversed_keys = columns * num_nodes + rows
+    keep = ~((rows > columns) & np.isin(reversed_keys, keys))
+    rows, columns = rows[keep], columns[keep]
+    order = np.lexsort((columns, rows))
+    rows, columns = rows[order], columns[order]
+
+    tree_ids = graph.tree_ids
+    if tree_ids is None:
+        _, labels = sparse.csgraph.connected_components(adjacency, directed=False)
+        _, first_rows, labels = np.unique(
+            labels, return_index=True, return_inverse=True
+        )
+        # Components are numbered in the order of their first node
+        tree_ids = np.argsort(np.argsort(first_rows))[labels] + 1
+    tree_ids = np.asarray(tree_ids, dtype=np.int64)
+
+    unique_tree_ids, first_rows, node_tree_indices = np.unique(
+        tree_ids, return_index=True, return_inverse=True
+    )
+    tree_order = np.argsort(first_rows)
+
+    node_order = np.argsort(node_tree_indices, kind="stable")
+    node_offsets = np.searchsorted(
+        node_tree_indices[node_order], np.arange(len(unique_tree_ids) + 1)
+    )
+    edge_tree_indices = node_tree_indices[rows]
+    edge_order = np.argsort(edge_tree_indices, kind="stable")
+    edge_offsets = np.searchsorted(
+        edge_tree_indices[edge_order], np.arange(len(unique_tree_ids) + 1)
+    )
+
+    index = NodeIndex(nml) if nml is not None else None
+    node_ids = graph.node_ids.tolist()
+    positions = [tuple(position) for position in np.asarray(graph.positions).tolist()]
+
+    def create_node(row: int) -> Node:
+        node_id = node_ids[row]
+        if index is not None and node_id in index:
+            return index.node(node_id)._replace(position=positions[row])
+        return Node(id=node_id, position=positions[row])
+
+    trees: List[Tree] = []
+    for tree_index in tree_order.tolist():
+        tree_id = int(unique_tree_ids[tree_index])
+        tree_rows = node_order[node_offsets[tree_index] : node_offsets[tree_index + 1]]
+        tree_edges = edge_order[edge_offsets[tree_index] : edge_offsets[tree_index + 1]]
+        tree = Tree(
+            id=tree_id,
+            color=random_color_rgba(),
+            name=f"tree{tree_id}",
+            nodes=[create_node(row) for row in tree_rows.tolist()],
+            edges=[
+                Edge(source=node_ids[source], target=node_ids[target])
+                for source, target in zip(
+                    rows[tree_edges].tolist(), columns[tree_edges].tolist()
+                )
+            ],
+        )
+        if index is not None and graph.tree_ids is not None:
+            try:
+                template = index.get_tree(tree_id)
+                tree = tree._replace(
+                    color=template.color, name=template.name, groupId=template.groupId
+                )
+            except KeyError:
+                pass
+        trees.append(tree)
+
+    if nml is None:
+        return NML(
+            parameters=NMLParameters(name="dataset", scale=(11.24, 11.24, 25.0)),
+            trees=trees,
+            branchpoints=[],
+            comments=[],
+            groups=[],
+        )
+
+    existing_node_ids = set(node_ids)
+    return nml._replace(
+        trees=trees,
+        branchpoints=[bp for bp in nml.branchpoints if bp.id in existing_node_ids],
+        comments=[c for c in nml.comments if c.node in existing_node_ids],
+    )
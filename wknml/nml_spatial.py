@@ -0,0 +1,162 @@
+from typing import Sequence, Tuple, Union
+
+import numpy as np
+
+from . import NML
+from .nml_columnar import ColumnarNML
+
+
+class SpatialIndex:
+    """
+    A KD-tree over the positions of all nodes of an annotation in physical coordinates, i.e. node positions multiplied with `parameters.scale` (usually nm). Supports nearest neighbor, radius and bounding box queries, which return node ids and the ids of the trees containing them. Requires the optional scipy package.
+
+    All query coordinates and distances are physical as well. Multiply voxel coordinates with `parameters.scale` before querying.
+
+    Note:
+        If a node id occurs in several trees, each occurrence is indexed separately. The index does not follow later modifications of the annotation.
+
+    Attributes:
+        node_ids (np.ndarray): Node id of each indexed node. Shape: (n,), dtype: int64
+        tree_ids (np.ndarray): Id of the tree of each indexed node. Shape: (n,), dtype: int64
+        positions (np.ndarray): Physical position of each indexed node. Shape: (n, 3), dtype: float64
+
+    Example:
+        ```
+        index = wknml.SpatialIndex(nml)
+        distances, node_ids, tree_ids = index.query([1000.0, 2000.0, 3000.0], k=5)
+        node_ids, tree_ids = index.query_radius([1000.0, 2000.0, 3000.0], 500.0)
+        ```
+    """
+
+    def __init__(self, nml: Union[NML, ColumnarNML]):
+        try:
+            from scipy.spatial import cKDTree
+        except ImportError as e:
+            raise ImportError(
+                "The spatial index requires the optional scipy package, install it with `pip install wknml[scipy]`."
+            ) from e
+
+        scale = np.array(nml.parameters.scale, dtype=np.float64)
+
+        if isinstance(nml, ColumnarNML):
+            self.node_ids = np.array(nml.nodes.id, dtype=np.int64)
+            self.tree_ids = np.repeat(
+                np.asarray(nml.tree_ids, dtype=np.int64), np.diff(nml.node_offsets)
+            )
+            positions = np.array(nml.nodes.position, dtype=np.float64)
+        else:
+            num_nodes = sum(len(tree.nodes) for tree in nml.trees)
+            self.node_ids = np.empty(num_nodes, dtype=np.int64)
+            self.tree_ids = np.empty(num_nodes, dtype=np.int64)
+            positions = np.empty((num_nodes, 3), dtype=np.float64)
+            offset = 0
+            for tree in nml.trees:
+                end = offset + len(tree.nodes)
+                self.node_ids[offset:end] = [node.id for node in tree.nodes]
+                self.tree_ids[offset:end] = tree.id
+                positions[offset:end] = np.asarray(
+                    [node.position for node in tree.nodes], dtype=np.float64
+                ).reshape(-1, 3)
+                offset = end
+
+        self.positions = positions * scale
+        # An unbalanced tree with sliding midpoint splits builds much faster
+        # and answers queries on skeleton data about as fast
+        self.__kd_tree = cKDTree(
+            self.positions, balanced_tree=False, compact_nodes=False
+        )
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def query(
+        self,
+        points: Union[Sequence[float], np.ndarray],
+        k: int = 1,
+        max_distance: float = np.inf,
+        workers: int = 1,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Finds the `k` nearest nodes of each point.
+
+        Arguments:
+            points (Union[Sequence[float], np.ndarray]): A single point of shape (3,) or several points of shape (m, 3)
+            k (int = 1): Number of neighbors per point
+            max_distance (float = np.inf): Only return neighbors within this distance
+            workers (int = 1): Number of threads for querying many points, -1 to use all CPUs
+
+        Return:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: Distances, node ids and tree ids of the neighbors, ordered by distance. The shape is (m, k) for several points and (k,) for a single point. Missing neighbors have distance `inf` and node and tree id -1.
+        """
+
+        points = np.asarray(points, dtype=np.float64)
+        distances, indices = self.__kd_tree.query(
+            points.reshape(-1, 3),
+            k=k,
+            distance_upper_bound=max_distance,
+            workers=workers,
+        )
+        indices = indices.reshape(len(distances), k)
+        distances = distances.reshape(len(distances), k)
+
+        missing = indices >= len(self.node_ids)
+        indices[missing] = 0
+        node_ids = np.where(missing, -1, self.node_ids[indices])
+        tree_ids = np.where(missing, -1, self.tree_ids[indices])
+
+        if points.ndim == 1:
+            return distances[0], node_ids[0], tree_ids[0]
+        return distances, node_ids, tree_ids
+
+    def query_radius(
+        self, point: Union[Sequence[float], np.ndarray], radius: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds all nodes within `radius` of `point`.
+
+        Return:
+            Tuple[np.ndarray, np.ndarray]: Node ids and tree ids of the found nodes, ordered by distance
+        """
+
+        point = np.asarray(point, dtype=np.float64)
+        indices = np.array(
+            self.__kd_tree.query_ball_point(point, radius), dtype=np.int64
+        )
+        distances = np.linalg.norm(self.positions[indices] - point, axis=1)
+        indices = indices[np.argsort(distances, kind="stable")]
+        return self.node_ids[indices], self.tree_ids[indices]
+
+    def query_bbox(
+        self,
+        bbox_min: Union[Sequence[float], np.ndarray],
+        bbox_max: Union[Sequence[float], np.ndarray],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds all nodes within the axis-aligned box from `bbox_min` to `bbox_max` (both inclusive).
+
+        Arguments:
+            bbox_min (Union[Sequence[float], np.ndarray]): Minimum corner of the box
+            bbox_max (Union[Sequence[float], np.ndarray]): Maximum corner of the box
+
+        Return:
+            Tuple[np.ndarray, np.ndarray]: Node ids and tree ids of the found nodes in the order of the annotation
+        """
+
+        bbox_min = np.asarray(bbox_min, dtype=np.float64)
+        bbox_max = np.asarray(bbox_max, dtype=np.float64)
+        if np.any(bbox_max < bbox_min):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        # The box is covered by the ball of the maximum norm around its center
+        center = (bbox_min + bbox_max) / 2
+        half_extent = float(np.max(bbox_max - bbox_min)) / 2
+        indices = np.sort(
+            np.array(
+                self.__kd_tree.query_ball_point(center, half_extent, p=np.inf),
+                dtype=np.int64,
+            )
+        )
+        positions = self.positions[indices]
+        inside = np.all((positions >= bbox_min) & (positions <= bbox_max), axis=1)
+        indices = indices[inside]
+        return self.node_ids[indices], self.tree_ids[indices]
@@ -0,0 +1,139 @@
+from typing import NamedTuple, Union
+
+import numpy as np
+
+from . import NML
+from .nml_columnar import ColumnarNML, nml_to_columnar, __get_edge_rows
+
+
+class TreeStats(NamedTuple):
+    """
+    Statistics of all trees of an annotation as table with one row per tree, in the order of the trees. All lengths and coordinates are physical, i.e. node positions multiplied with `parameters.scale` (usually nm).
+
+    Attributes:
+        tree_ids (np.ndarray): Tree ids. Shape: (t,), dtype: int64
+        num_nodes (np.ndarray): Number of nodes. Shape: (t,), dtype: int64
+        num_edges (np.ndarray): Number of edges. Shape: (t,), dtype: int64
+        cable_length (np.ndarray): Sum of the lengths of all edges. Shape: (t,), dtype: float64
+        num_branch_nodes (np.ndarray): Number of nodes with more than two edges. These are independent of the branchpoint markers of the annotation. Shape: (t,), dtype: int64
+        num_leaf_nodes (np.ndarray): Number of nodes with at most one edge. Shape: (t,), dtype: int64
+        bbox_min (np.ndarray): Minimum corner of the bounding box of the nodes, `NaN` for trees without nodes. Shape: (t, 3), dtype: float64
+        bbox_max (np.ndarray): Maximum corner of the bounding box of the nodes, `NaN` for trees without nodes. Shape: (t, 3), dtype: float64
+    """
+
+    tree_ids: np.ndarray
+    num_nodes: np.ndarray
+    num_edges: np.ndarray
+    cable_length: np.ndarray
+    num_branch_nodes: np.ndarray
+    num_leaf_nodes: np.ndarray
+    bbox_min: np.ndarray
+    bbox_max: np.ndarray
+
+
+class NMLStats(NamedTuple):
+    """
+    Statistics of a whole annotation, see `stats`.
+
+    Attributes:
+        trees (TreeStats): The statistics of each tree
+        num_trees (int): Number of trees
+        num_nodes (int): Number of nodes of all trees
+        num_edges (int): Number of edges of all trees
+        cable_length (float): Cable length of all trees
+        num_branch_nodes (int): Number of branch nodes of all trees
+        num_leaf_nodes (int): Number of leaf nodes of all trees
+        bbox_min (np.ndarray): Minimum corner of the bounding box of all nodes, `NaN` if there are no nodes. Shape: (3,)
+        bbox_max (np.ndarray): Maximum corner of the bounding box of all nodes, `NaN` if there are no nodes. Shape: (3,)
+    """
+
+    trees: TreeStats
+    num_trees: int
+    num_nodes: int
+    num_edges: int
+    cable_length: float
+    num_branch_nodes: int
+    num_leaf_nodes: int
+    bbox_min: np.ndarray
+    bbox_max: np.ndarray
+
+
+def __reduce_per_tree(
+    ufunc: np.ufunc, values: np.ndarray, node_offsets: np.ndarray
+) -> np.ndarray:
+    # np.ufunc.reduceat does not support empty ranges, so they are skipped
+    result = np.full((len(node_offsets) - 1, 3), np.nan)
+    counts = np.diff(node_offsets)
+    non_empty = counts > 0
+    if non_empty.any():
+        result[non_empty] = ufunc.reduceat(values, node_offsets[:-1][non_empty])
+    return result
+
+
+def stats(nml: Union[NML, ColumnarNML]) -> NMLStats:
+    """
+    Computes the cable length, node and edge counts, numbers of branch and leaf nodes and the physical bounding box of every tree and of the whole annotation. All statistics are computed with vectorized NumPy operations over the node and edge arrays.
+
+    Note:
+        Edges are resolved within their tree, so node ids only need to be unique per tree. Pass a `ColumnarNML` object, e.g. from `parse_nml_columnar`, to skip the conversion of the nodes into arrays.
+
+    Arguments:
+        nml (Union[NML, ColumnarNML]): A wK skeleton annotation
+
+    Return:
+        NMLStats: Per-tree statistics and aggregates of the annotation
+
+    Example:
+        ```
+        nml_stats = wknml.stats(nml)
+        print(nml_stats.cable_length, nml_stats.num_branch_nodes)
+        for tree_id, length in zip(nml_stats.trees.tree_ids, nml_stats.trees.cable_length):
+            print(tree_id, length)
+        ```
+    """
+
+    columnar = nml if isinstance(nml, ColumnarNML) else nml_to_columnar(nml)
+    num_trees = len(columnar.tree_ids)
+    num_nodes = len(columnar.nodes.id)
+    node_offsets = np.asarray(columnar.node_offsets, dtype=np.int64)
+    edge_offsets = np.asarray(columnar.edge_offsets, dtype=np.int64)
+    node_tree_indices = np.repeat(np.arange(num_trees), np.diff(node_offsets))
+    edge_tree_indices = np.repeat(np.arange(num_trees), np.diff(edge_offsets))
+
+    positions = np.asarray(columnar.nodes.position, dtype=np.float64) * np.array(
+        columnar.parameters.scale, dtype=np.float64
+    )
+    sources, targets = __get_edge_rows(columnar)
+    edge_lengths = np.linalg.norm(positions[targets] - positions[sources], axis=1)
+    degrees = np.bincount(sources, minlength=num_nodes) + np.bincount(
+        targets, minlength=num_nodes
+    )
+
+    tree_stats = TreeStats(
+        tree_ids=np.array(columnar.tree_ids, dtype=np.int64),
+        num_nodes=np.diff(node_offsets),
+        num_edges=np.diff(edge_offsets),
+        cable_length=np.bincount(
+            edge_tree_indices, weights=edge_lengths, minlength=num_trees
+        ),
+        num_branch_nodes=np.bincount(
+            node_tree_indices[degrees > 2], minlength=num_trees
+        ),
+        num_leaf_nodes=np.bincount(
+            node_tree_indices[degrees <= 1], minlength=num_trees
+        ),
+        bbox_min=__reduce_per_tree(np.minimum, positions, node_offsets),
+        bbox_max=__reduce_per_tree(np.maximum, positions, node_offsets),
+    )
+
+    return NMLStats(
+        trees=tree_stats,
+        num_trees=num_trees,
+        num_nodes=num_nodes,
+        num_edges=len(sources),
+        cable_length=float(edge_lengths.sum()),
+        num_branch_nodes=int(np.count_nonzero(degrees > 2)),
+        num_leaf_nodes=int(np.count_nonzero(degrees <= 1)),
+        bbox_min=positions.min(axis=0) if num_nodes > 0 else np.full(3, np.nan),
+        bbox_max=positions.max(axis=0) if num_nodes > 0 else np.full(3, np.nan),
+    )
@@ -5,6 +5,13 @@ import numpy as np
 import networkx as nx
 
 from . import NML
+from .nml_columnar import (
+    ColumnarNML,
+    NodeColumns,
+    columnar_to_nml,
+    nml_to_columnar,
+    __get_edge_rows,
+)
 from .nml_generation import generate_graph, generate_nml
 
 
@@ -23,7 +30,8 @@ def get_vector_between_nodes(node1: Dict, node2: Dict, scale) -> np.ndarray:
 def calculate_angle_between_vectors(vector1: np.ndarray, vector2: np.ndarray) -> float:
     dot_val = vector1.dot(vector2)
     length_values = vector_length(vector1) * vector_length(vector2)
-    angle = acos(dot_val / length_values)
+    # Rounding errors may push the cosine of (anti)parallel vectors beyond [-1, 1]
+    angle = acos(min(max(dot_val / length_values, -1.0), 1.0))
     return angle
 
 
@@ -58,15 +66,28 @@ def detect_max_node_id_from_all_graphs(graph_dict: Dict[str, nx.Graph]) -> int:
 
 
 def approximate_minimal_edge_length(
-    nml_or_graph: Union[NML, Tuple[Dict[str, List[nx.Graph]], Dict]],
+    nml_or_graph: Union[NML, ColumnarNML, Tuple[Dict[str, List[nx.Graph]], Dict]],
     max_length: float,
     max_angle: float,
-) -> Union[NML, Tuple[Dict[str, List[nx.Graph]], Dict]]:
-    # it is easier to operate on a graph
+) -> Union[NML, ColumnarNML, Tuple[Dict[str, List[nx.Graph]], Dict]]:
+    """
+    Removes nodes within unbranched paths: a node with exactly two neighbors is removed and its neighbors are connected directly if the angle between its two edges is at most `max_angle` (in radians) and the new edge is at most `max_length` long (in nm, according to `parameters.scale`).
+
+    NML and ColumnarNML inputs are processed with vectorized array operations. All unbranched paths are decimated in parallel rounds until no node qualifies anymore. Each round removes the qualifying nodes that win against their qualifying neighbors by a pseudo-random priority derived from the tree and node ids, so that the result does not depend on the order of nodes and edges. Trees, groups and the order of the remaining nodes and edges are kept, comments and branchpoints of removed nodes are dropped.
+    """
+
     if isinstance(nml_or_graph, NML):
-        nml_graph, parameter_dict = generate_graph(nml_or_graph)
-    else:
-        nml_graph, parameter_dict = nml_or_graph
+        return columnar_to_nml(
+            __approximate_minimal_edge_length_columnar(
+                nml_to_columnar(nml_or_graph), max_length, max_angle
+            )
+        )
+    if isinstance(nml_or_graph, ColumnarNML):
+        return __approximate_minimal_edge_length_columnar(
+            nml_or_graph, max_length, max_angle
+        )
+
+    nml_graph, parameter_dict = nml_or_graph
     scale = np.array(parameter_dict["scale"])
     for group in nml_graph.values():
         for graph in group:
@@ -74,11 +95,134 @@ def approximate_minimal_edge_length(
                 graph, max_length, max_angle, scale
             )
 
-    # return the same format as the input
-    if isinstance(nml_or_graph, NML):
-        return generate_nml(nml_graph, parameter_dict, globalize_ids=False)
-    else:
-        return nml_graph, parameter_dict
+    return nml_graph, parameter_dict
+
+
+def __approximate_minimal_edge_length_columnar(
+    columnar: ColumnarNML, max_length: float, max_angle: float
+) -> ColumnarNML:
+    nodes = columnar.nodes
+    num_nodes = len(nodes.id)
+    positions = nodes.position * np.array(columnar.parameters.scale)
+    sources, targets = __get_edge_rows(columnar)
+    # The original position of each edge, which determines the final edge order
+    edge_keys = np.arange(len(sources))
+    removed = np.zeros(num_nodes, dtype=bool)
+
+    # Pseudo-random but order-independent priorities derived from the tree and
+    # node ids. Unlike priorities that follow the paths, they let every round
+    # remove a constant fraction of the qualifying nodes of long straight paths.
+    num_trees = len(columnar.tree_ids)
+    node_tree_indices = np.repeat(np.arange(num_trees), np.diff(columnar.node_offsets))
+    hashes = nodes.id.astype(np.uint64) * np.uint64(
+        0x9E3779B97F4A7C15
+    ) + columnar.tree_ids[node_tree_indices].astype(np.uint64) * np.uint64(
+        0xC2B2AE3D27D4EB4F
+    )
+    hashes ^= hashes >> np.uint64(31)
+    priorities = np.empty(num_nodes, dtype=np.int64)
+    priorities[np.lexsort((np.arange(num_nodes), hashes))] = np.arange(num_nodes)
+
+    while True:
+        num_edges = len(sources)
+        # Incidences sorted by node, incoming edges first
+        incident_nodes = np.concatenate([targets, sources])
+        neighbors = np.concatenate([sources, targets])
+        incident_edges = np.concatenate([np.arange(num_edges)] * 2)
+        order = np.lexsort((np.arange(2 * num_edges) >= num_edges, incident_nodes))
+        degrees = np.bincount(incident_nodes, minlength=num_nodes)
+        first_incidences = np.cumsum(degrees) - degrees
+
+        rows = np.flatnonzero(degrees == 2)
+        first = order[first_incidences[rows]]
+        second = order[first_incidences[rows] + 1]
+        previous_rows, next_rows = neighbors[first], neighbors[second]
+
+        vectors1 = positions[rows] - positions[previous_rows]
+        vectors2 = positions[next_rows] - positions[rows]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cosines = np.einsum("ij,ij->i", vectors1, vectors2) / (
+                np.linalg.norm(vectors1, axis=1) * np.linalg.norm(vectors2, axis=1)
+            )
+            angles = np.arccos(np.clip(cosines, -1, 1))
+        distances = np.linalg.norm(
+            positions[next_rows] - positions[previous_rows], axis=1
+        )
+        qualifies = (angles <= max_angle) & (distances <= max_length)
+        if not qualifies.any():
+            break
+
+        # Neighboring nodes are never removed in the same round. Of two
+        # qualifying neighbors, the one with the smaller priority goes first.
+        candidate_priorities = np.full(num_nodes, num_nodes)
+        candidate_priorities[rows[qualifies]] = priorities[rows[qualifies]]
+        selected = (
+            qualifies
+            & (priorities[rows] < candidate_priorities[previous_rows])
+            & (priorities[rows] < candidate_priorities[next_rows])
+        )
+        removed[rows[selected]] = True
+
+        # Replaces the two edges of each removed node by one edge between its neighbors
+        kept_edges = np.ones(num_edges, dtype=bool)
+        kept_edges[incident_edges[first[selected]]] = False
+        kept_edges[incident_edges[second[selected]]] = False
+        sources = np.concatenate([sources[kept_edges], previous_rows[selected]])
+        targets = np.concatenate([targets[kept_edges], next_rows[selected]])
+        edge_keys = np.concatenate(
+            [
+                edge_keys[kept_edges],
+                np.minimum(
+                    edge_keys[incident_edges[first[selected]]],
+                    edge_keys[incident_edges[second[selected]]],
+                ),
+            ]
+        )
+
+        # Closing a cycle may create an edge that already exists
+        undirected_keys = np.minimum(sources, targets) * num_nodes + np.maximum(
+            sources, targets
+        )
+        unique_edges = np.lexsort((edge_keys, undirected_keys))
+        is_first = np.ones(len(unique_edges), dtype=bool)
+        is_first[1:] = np.diff(undirected_keys[unique_edges]) != 0
+        unique_edges = unique_edges[is_first]
+        sources, targets = sources[unique_edges], targets[unique_edges]
+        edge_keys = edge_keys[unique_edges]
+
+    if not removed.any():
+        return columnar
+
+    edge_order = np.argsort(edge_keys, kind="stable")
+    sources, targets = sources[edge_order], targets[edge_order]
+    kept = ~removed
+    removed_ids = set(nodes.id[removed].tolist()) - set(nodes.id[kept].tolist())
+
+    return columnar._replace(
+        node_offsets=np.concatenate(
+            [[0], np.cumsum(np.bincount(node_tree_indices[kept], minlength=num_trees))]
+        ),
+        edge_offsets=np.concatenate(
+            [
+                [0],
+                np.cumsum(np.bincount(node_tree_indices[sources], minlength=num_trees)),
+            ]
+        ),
+        nodes=NodeColumns(
+            **{name: values[kept] for name, values in nodes._asdict().items()}
+        ),
+        edges=np.stack([nodes.id[sources], nodes.id[targets]], axis=1).astype(
+            columnar.edges.dtype
+        ),
+        branchpoints=[
+            branchpoint
+            for branchpoint in columnar.branchpoints
+            if branchpoint.id not in removed_ids
+        ],
+        comments=[
+            comment for comment in columnar.comments if comment.node not in removed_ids
+        ],
+    )
 
 
 def approximate_minimal_edge_length_for_graph(
@@ -103,13 +247,23 @@ def approximate_minimal_edge_length_for_graph(
 
 
 def ensure_max_edge_length(
-    nml_or_graph: Union[NML, Tuple[Dict[str, List[nx.Graph]], Dict]], max_length: float
-) -> Union[NML, Tuple[Dict[str, List[nx.Graph]], Dict]]:
-    # it is easier to operate on a graph
+    nml_or_graph: Union[NML, ColumnarNML, Tuple[Dict[str, List[nx.Graph]], Dict]],
+    max_length: float,
+) -> Union[NML, ColumnarNML, Tuple[Dict[str, List[nx.Graph]], Dict]]:
+    """
+    Inserts evenly spaced padding nodes into all edges that are longer than `max_length` (in nm, according to `parameters.scale`). Padding nodes get new ids counting up from the largest node id and copy the attributes of the source node of their edge.
+
+    NML and ColumnarNML inputs are processed with vectorized array operations and keep their trees, groups, comments and branchpoints. The padding nodes are appended to the nodes of their tree and each long edge is replaced by a chain of edges at its position.
+    """
+
     if isinstance(nml_or_graph, NML):
-        nml_graph, parameter_dict = generate_graph(nml_or_graph)
-    else:
-        nml_graph, parameter_dict = nml_or_graph
+        return columnar_to_nml(
+            __ensure_max_edge_length_columnar(nml_to_columnar(nml_or_graph), max_length)
+        )
+    if isinstance(nml_or_graph, ColumnarNML):
+        return __ensure_max_edge_length_columnar(nml_or_graph, max_length)
+
+    nml_graph, parameter_dict = nml_or_graph
     scale = np.array(parameter_dict["scale"])
     max_id = detect_max_node_id_from_all_graphs(nml_graph)
     next_valid_id = max_id + 1
@@ -119,11 +273,98 @@ def ensure_max_edge_length(
                 graph, max_length, next_valid_id, scale
             )
 
-    # return the same format as the input
-    if isinstance(nml_or_graph, NML):
-        return generate_nml(nml_graph, parameter_dict, globalize_ids=False)
-    else:
-        return nml_graph, parameter_dict
+    return nml_graph, parameter_dict
+
+
+def __ensure_max_edge_length_columnar(
+    columnar: ColumnarNML, max_length: float
+) -> ColumnarNML:
+    nodes = columnar.nodes
+    sources, targets = __get_edge_rows(columnar)
+    source_positions = nodes.position[sources]
+    edge_vectors = nodes.position[targets] - source_positions
+    # Scales the positions before subtracting them, like the graph version does
+    scale = np.array(columnar.parameters.scale)
+    edge_lengths = np.linalg.norm(
+        nodes.position[targets] * scale - source_positions * scale, axis=1
+    )
+
+    # An edge of length d is split into ceil(d / max_length) segments
+    num_segments = np.maximum(np.ceil(edge_lengths / max_length), 1).astype(np.int64)
+    num_padding = num_segments - 1
+    total_padding = int(num_padding.sum())
+    if total_padding == 0:
+        return columnar
+
+    # Padding nodes in the order of their edges, numbered 1..k along each edge
+    padding_edges = np.repeat(np.arange(len(num_padding)), num_padding)
+    padding_offsets = np.cumsum(num_padding) - num_padding
+    padding_steps = np.arange(total_padding) - padding_offsets[padding_edges] + 1
+    padding_sources = sources[padding_edges]
+    max_id = int(nodes.id.max())
+    padding_ids = np.arange(max_id + 1, max_id + 1 + total_padding, dtype=np.int64)
+    padding_positions = (
+        source_positions[padding_edges]
+        + edge_vectors[padding_edges]
+        * (padding_steps / num_segments[padding_edges])[:, np.newaxis]
+    )
+
+    # Original nodes come first in each tree, followed by the padding nodes
+    num_trees = len(columnar.tree_ids)
+    edge_tree_indices = np.repeat(np.arange(num_trees), np.diff(columnar.edge_offsets))
+    node_tree_indices = np.repeat(np.arange(num_trees), np.diff(columnar.node_offsets))
+    node_order = np.argsort(
+        np.concatenate([node_tree_indices, edge_tree_indices[padding_edges]]),
+        kind="stable",
+    )
+    padding_counts = np.bincount(edge_tree_indices[padding_edges], minlength=num_trees)
+
+    def combine(values: np.ndarray, padding_values: np.ndarray) -> np.ndarray:
+        return np.concatenate([values, padding_values])[node_order]
+
+    new_nodes = NodeColumns(
+        **{
+            name: combine(values, values[padding_sources])
+            for name, values in nodes._asdict().items()
+        }
+    )._replace(
+        id=combine(nodes.id, padding_ids),
+        position=combine(nodes.position, padding_positions),
+    )
+
+    # Each edge becomes a chain source -> padding nodes -> target
+    segment_edges = np.repeat(np.arange(len(num_segments)), num_segments)
+    segment_steps = (
+        np.arange(len(segment_edges))
+        - (np.cumsum(num_segments) - num_segments)[segment_edges]
+    )
+    chain_ids = padding_ids[
+        np.minimum(
+            padding_offsets[segment_edges] + segment_steps, max(total_padding - 1, 0)
+        )
+    ]
+    chain_sources = np.where(
+        segment_steps == 0,
+        columnar.edges[segment_edges, 0],
+        padding_ids[np.maximum(padding_offsets[segment_edges] + segment_steps - 1, 0)],
+    )
+    chain_targets = np.where(
+        segment_steps == num_padding[segment_edges],
+        columnar.edges[segment_edges, 1],
+        chain_ids,
+    )
+    segment_counts = np.bincount(
+        edge_tree_indices, weights=num_segments, minlength=num_trees
+    ).astype(np.int64)
+
+    return columnar._replace(
+        node_offsets=np.concatenate(
+            [[0], np.cumsum(np.diff(columnar.node_offsets) + padding_counts)]
+        ),
+        edge_offsets=np.concatenate([[0], np.cumsum(segment_counts)]),
+        nodes=new_nodes,
+        edges=np.stack([chain_sources, chain_targets], axis=1),
+    )
 
 
 def ensure_max_edge_length_for_graph(
@@ -0,0 +1,699 @@
+import os
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import PathLike
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Text,
+    Tuple,
+    Union,
+)
+from xml.sax.saxutils import quoteattr
+
+import numpy as np
+
+from . import NMLParameters, Node, Tree, Branchpoint, Comment, Group, Volume
+from .nml_columnar import MISSING, ColumnarNML, NodeColumns, columnar_to_tree
+
+COMPRESSIONS = ("gzip", "zstd", "zip")
+"""The supported output compressions of `NMLWriter` and `write_nml`."""
+
+NODE_DEFAULT_ATTRIBUTES = (
+    "radius",
+    "rotation",
+    "inVp",
+    "inMag",
+    "bitDepth",
+    "interpolation",
+    "time",
+)
+"""The node attributes that can be omitted with the `node_defaults` option of `NMLWriter` and `write_nml`."""
+
+
+class NMLWriter:
+    """
+    Writes an NML file incrementally, so that annotations can be generated without holding all trees in memory. Each tree is formatted and written as soon as it is passed to `write_tree`, only a small write buffer is kept. The output is the same as that of `write_nml` for an NML object with the same content.
+
+    The parts of the file need to be written in this order: trees, branchpoints, comments, groups, volume. Each `write_*` method can be called repeatedly, until a method of a later part is called. Parts that are never written are left empty. The file is completed by `close`, which is called automatically at the end of a `with` block.
+
+    Note:
+        With `"gzip"` and `"zstd"` compression, every block of one megabyte is compressed independently and written as a separate gzip member or zstd frame, like pigz does. The blocks are compressed on `threads` threads while the next ones are formatted, and the output does not depend on the number of threads. Such files can be read by `parse_nml` and the usual command line tools. ZIP archives contain the NML file as their only member, like webKnossos annotation downloads, and are always compressed on a single thread.
+
+    By default, numbers are written like `str` does, e.g. integer positions as `1234.0` and computed positions with up to 17 significant digits. `decimals` rounds positions, radii and rotations and writes integers without a fraction, which makes the files smaller and faster to write and parse. `node_defaults` omits node attributes with a common value. Note that omitted attributes are read as `None` by `parse_nml`.
+
+    Arguments:
+        file (Union[BinaryIO, Text, PathLike]): A Python file handle or a path. Paths are opened and closed by the writer, file handles are left open.
+        parameters (NMLParameters): The metadata of the annotation
+        compression (Optional[Text] = None): `"gzip"`, `"zstd"` (requires the optional zstandard package) or `"zip"`. By default, the file is not compressed.
+        threads (int = 1): The number of threads compressing gzip or zstd output
+        decimals (Optional[int] = None): The maximum number of decimal places of positions, radii and rotations. Trailing zeros are omitted.
+        node_defaults (Optional[Dict[Text, Any]] = None): Node attributes that are omitted if they have the given value, e.g. `{"rotation": (0.0, 0.0, 0.0), "inVp": 0}`. The keys need to be in `NODE_DEFAULT_ATTRIBUTES`.
+
+    Example:
+        ```
+        with wknml.NMLWriter("out.nml", parameters) as writer:
+            for tree in generate_trees():
+                writer.write_tree(tree)
+            writer.write_comments(comments)
+        ```
+    """
+
+    # Lines are collected and encoded in batches, which is much faster than
+    # writing them one by one
+    _BUFFER_LINES = 8192
+    # Compressed output is split into blocks of a fixed size, so that it does
+    # not depend on how the data was written
+    _COMPRESSION_BLOCK_SIZE = 1 << 20
+    _SECTIONS = ("trees", "branchpoints", "comments", "groups", "volume")
+
+    def __init__(
+        self,
+        file: Union[BinaryIO, Text, PathLike],
+        parameters: NMLParameters,
+        compression: Optional[Text] = None,
+        threads: int = 1,
+        decimals: Optional[int] = None,
+        node_defaults: Optional[Dict[Text, Any]] = None,
+    ):
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(
+                f"Unknown compression '{compression}'. Choose one of {', '.join(repr(c) for c in COMPRESSIONS)}."
+            )
+        if threads < 1:
+            raise ValueError("The number of threads needs to be at least 1.")
+        if decimals is not None and decimals < 0:
+            raise ValueError("The number of decimals must not be negative.")
+        for name in node_defaults or {}:
+            if name not in NODE_DEFAULT_ATTRIBUTES:
+                raise ValueError(
+                    f"Unknown node attribute '{name}'. Choose from {', '.join(repr(a) for a in NODE_DEFAULT_ATTRIBUTES)}."
+                )
+
+        self.__decimals = decimals
+        self.__node_defaults = dict(node_defaults or {})
+        if "rotation" in self.__node_defaults:
+            self.__node_defaults["rotation"] = tuple(self.__node_defaults["rotation"])
+
+        self.__owns_file = isinstance(file, (str, PathLike))
+        self.__file = open(file, "wb") if self.__owns_file else file
+        self.__output = self.__file
+        self.__archive: Optional[zipfile.ZipFile] = None
+        self.__compress: Optional[Callable[[bytes], bytes]] = None
+        self.__executor: Optional[ThreadPoolExecutor] = None
+        self.__pending: Deque[Future] = deque()
+        self.__uncompressed = bytearray()
+        self.__threads = threads
+
+        if compression == "zip":
+            self.__archive = zipfile.ZipFile(self.__file, "w", zipfile.ZIP_DEFLATED)
+            member = zipfile.ZipInfo(
+                NMLWriter._get_member_name(file, parameters), time.localtime()[:6]
+            )
+            member.compress_type = zipfile.ZIP_DEFLATED
+            self.__output = self.__archive.open(member, "w", force_zip64=True)
+        elif compression is not None:
+            self.__compress = (
+                NMLWriter._compress_gzip
+                if compression == "gzip"
+                else NMLWriter._create_zstd_compress()
+            )
+            if threads > 1:
+                self.__executor = ThreadPoolExecutor(threads)
+
+        self.__lines: List[Text] = []
+        self.__section = 0
+        self.__section_started = False
+        self.__closed = False
+
+        self.__lines.append('<?xml version="1.0" encoding="utf-8"?>')
+        self.__lines.append("<things>")
+        self.__lines.extend(NMLWriter._format_parameters(parameters))
+
+    def __enter__(self) -> "NMLWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+            return
+        if self.__executor is not None:
+            self.__executor.shutdown()
+        if self.__owns_file:
+            self.__file.close()
+
+    def __enter_section(self, section: Text):
+        if self.__closed:
+            raise ValueError("The NMLWriter is already closed.")
+        index = NMLWriter._SECTIONS.index(section)
+        if index < self.__section:
+            raise ValueError(
+                f"The {section} need to be written before the {NMLWriter._SECTIONS[self.__section]}."
+            )
+        while self.__section < index:
+            self.__end_section()
+            self.__section += 1
+            self.__section_started = False
+
+    def __start_section(self):
+        # Wrapping elements are only opened once they get children, so that
+        # empty ones can be written collapsed like by write_nml
+        if not self.__section_started and self.__section in (1, 2, 3):
+            self.__lines.append(f"  <{NMLWriter._SECTIONS[self.__section]}>")
+        self.__section_started = True
+
+    def __end_section(self):
+        if self.__section in (1, 2, 3):
+            tag = NMLWriter._SECTIONS[self.__section]
+            self.__lines.append(
+                f"  </{tag}>" if self.__section_started else f"  <{tag} />"
+            )
+
+    def __write_lines(self, lines: List[Text]):
+        if len(lines) == 0:
+            return
+        self.__start_section()
+        self.__lines.extend(lines)
+        if len(self.__lines) >= NMLWriter._BUFFER_LINES:
+            self.__flush()
+
+    def __flush(self):
+        if not self.__lines:
+            return
+        self.__lines.append("")
+        data = os.linesep.join(self.__lines).encode("utf-8")
+        self.__lines.clear()
+        self.__write_data(data)
+
+    def __write_data(self, data: bytes):
+        if self.__compress is None:
+            self.__output.write(data)
+            return
+        self.__uncompressed += data
+        block_size = NMLWriter._COMPRESSION_BLOCK_SIZE
+        while len(self.__uncompressed) >= block_size:
+            self.__compress_block(bytes(self.__uncompressed[:block_size]))
+            del self.__uncompressed[:block_size]
+
+    def __compress_block(self, block: bytes):
+        if self.__executor is None:
+            self.__output.write(self.__compress(block))
+            return
+        # Keeps a few blocks in flight, so that all threads are busy while the
+        # memory stays bounded
+        self.__pending.append(self.__executor.submit(self.__compress, block))
+        while len(self.__pending) > 2 * self.__threads:
+            self.__output.write(self.__pending.popleft().result())
+
+    def write_tree(self, tree: Tree):
+        """
+        Writes a tree with all its nodes and edges.
+        """
+
+        self.__enter_section("trees")
+        self.__write_lines(
+            NMLWriter._format_tree(tree, self.__decimals, self.__node_defaults)
+        )
+
+    def write_trees(self, trees: Iterable[Tree]):
+        """
+        Writes several trees, see `write_tree`.
+        """
+
+        for tree in trees:
+            self.write_tree(tree)
+
+    def write_trees_columnar(self, columnar: ColumnarNML):
+        """
+        Writes all trees of a `ColumnarNML` object. The node attributes are rounded and checked for defaults on the NumPy columns, for the nodes of several trees at once, and no `Node` objects are created. The output is the same as with `write_trees(columnar_to_nml(columnar).trees)`.
+        """
+
+        self.__enter_section("trees")
+        for lines in NMLWriter._format_trees_columnar(
+            columnar,
+            0,
+            len(columnar.tree_ids),
+            self.__decimals,
+            self.__node_defaults,
+        ):
+            self.__write_lines(lines)
+
+    def _write_formatted_trees(self, data: bytes):
+        # Writes trees that were already formatted and encoded, e.g. by the
+        # worker processes of write_nml_parallel
+        self.__enter_section("trees")
+        self.__start_section()
+        self.__flush()
+        self.__write_data(data)
+
+    def write_branchpoints(self, branchpoints: Iterable[Branchpoint]):
+        """
+        Writes branchpoints. Afterwards, no more trees can be written.
+        """
+
+        self.__enter_section("branchpoints")
+        self.__write_lines(
+            [
+                NMLWriter._format_element(
+                    2,
+                    "branchpoint",
+                    {"id": branchpoint.id}
+                    if branchpoint.time is None
+                    else {"id": branchpoint.id, "time": branchpoint.time},
+                )
+                for branchpoint in branchpoints
+            ]
+        )
+
+    def write_comments(self, comments: Iterable[Comment]):
+        """
+        Writes comments. Afterwards, no more trees and branchpoints can be written.
+        """
+
+        self.__enter_section("comments")
+        self.__write_lines(
+            [
+                NMLWriter._format_element(
+                    2,
+                    "comment",
+                    {"node": comment.node}
+                    if comment.content is None
+                    else {"node": comment.node, "content": comment.content},
+                )
+                for comment in comments
+            ]
+        )
+
+    def write_groups(self, groups: Iterable[Group]):
+        """
+        Writes groups with all their nested sub-groups. Afterwards, only the volume can be written.
+        """
+
+        self.__enter_section("groups")
+        self.__write_lines(
+            [line for group in groups for line in NMLWriter._format_group(group, 2)]
+        )
+
+    def write_volume(self, volume: Volume):
+        """
+        Writes the reference to the volume data of the annotation. Can only be called once.
+        """
+
+        self.__enter_section("volume")
+        if self.__section_started:
+            raise ValueError("The volume has already been written.")
+        attributes = {"id": volume.id, "location": volume.location}
+        if volume.fallback_layer is not None:
+            attributes["fallbackLayer"] = volume.fallback_layer
+        self.__write_lines([NMLWriter._format_element(1, "volume", attributes)])
+
+    def close(self):
+        """
+        Writes the remaining parts of the file and closes it, if it was opened by the writer. Does nothing if the writer is already closed.
+        """
+
+        if self.__closed:
+            return
+        self.__enter_section("volume")
+        self.__lines.append("</things>")
+        self.__flush()
+        self.__closed = True
+        if self.__uncompressed:
+            self.__compress_block(bytes(self.__uncompressed))
+        while self.__pending:
+            self.__output.write(self.__pending.popleft().result())
+        if self.__executor is not None:
+            self.__executor.shutdown()
+        if self.__archive is not None:
+            self.__output.close()
+            self.__archive.close()
+        if self.__owns_file:
+            self.__file.close()
+
+    @staticmethod
+    def _get_member_name(
+        file: Union[BinaryIO, Text, PathLike], parameters: NMLParameters
+    ) -> Text:
+        # "annotation.zip" contains "annotation.nml", like webKnossos downloads
+        if isinstance(file, (str, PathLike)):
+            name = os.path.splitext(os.path.basename(file))[0]
+        else:
+            name = parameters.name or "annotation"
+        return name if name.lower().endswith(".nml") else name + ".nml"
+
+    @staticmethod
+    def _compress_gzip(data: bytes) -> bytes:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+
+    @staticmethod
+    def _create_zstd_compress() -> Callable[[bytes], bytes]:
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError(
+                "Writing zstd-compressed NML files requires the optional zstandard package, install it with `pip install wknml[zstd]`."
+            ) from e
+        # A compressor must not be used by several threads at once
+        return lambda data: zstandard.ZstdCompressor().compress(data)
+
+    # The formatters write the same bytes as the loxun XmlWriter: attributes
+    # sorted by name, values escaped with quoteattr, elements without children
+    # collapsed and two spaces of indentation per level. Attributes with the
+    # value None are omitted, so that they are parsed as None again.
+
+    @staticmethod
+    def _format_element(
+        depth: int, tag: Text, attributes: Dict[Text, Any], closed: bool = True
+    ) -> Text:
+        formatted_attributes = "".join(
+            f" {name}={quoteattr(str(attributes[name]))}"
+            for name in sorted(attributes)
+            if attributes[name] is not None
+        )
+        return f"{'  ' * depth}<{tag}{formatted_attributes}{' />' if closed else '>'}"
+
+    @staticmethod
+    def _format_element_with_children(
+        depth: int, tag: Text, attributes: Dict[Text, Any], children: List[Text]
+    ) -> List[Text]:
+        if len(children) == 0:
+            return [NMLWriter._format_element(depth, tag, attributes)]
+        return [
+            NMLWriter._format_element(depth, tag, attributes, closed=False),
+            *children,
+            f"{'  ' * depth}</{tag}>",
+        ]
+
+    @staticmethod
+    def _format_parameters(parameters: NMLParameters) -> List[Text]:
+        def vector(names: Tuple[Text, ...], values: Sequence) -> Dict[Text, Any]:
+            return dict(zip(names, values))
+
+        bounding_box_names = (
+            "topLeftX",
+            "topLeftY",
+            "topLeftZ",
+            "width",
+            "height",
+            "depth",
+        )
+        elements = [
+            ("experiment", {"name": parameters.name}),
+            ("scale", vector(("x", "y", "z"), parameters.scale)),
+        ]
+        if parameters.offset is not None:
+            elements.append(("offset", vector(("x", "y", "z"), parameters.offset)))
+        if parameters.time is not None:
+            elements.append(("time", {"ms": parameters.time}))
+        if parameters.editPosition is not None:
+            elements.append(
+                ("editPosition", vector(("x", "y", "z"), parameters.editPosition))
+            )
+        if parameters.editRotation is not None:
+            elements.append(
+                (
+                    "editRotation",
+                    vector(("xRot", "yRot", "zRot"), parameters.editRotation),
+                )
+            )
+        if parameters.zoomLevel is not None:
+            elements.append(("zoomLevel", {"zoom": parameters.zoomLevel}))
+        if parameters.taskBoundingBox is not None:
+            elements.append(
+                (
+                    "taskBoundingBox",
+                    vector(bounding_box_names, parameters.taskBoundingBox),
+                )
+            )
+        for user_bounding_box in parameters.userBoundingBoxes or []:
+            elements.append(
+                ("userBoundingBox", vector(bounding_box_names, user_bounding_box))
+            )
+
+        return NMLWriter._format_element_with_children(
+            1,
+            "parameters",
+            {},
+            [
+                NMLWriter._format_element(2, tag, attributes)
+                for tag, attributes in elements
+            ],
+        )
+
+    @staticmethod
+    def _round(value: float, decimals: Optional[int]) -> Union[int, float]:
+        # Rounds like np.round, so that both node formatters write the same
+        # digits. Rounded floats are printed with at most `decimals` places.
+        if decimals is None:
+            return value
+        factor = 10.0 ** decimals
+        rounded = round(value * factor) / factor
+        return int(rounded) if rounded.is_integer() else rounded
+
+    @staticmethod
+    def _round_column(values: np.ndarray, decimals: Optional[int]) -> list:
+        if decimals is None:
+            return values.tolist()
+        rounded = np.round(values, decimals)
+        is_integer = rounded == np.floor(rounded)
+        return [
+            int(value) if integer else value
+            for value, integer in zip(rounded.tolist(), is_integer.tolist())
+        ]
+
+    @staticmethod
+    def _format_node(
+        node: Node,
+        decimals: Optional[int] = None,
+        node_defaults: Optional[Dict[Text, Any]] = None,
+    ) -> Text:
+        # Nodes with all attributes are formatted with a single template, which
+        # is much faster than building and sorting an attribute dict per node
+        if decimals is None and not node_defaults and None not in node:
+            position, rotation = node.position, node.rotation
+            return (
+                f'      <node bitDepth="{node.bitDepth}" id="{node.id}" '
+                f'inMag="{node.inMag}" inVp="{node.inVp}" '
+                f'interpolation="{node.interpolation}" radius="{node.radius}" '
+                f'rotX="{rotation[0]}" rotY="{rotation[1]}" rotZ="{rotation[2]}" '
+                f'time="{node.time}" x="{position[0]}" y="{position[1]}" '
+                f'z="{position[2]}" />'
+            )
+
+        node_defaults = node_defaults or {}
+
+        def optional(name: Text, value: Any) -> Any:
+            # Values equal to their default are omitted like missing ones
+            if name in node_defaults and value == node_defaults[name]:
+                return None
+            return value
+
+        rotation = node.rotation
+        if rotation is not None and optional("rotation", tuple(rotation)) is None:
+            rotation = None
+        radius = optional("radius", node.radius)
+        rounded_rotation = (
+            (None, None, None)
+            if rotation is None
+            else [NMLWriter._round(value, decimals) for value in rotation]
+        )
+        x, y, z = [NMLWriter._round(value, decimals) for value in node.position]
+
+        # In the sorted order of the attribute names, like _format_element
+        attributes = (
+            ("bitDepth", optional("bitDepth", node.bitDepth)),
+            ("id", node.id),
+            ("inMag", optional("inMag", node.inMag)),
+            ("inVp", optional("inVp", node.inVp)),
+            ("interpolation", optional("interpolation", node.interpolation)),
+            ("radius", None if radius is None else NMLWriter._round(radius, decimals)),
+            ("rotX", rounded_rotation[0]),
+            ("rotY", rounded_rotation[1]),
+            ("rotZ", rounded_rotation[2]),
+            ("time", optional("time", node.time)),
+            ("x", x),
+            ("y", y),
+            ("z", z),
+        )
+        return (
+            "      <node"
+            + "".join(
+                f' {name}="{value}"' for name, value in attributes if value is not None
+            )
+            + " />"
+        )
+
+    @staticmethod
+    def _format_node_columns(
+        nodes: NodeColumns,
+        start: int,
+        stop: int,
+        decimals: Optional[int] = None,
+        node_defaults: Optional[Dict[Text, Any]] = None,
+    ) -> List[Text]:
+        # Writes the same lines as _format_node for the rows start:stop. Each
+        # attribute is formatted column by column, omitted values are masked.
+        node_defaults = node_defaults or {}
+        position = nodes.position[start:stop]
+        radius = nodes.radius[start:stop]
+        rotation = nodes.rotation[start:stop]
+
+        has_radius = ~np.isnan(radius)
+        if "radius" in node_defaults:
+            has_radius &= radius != node_defaults["radius"]
+        has_rotation = ~np.isnan(rotation[:, 0])
+        if "rotation" in node_defaults:
+            has_rotation &= np.any(rotation != node_defaults["rotation"], axis=1)
+
+        columns = {
+            "id": (nodes.id[start:stop].tolist(), None),
+            "radius": (NMLWriter._round_column(radius, decimals), has_radius),
+        }
+        for axis, name in enumerate(("x", "y", "z")):
+            columns[name] = (
+                NMLWriter._round_column(position[:, axis], decimals),
+                None,
+            )
+        for axis, name in enumerate(("rotX", "rotY", "rotZ")):
+            columns[name] = (
+                NMLWriter._round_column(rotation[:, axis], decimals),
+                has_rotation,
+            )
+        for name in ("inVp", "inMag", "bitDepth", "interpolation", "time"):
+            values = getattr(nodes, name)[start:stop]
+            is_present = values != MISSING
+            if name in node_defaults:
+                is_present &= values != node_defaults[name]
+            columns[name] = (
+                (values == 1).tolist() if name == "interpolation" else values.tolist(),
+                is_present,
+            )
+
+        # Attributes of all nodes become part of the line template, the
+        # others are formatted per node and left empty where omitted
+        template = ["      <node"]
+        formatted_columns = []
+        for name in sorted(columns):
+            values, is_present = columns[name]
+            if is_present is None or is_present.all():
+                template.append(f' {name}="{{}}"')
+                formatted_columns.append(values)
+            elif is_present.any():
+                template.append("{}")
+                formatted_columns.append(
+                    [
+                        f' {name}="{value}"' if present else ""
+                        for value, present in zip(values, is_present.tolist())
+                    ]
+                )
+        template.append(" />")
+        return list(map("".join(template).format, *formatted_columns))
+
+    @staticmethod
+    def _format_trees_columnar(
+        columnar: ColumnarNML,
+        start: int,
+        stop: int,
+        decimals: Optional[int] = None,
+        node_defaults: Optional[Dict[Text, Any]] = None,
+    ) -> Iterator[List[Text]]:
+        # Yields the lines of the trees start:stop. The nodes of several small
+        # trees are formatted at once.
+        node_offsets = columnar.node_offsets.tolist()
+        edge_offsets = columnar.edge_offsets.tolist()
+
+        batch_start = start
+        while batch_start < stop:
+            batch_stop = batch_start + 1
+            while (
+                batch_stop < stop
+                and node_offsets[batch_stop] - node_offsets[batch_start]
+                < NMLWriter._BUFFER_LINES
+            ):
+                batch_stop += 1
+            node_lines = NMLWriter._format_node_columns(
+                columnar.nodes,
+                node_offsets[batch_start],
+                node_offsets[batch_stop],
+                decimals,
+                node_defaults,
+            )
+            for index in range(batch_start, batch_stop):
+                node_start = node_offsets[index] - node_offsets[batch_start]
+                node_stop = node_offsets[index + 1] - node_offsets[batch_start]
+                edges = columnar.edges[edge_offsets[index] : edge_offsets[index + 1]]
+                yield NMLWriter._format_tree_element(
+                    columnar_to_tree(columnar, index, compact=True),
+                    node_lines[node_start:node_stop],
+                    NMLWriter._format_edges(edges.tolist()),
+                )
+            batch_start = batch_stop
+
+    @staticmethod
+    def _format_edges(edges: Iterable[Tuple[int, int]]) -> List[Text]:
+        return [
+            f'      <edge source="{source}" target="{target}" />'
+            for source, target in edges
+        ]
+
+    @staticmethod
+    def _format_tree(
+        tree: Tree,
+        decimals: Optional[int] = None,
+        node_defaults: Optional[Dict[Text, Any]] = None,
+    ) -> List[Text]:
+        return NMLWriter._format_tree_element(
+            tree,
+            [
+                NMLWriter._format_node(node, decimals, node_defaults)
+                for node in tree.nodes
+            ],
+            NMLWriter._format_edges(tree.edges),
+        )
+
+    @staticmethod
+    def _format_tree_element(
+        tree: Tree, node_lines: List[Text], edge_lines: List[Text]
+    ) -> List[Text]:
+        attributes = {
+            "id": tree.id,
+            **dict(zip(("color.r", "color.g", "color.b", "color.a"), tree.color)),
+            "name": tree.name,
+        }
+        if tree.groupId is not None:
+            attributes["groupId"] = tree.groupId
+
+        return NMLWriter._format_element_with_children(
+            1,
+            "thing",
+            attributes,
+            [
+                *NMLWriter._format_element_with_children(2, "nodes", {}, node_lines),
+                *NMLWriter._format_element_with_children(2, "edges", {}, edge_lines),
+            ],
+        )
+
+    @staticmethod
+    def _format_group(group: Group, depth: int) -> List[Text]:
+        return NMLWriter._format_element_with_children(
+            depth,
+            "group",
+            {"id": group.id, "name": group.name},
+            [
+                line
+                for child in group.children
+                for line in NMLWriter._format_group(child, depth + 1)
+            ],
+        )